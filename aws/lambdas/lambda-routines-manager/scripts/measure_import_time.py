@@ -0,0 +1,55 @@
+"""
+Measure the cold-start import time of the Lambda handler with `python -X importtime`.
+
+Each run starts a fresh interpreter (like a cold start), imports the handler
+module and reads the cumulative import time reported for it. The median of
+all runs is printed along with the slowest imports of the last run.
+
+Usage (from the lambda-routines-manager directory):
+    python scripts/measure_import_time.py
+    python scripts/measure_import_time.py --runs 50 --top 15
+    python scripts/measure_import_time.py --path /tmp/other-checkout   # compare another version
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+def import_times(module, path):
+    """Import `module` in a new interpreter; return {module: cumulative microseconds}"""
+    env = dict(os.environ, PYTHONPATH=path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=path, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.handlers.routine_handler")
+    parser.add_argument("--path", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        times = import_times(args.module, args.path)
+        totals.append(times[args.module])
+
+    print(f"{args.module}: median {statistics.median(totals) / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms, {args.runs} runs)")
+    print("Slowest imports (cumulative, last run):")
+    for name, cumulative in sorted(times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,131 @@
 import json
+import hashlib
 import logging
-import traceback
-from src.services.routine_service import RoutineService
-from src.utils.decimal_encoder import DecimalEncoder
+from src.services.routine_service import RoutineService, VersionConflictError
+from src.utils.response import build_response, json_response, not_modified, http_date
+from src.utils.event_logging import EventSummary, log_event
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Upper bound for the `limit` query parameter
+MAX_PAGE_SIZE = 1000
+
+# Service (and its table handle) reused across warm invocations
+_service = None
+
+def get_routine_service():
+    """Return the module-level RoutineService, creating it on the first invocation"""
+    global _service
+    if _service is None:
+        _service = RoutineService()
+    return _service
+
+# Upper bound for the number of routines in a single bulk request
+MAX_BULK_ITEMS = 10000
+
+def get_bulk_items(routine_data):
+    """
+    Return the routines of a bulk request (a JSON array or {"routines": [...]}),
+    or None for a single routine
+    """
+    if isinstance(routine_data, list):
+        return routine_data
+    if isinstance(routine_data, dict) and isinstance(routine_data.get('routines'), list):
+        return routine_data['routines']
+    return None
+
+def parse_ids(value):
+    """Split the comma-separated `ids` query parameter"""
+    ids = [routine_id.strip() for routine_id in (value or '').split(',') if routine_id.strip()]
+    if not ids:
+        raise ValueError("Invalid ids: provide at least one routine ID")
+    if len(ids) > MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid ids: at most {MAX_PAGE_SIZE} IDs per request")
+    return ids
+
+def get_query_parameters(event):
+    """
+    Read query string parameters from a proxy integration event
+    (queryStringParameters) or from the mapping template (params.querystring)
+    """
+    params = event.get('queryStringParameters')
+    if params is None:
+        params = (event.get('params') or {}).get('querystring')
+    return params or {}
+
+def get_header(event, name):
+    """
+    Read a request header, case-insensitively, from a proxy integration event
+    (headers) or from the mapping template (params.header)
+    """
+    headers = event.get('headers')
+    if headers is None:
+        headers = (event.get('params') or {}).get('header')
+    name = name.lower()
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def make_etag(*parts):
+    """Opaque strong ETag derived from `parts`"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:16]}"'
+
+def cache_headers(etag, last_modified):
+    """ETag and Last-Modified response headers"""
+    headers = {'ETag': etag}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header (a list of ETags, possibly weak, or *) matches `etag`"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+def parse_limit(value):
+    """Validate the `limit` query parameter"""
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {value}")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid limit: must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+def parse_version(value):
+    """Validate the optional `version` sent with an update (the expected current version)"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid version: {value}")
+    try:
+        version = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid version: {value}")
+    if version < 0:
+        raise ValueError("Invalid version: must be zero or greater")
+    return version
+
 def lambda_handler(event, context):
     """
     Lambda function handler for routines management
     """
     try:
-        logger.info('Event: %s', json.dumps(event))
+        # Evento resumido (com o body), amostrado e sem campos sensíveis
+        log_event(logger, event)
         
-        # Initialize service
-        service = RoutineService()
+        # Reuse the service created by a previous invocation
+        service = get_routine_service()
         
         # Get HTTP method from the event
         http_method = event.get('httpMethod', 'GET')
@@ -34,84 +144,98 @@ def lambda_handler(event, context):
             if routine_id:
                 routine = service.get_routine(routine_id)
                 if not routine:
-                    return {
-                        'statusCode': 404,
-                        'body': json.dumps({
-                            'message': f"Routine not found at {route}",
-                            'data': None
-                        })
-                    }
-                return {
-                    'statusCode': 200,
-                    'body': json.dumps({
-                        'message': f"Successfully retrieved routine at {route}",
-                        'data': routine.to_dict()
-                    }, cls=DecimalEncoder)
-                }
+                    return build_response(404, f"Routine not found at {route}")
+                routine_dict = routine.to_dict()
+                headers = cache_headers(make_etag(routine.version, routine_dict['updated_at']), routine_dict['updated_at'])
+                if etag_matches(get_header(event, 'If-None-Match'), headers['ETag']):
+                    return not_modified(headers)
+                return build_response(200, f"Successfully retrieved routine at {route}", routine_dict, headers)
             else:
-                routines = service.list_routines()
-                return {
-                    'statusCode': 200,
-                    'body': json.dumps({
-                        'message': f"Successfully retrieved routines at {route}",
-                        'data': [r.to_dict() for r in routines]
-                    }, cls=DecimalEncoder)
+                query_parameters = get_query_parameters(event)
+                
+                # Listagens: a versão da coleção (um GetItem pequeno) responde
+                # ao If-None-Match sem fazer o scan ou a query
+                version, updated_at = service.get_collection_version()
+                headers = cache_headers(make_etag(version, sorted(query_parameters.items())), updated_at)
+                if etag_matches(get_header(event, 'If-None-Match'), headers['ETag']):
+                    return not_modified(headers)
+                
+                if 'ids' in query_parameters:
+                    try:
+                        routines, missing = service.batch_get_routines(parse_ids(query_parameters['ids']))
+                    except ValueError as e:
+                        logger.error('Validation error: %s', str(e))
+                        return build_response(400, f"Error retrieving routines at {route}: {str(e)}")
+                    return build_response(200, f"Successfully retrieved routines at {route}", [r.to_dict() for r in routines], headers, missing=missing)
+                
+                filters = {
+                    name: query_parameters[name]
+                    for name in ('status', 'frequency', 'schedule')
+                    if query_parameters.get(name)
                 }
+                if filters:
+                    try:
+                        routines = service.query_routines(**filters)
+                    except ValueError as e:
+                        logger.error('Validation error: %s', str(e))
+                        return build_response(400, f"Error listing routines at {route}: {str(e)}")
+                    return build_response(200, f"Successfully retrieved routines at {route}", [r.to_dict() for r in routines], headers)
+                
+                if 'limit' in query_parameters or 'next_token' in query_parameters:
+                    try:
+                        limit = parse_limit(query_parameters.get('limit'))
+                        routines, next_token = service.list_routines_page(limit, query_parameters.get('next_token'))
+                    except ValueError as e:
+                        logger.error('Validation error: %s', str(e))
+                        return build_response(400, f"Error listing routines at {route}: {str(e)}")
+                    return build_response(200, f"Successfully retrieved routines at {route}", [r.to_dict() for r in routines], headers, next_token=next_token)
+                
+                routines = service.list_routines()
+                return build_response(200, f"Successfully retrieved routines at {route}", [r.to_dict() for r in routines], headers)
         
         elif http_method == 'POST':
             # Create a new routine
             try:
                 body = event.get('body', '{}')
-                logger.info('Request body: %s', body)
                 
-                # Verificar se o body já é um dict
-                if isinstance(body, dict):
+                # Verificar se o body já é um dict (ou uma lista, no envio em lote)
+                if isinstance(body, (dict, list)):
                     routine_data = body
                 else:
                     try:
                         routine_data = json.loads(body)
                     except json.JSONDecodeError as e:
                         logger.error('Error decoding JSON: %s', str(e))
-                        return {
-                            'statusCode': 400,
-                            'body': json.dumps({
-                                'message': f"Invalid JSON format: {str(e)}",
-                                'data': None
-                            })
-                        }
+                        return build_response(400, f"Invalid JSON format: {str(e)}")
+                
+                bulk_items = get_bulk_items(routine_data)
+                if bulk_items is not None:
+                    if len(bulk_items) > MAX_BULK_ITEMS:
+                        raise ValueError(f"Too many routines in a single request (max {MAX_BULK_ITEMS})")
+                    
+                    routines, errors = service.bulk_create_routines(bulk_items)
+                    if errors and not routines:
+                        status_code = 400
+                        message = f"Error creating routines at {route}"
+                    else:
+                        # 207: some routines were saved and some were rejected
+                        status_code = 207 if errors else 201
+                        message = f"Successfully created {len(routines)} routines at {route}"
+                    return build_response(status_code, message, [r.to_dict() for r in routines], errors=errors)
                 
                 routine = service.create_routine(routine_data)
-                return {
-                    'statusCode': 201,
-                    'body': json.dumps({
-                        'message': f"Successfully created routine at {route}",
-                        'data': routine.to_dict()
-                    }, cls=DecimalEncoder)
-                }
+                return build_response(201, f"Successfully created routine at {route}", routine.to_dict())
             except ValueError as e:
                 logger.error('Validation error: %s', str(e))
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'message': f"Error creating routine at {route}: {str(e)}",
-                        'data': None
-                    })
-                }
+                return build_response(400, f"Error creating routine at {route}: {str(e)}")
                 
         elif http_method == 'PUT':
             # Update an existing routine
             if not routine_id:
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'message': f"Missing routine ID at {route}",
-                        'data': None
-                    })
-                }
+                return build_response(400, f"Missing routine ID at {route}")
                 
             try:
                 body = event.get('body', '{}')
-                logger.info('Request body: %s', body)
                 
                 # Verificar se o body já é um dict
                 if isinstance(body, dict):
@@ -121,90 +245,47 @@ def lambda_handler(event, context):
                         routine_data = json.loads(body)
                     except json.JSONDecodeError as e:
                         logger.error('Error decoding JSON: %s', str(e))
-                        return {
-                            'statusCode': 400,
-                            'body': json.dumps({
-                                'message': f"Invalid JSON format: {str(e)}",
-                                'data': None
-                            })
-                        }
+                        return build_response(400, f"Invalid JSON format: {str(e)}")
                 
-                updated_routine = service.update_routine(routine_id, routine_data)
+                # Only the fields sent are updated; `version` makes the write conditional
+                expected_version = parse_version(routine_data.get('version')) if isinstance(routine_data, dict) else None
+                try:
+                    updated_routine = service.update_routine(routine_id, routine_data, expected_version)
+                except VersionConflictError as e:
+                    logger.warning('Version conflict: %s', str(e))
+                    return build_response(409, f"Version conflict at {route}: {str(e)}", current_version=e.current_version)
                 
                 if not updated_routine:
-                    return {
-                        'statusCode': 404,
-                        'body': json.dumps({
-                            'message': f"Routine not found at {route}",
-                            'data': None
-                        })
-                    }
+                    return build_response(404, f"Routine not found at {route}")
                     
-                return {
-                    'statusCode': 200,
-                    'body': json.dumps({
-                        'message': f"Successfully updated routine at {route}",
-                        'data': updated_routine.to_dict()
-                    }, cls=DecimalEncoder)
-                }
+                return build_response(200, f"Successfully updated routine at {route}", updated_routine.to_dict())
             except ValueError as e:
                 logger.error('Validation error: %s', str(e))
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'message': f"Error updating routine at {route}: {str(e)}",
-                        'data': None
-                    })
-                }
+                return build_response(400, f"Error updating routine at {route}: {str(e)}")
                 
         elif http_method == 'DELETE':
             # Delete a routine
             if not routine_id:
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'message': f"Missing routine ID at {route}",
-                        'data': None
-                    })
-                }
+                return build_response(400, f"Missing routine ID at {route}")
                 
             deleted = service.delete_routine(routine_id)
             if not deleted:
-                return {
-                    'statusCode': 404,
-                    'body': json.dumps({
-                        'message': f"Routine not found at {route}",
-                        'data': None
-                    })
-                }
+                return build_response(404, f"Routine not found at {route}")
                 
-            return {
-                'statusCode': 204,
-                'body': json.dumps({
-                    'message': f"Successfully deleted routine at {route}",
-                    'data': None
-                })
-            }
+            return build_response(204, f"Successfully deleted routine at {route}")
         
-        return {
-            'statusCode': 400,
-            'body': json.dumps({
-                'message': f"Unsupported HTTP method at {route}",
-                'data': None
-            })
-        }
+        return build_response(400, f"Unsupported HTTP method at {route}")
         
     except Exception as e:
-        # Capturar o traceback completo
+        # Capturar o traceback completo (importado só aqui: não pesa no cold start)
+        import traceback
         error_traceback = traceback.format_exc()
-        logger.error('Error: %s\nTraceback: %s', str(e), error_traceback)
+        # O evento resumido sai sempre nos erros, mesmo fora da amostragem
+        logger.error('Error: %s\nEvent: %s\nTraceback: %s', str(e), EventSummary(event), error_traceback)
         
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'message': f"Internal server error: {str(e)}",
-                'error_type': type(e).__name__,
-                'error_location': error_traceback.split('\n')[0] if error_traceback else 'Unknown',
-                'data': None
-            })
-        } 
\ No newline at end of file
+        return json_response(500, {
+            'message': f"Internal server error: {str(e)}",
+            'error_type': type(e).__name__,
+            'error_location': error_traceback.split('\n')[0] if error_traceback else 'Unknown',
+            'data': None
+        }) 
\ No newline at end of file
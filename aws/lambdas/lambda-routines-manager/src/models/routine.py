@@ -1,6 +1,33 @@
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Union
+
+class LazyDatetime:
+    """
+    Atributo de data guardado como recebido (string ISO ou datetime) e
+    convertido para datetime apenas na primeira leitura
+    """
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value or None)
+
+def _isoformat(value):
+    # Strings ainda não convertidas já estão no formato ISO
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
 
 class Routine:
     # Lista de frequências permitidas
@@ -13,6 +40,26 @@ class Routine:
         "custom"      # Frequência personalizada
     ]
 
+    # Campos que uma atualização parcial pode alterar
+    UPDATABLE_FIELDS = (
+        "name", "description", "status", "schedule", "frequency", "priority",
+        "tags", "estimated_duration", "start_date", "end_date"
+    )
+
+    # Chaves dos índices secundários (StatusIndex, FrequencyIndex, ScheduleIndex):
+    # o DynamoDB só aceita strings não vazias, ou o atributo ausente (None)
+    INDEX_KEY_FIELDS = ("status", "frequency", "schedule")
+
+    __slots__ = (
+        "id", "name", "description", "status", "schedule", "frequency", "priority",
+        "tags", "estimated_duration", "version", "_start_date", "_end_date", "_created_at", "_updated_at"
+    )
+
+    start_date = LazyDatetime()
+    end_date = LazyDatetime()
+    created_at = LazyDatetime()
+    updated_at = LazyDatetime()
+
     def __init__(
         self,
         name: str,
@@ -23,11 +70,12 @@ class Routine:
         priority: str = "medium",
         tags: List[str] = None,
         estimated_duration: int = 0,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
+        start_date: Optional[Union[datetime, str]] = None,
+        end_date: Optional[Union[datetime, str]] = None,
         id: str = None,
-        created_at: datetime = None,
-        updated_at: datetime = None
+        created_at: Optional[Union[datetime, str]] = None,
+        updated_at: Optional[Union[datetime, str]] = None,
+        version: int = None
     ):
         # Validar frequência
         if frequency not in self.ALLOWED_FREQUENCIES:
@@ -42,27 +90,33 @@ class Routine:
         self.priority = priority
         self.tags = tags or []
         self.estimated_duration = estimated_duration
-        self.start_date = start_date
-        self.end_date = end_date
-        self.created_at = created_at or datetime.utcnow()
-        self.updated_at = updated_at or datetime.utcnow()
+        # Versão usada nas escritas condicionais (0 = item salvo antes do versionamento)
+        self.version = int(version) if version is not None else 0
+        # Direto nos slots: as datas só são convertidas quando lidas
+        self._start_date = start_date or None
+        self._end_date = end_date or None
+        self._created_at = created_at or datetime.utcnow()
+        self._updated_at = updated_at or datetime.utcnow()
 
-    def to_dict(self) -> dict:
-        # Função auxiliar para converter string para datetime se necessário
-        def ensure_datetime(value):
-            if isinstance(value, str):
-                try:
-                    return datetime.fromisoformat(value)
-                except ValueError:
-                    return value
-            return value
-
-        # Converter strings de data para datetime se necessário
-        start_date = ensure_datetime(self.start_date)
-        end_date = ensure_datetime(self.end_date)
-        created_at = ensure_datetime(self.created_at)
-        updated_at = ensure_datetime(self.updated_at)
+    @classmethod
+    def _validate_index_keys(cls, values: dict):
+        """Levanta ValueError se uma chave de índice presente não for uma string não vazia"""
+        for field in cls.INDEX_KEY_FIELDS:
+            value = values.get(field)
+            if value is not None and (not isinstance(value, str) or not value):
+                raise ValueError(f"Field {field} must be a non-empty string")
 
+    def validate(self):
+        """
+        Confere as chaves de índice e converte as datas ainda em string,
+        levantando ValueError se algum valor for inválido
+        """
+        self._validate_index_keys({field: getattr(self, field) for field in self.INDEX_KEY_FIELDS})
+        for name in ("start_date", "end_date", "created_at", "updated_at"):
+            getattr(self, name)
+
+    def to_dict(self) -> dict:
+        """Forma JSON da rotina, em uma única passagem (datas em ISO)"""
         return {
             "id": self.id,
             "name": self.name,
@@ -73,14 +127,25 @@ class Routine:
             "priority": self.priority,
             "tags": self.tags,
             "estimated_duration": self.estimated_duration,
-            "start_date": start_date.isoformat() if start_date else None,
-            "end_date": end_date.isoformat() if end_date else None,
-            "created_at": created_at.isoformat() if created_at else None,
-            "updated_at": updated_at.isoformat() if updated_at else None
+            "version": self.version,
+            "start_date": _isoformat(self._start_date),
+            "end_date": _isoformat(self._end_date),
+            "created_at": _isoformat(self._created_at),
+            "updated_at": _isoformat(self._updated_at)
         }
 
+    def to_item(self) -> dict:
+        """Forma de item do DynamoDB: como to_dict, sem os atributos vazios"""
+        return {key: value for key, value in self.to_dict().items() if value is not None}
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Routine':
+        """
+        Cria a rotina a partir de um dict (corpo da requisição ou item do DynamoDB).
+
+        As datas não são convertidas aqui: isso acontece na primeira leitura do
+        atributo, ou em validate(). to_dict devolve as strings como recebidas.
+        """
         if not isinstance(data, dict):
             raise ValueError("Input must be a dictionary")
 
@@ -90,12 +155,6 @@ class Routine:
             if field not in data:
                 raise ValueError(f"Missing required field: {field}")
 
-        # Converter strings ISO para datetime
-        start_date = datetime.fromisoformat(data.get('start_date')) if data.get('start_date') else None
-        end_date = datetime.fromisoformat(data.get('end_date')) if data.get('end_date') else None
-        created_at = datetime.fromisoformat(data.get('created_at')) if data.get('created_at') else None
-        updated_at = datetime.fromisoformat(data.get('updated_at')) if data.get('updated_at') else None
-
         return cls(
             id=data.get('id'),
             name=data['name'],
@@ -106,8 +165,42 @@ class Routine:
             priority=data.get('priority', 'medium'),
             tags=data.get('tags', []),
             estimated_duration=data.get('estimated_duration', 0),
-            start_date=start_date,
-            end_date=end_date,
-            created_at=created_at,
-            updated_at=updated_at
-        ) 
\ No newline at end of file
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
+            version=data.get('version')
+        )
+
+    @classmethod
+    def validate_changes(cls, data: dict) -> dict:
+        """
+        Valida uma atualização parcial e devolve apenas os campos editáveis
+        presentes em `data` (id, datas de controle e versão são ignorados).
+
+        As datas informadas são normalizadas para ISO; None remove o campo.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Input must be a dictionary")
+
+        changes = {field: data[field] for field in cls.UPDATABLE_FIELDS if field in data}
+        if not changes:
+            raise ValueError(f"No fields to update. Use any of: {', '.join(cls.UPDATABLE_FIELDS)}")
+
+        for field in ('name', 'description'):
+            if field in changes and not changes[field]:
+                raise ValueError(f"Field {field} cannot be empty")
+
+        cls._validate_index_keys(changes)
+
+        if 'frequency' in changes and changes['frequency'] not in cls.ALLOWED_FREQUENCIES:
+            raise ValueError(f"Invalid frequency. Must be one of: {', '.join(cls.ALLOWED_FREQUENCIES)}")
+
+        for field in ('start_date', 'end_date'):
+            if field in changes:
+                value = changes[field]
+                if isinstance(value, str) and value:
+                    value = datetime.fromisoformat(value)
+                changes[field] = _isoformat(value or None)
+
+        return changes
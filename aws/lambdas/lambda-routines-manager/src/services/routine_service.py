@@ -1,6 +1,9 @@
 import os
+import re
+import json
+import base64
 import logging
-import boto3
+import time
 from datetime import datetime
 from botocore.exceptions import ClientError
 from src.models.routine import Routine
@@ -8,12 +11,127 @@ from src.models.routine import Routine
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Number of parallel scan segments used when listing the whole table
+DEFAULT_SCAN_SEGMENTS = int(os.environ.get('ROUTINES_SCAN_SEGMENTS', '1'))
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_CHUNK_SIZE = 100
+
+# Retries (with exponential backoff) for keys DynamoDB returns as UnprocessedKeys
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_BACKOFF_SECONDS = 0.05
+
+# Global secondary indexes declared in template.yaml
+STATUS_INDEX = 'StatusIndex'
+FREQUENCY_INDEX = 'FrequencyIndex'
+SCHEDULE_INDEX = 'ScheduleIndex'
+
+# Index key attributes cannot be stored as NULL, so they are left out when empty
+INDEX_KEY_ATTRIBUTES = ('status', 'frequency', 'schedule', 'schedule_bucket')
+
+# Reserved item holding the collection version: a counter bumped in the same
+# transaction as every write, read by the handler to answer conditional GETs
+# without scanning. It has no index keys, so queries never see it; scans skip
+# it explicitly
+COLLECTION_VERSION_ID = '__collection_version__'
+
+# Retries (with exponential backoff) for transactions cancelled because another
+# one was writing the collection version item at the same time
+TRANSACTION_MAX_RETRIES = 3
+TRANSACTION_BACKOFF_SECONDS = 0.05
+
+# TransactWriteItems accepts at most 100 actions; one goes to the collection version
+TRANSACTION_MAX_ROUTINES = 99
+
+class VersionConflictError(Exception):
+    """Raised when a conditional update finds a different version than expected"""
+    
+    def __init__(self, routine_id, expected_version, current_version):
+        super().__init__(
+            f"Version conflict for routine {routine_id}: expected version "
+            f"{expected_version}, current version is {current_version}"
+        )
+        self.routine_id = routine_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+# "HH:MM" (or just "HH" when querying a whole hour)
+SCHEDULE_PATTERN = re.compile(r'^(\d{1,2})(?::(\d{2}))?$')
+
+def schedule_bucket(schedule):
+    """Return the hour ("08") of a "HH:MM" schedule, the ScheduleIndex partition key"""
+    if not isinstance(schedule, str):
+        return None
+    match = SCHEDULE_PATTERN.match(schedule)
+    if not match or int(match.group(1)) > 23:
+        return None
+    return f"{int(match.group(1)):02d}"
+
+def to_item(routine):
+    """Convert a Routine to the stored item, adding the schedule bucket used by ScheduleIndex"""
+    item = routine.to_item()
+    bucket = schedule_bucket(routine.schedule)
+    if bucket:
+        item['schedule_bucket'] = bucket
+    return item
+
+def routines_from_items(items):
+    """Build Routines from scanned items, skipping the collection version item"""
+    return [Routine.from_dict(item) for item in items if item.get('id') != COLLECTION_VERSION_ID]
+
+def cancellation_reason(error, index=0):
+    """Reason (e.g. {'Code': 'ConditionalCheckFailed', 'Item': {...}}) for one action of a cancelled transaction"""
+    reasons = error.response.get('CancellationReasons') or []
+    return reasons[index] if index < len(reasons) else {}
+
+def check_routine_id(routine):
+    if routine.id == COLLECTION_VERSION_ID:
+        raise ValueError(f"Invalid id: {COLLECTION_VERSION_ID} is reserved")
+
+# DynamoDB resource shared by every invocation of a warm container.
+# Created on first use, so importing this module stays cheap on cold starts.
+# boto3 itself (~200 ms to import) is only imported here and in the methods
+# that need its helpers, never at module level
+_dynamodb = None
+
+# Optional endpoint, e.g. http://localhost:8000 for DynamoDB Local
+DYNAMODB_ENDPOINT_URL = os.environ.get('DYNAMODB_ENDPOINT_URL') or None
+
+def get_dynamodb_resource():
+    """Return the module-level DynamoDB resource, creating it on first use"""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb', endpoint_url=DYNAMODB_ENDPOINT_URL)
+    return _dynamodb
+
+def encode_next_token(last_evaluated_key):
+    """Encode a DynamoDB LastEvaluatedKey as an opaque, URL-safe token"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_next_token(next_token):
+    """Decode a token produced by encode_next_token back into an ExclusiveStartKey"""
+    if not next_token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(next_token.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid next_token: {e}")
+    if not isinstance(key, dict) or not isinstance(key.get('id'), str):
+        raise ValueError("Invalid next_token: unexpected key format")
+    return key
+
 class RoutineService:
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_dynamodb_resource()
         self.table = self.dynamodb.Table(os.environ.get('ROUTINES_TABLE', 'Routines'))
 
     def get_routine(self, routine_id):
+        if routine_id == COLLECTION_VERSION_ID:
+            return None
         try:
             response = self.table.get_item(Key={'id': routine_id})
             item = response.get('Item')
@@ -21,15 +139,180 @@ class RoutineService:
         except ClientError as e:
             logger.error(f"Error getting routine: {e}")
             raise
+    
+    def batch_get_routines(self, routine_ids):
+        """
+        Fetch several routines by ID with BatchGetItem.
+        
+        IDs are deduplicated and sent in chunks of 100 keys; UnprocessedKeys are
+        retried with exponential backoff.
+        
+        Returns:
+            tuple: (routines in the requested order, IDs that were not found)
+        """
+        unique_ids = list(dict.fromkeys(routine_ids))
+        keys = [routine_id for routine_id in unique_ids if routine_id != COLLECTION_VERSION_ID]
+        items = {}
+        try:
+            for start in range(0, len(keys), BATCH_GET_CHUNK_SIZE):
+                chunk = keys[start:start + BATCH_GET_CHUNK_SIZE]
+                request = {self.table.name: {'Keys': [{'id': routine_id} for routine_id in chunk]}}
+                for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in response.get('Responses', {}).get(self.table.name, []):
+                        items[item['id']] = item
+                    request = response.get('UnprocessedKeys')
+                    if not request:
+                        break
+                    if attempt == BATCH_GET_MAX_RETRIES:
+                        raise RuntimeError(f"DynamoDB left keys unprocessed after {BATCH_GET_MAX_RETRIES} retries")
+                    time.sleep(BATCH_GET_BACKOFF_SECONDS * (2 ** attempt))
+        except ClientError as e:
+            logger.error(f"Error getting routines in batch: {e}")
+            raise
+        
+        routines = [Routine.from_dict(items[routine_id]) for routine_id in unique_ids if routine_id in items]
+        missing = [routine_id for routine_id in unique_ids if routine_id not in items]
+        return routines, missing
+    
+    def query_routines(self, status=None, frequency=None, schedule=None):
+        """
+        Return the routines matching every given filter without scanning the table.
+        
+        The most selective index is queried (schedule, then status, then
+        frequency) and the remaining filters become a FilterExpression.
+        """
+        if schedule:
+            return self.query_by_schedule(schedule, status=status, frequency=frequency)
+        if status:
+            return self.query_by_status(status, frequency=frequency)
+        if frequency:
+            return self.query_by_frequency(frequency)
+        raise ValueError("At least one filter (status, frequency or schedule) is required")
+    
+    def query_by_status(self, status, **filters):
+        """Routines with the given status (StatusIndex)"""
+        from boto3.dynamodb.conditions import Key
+        return self._query_index(STATUS_INDEX, Key('status').eq(status), filters)
+    
+    def query_by_frequency(self, frequency, **filters):
+        """Routines with the given frequency (FrequencyIndex)"""
+        from boto3.dynamodb.conditions import Key
+        return self._query_index(FREQUENCY_INDEX, Key('frequency').eq(frequency), filters)
+    
+    def query_by_schedule(self, schedule, **filters):
+        """Routines scheduled at "HH:MM", or anywhere within the hour for "HH" (ScheduleIndex)"""
+        from boto3.dynamodb.conditions import Key
+        bucket = schedule_bucket(schedule)
+        if bucket is None:
+            raise ValueError(f"Invalid schedule: {schedule}. Use HH:MM or HH")
+        key_condition = Key('schedule_bucket').eq(bucket)
+        if ':' in schedule:
+            key_condition = key_condition & Key('schedule').eq(schedule)
+        return self._query_index(SCHEDULE_INDEX, key_condition, filters)
+    
+    def _query_index(self, index_name, key_condition, filters):
+        from boto3.dynamodb.conditions import Attr
+        query_kwargs = {'IndexName': index_name, 'KeyConditionExpression': key_condition}
+        filter_expression = None
+        for name, value in filters.items():
+            if value is None:
+                continue
+            condition = Attr(name).eq(value)
+            filter_expression = condition if filter_expression is None else filter_expression & condition
+        if filter_expression is not None:
+            query_kwargs['FilterExpression'] = filter_expression
+        
+        try:
+            routines = []
+            while True:
+                response = self.table.query(**query_kwargs)
+                routines.extend(Routine.from_dict(item) for item in response.get('Items', []))
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    return routines
+                query_kwargs['ExclusiveStartKey'] = last_key
+        except ClientError as e:
+            logger.error(f"Error querying routines on {index_name}: {e}")
+            raise
 
-    def list_routines(self):
+    def list_routines(self, segments=None):
+        """
+        List every routine, following LastEvaluatedKey past the 1 MB scan limit.
+        
+        With segments > 1 the table is read with a DynamoDB parallel scan,
+        one segment per worker thread.
+        """
+        segments = segments or DEFAULT_SCAN_SEGMENTS
+        try:
+            if segments <= 1:
+                return [routine for page in self.iter_routine_pages() for routine in page]
+            
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=segments) as executor:
+                results = executor.map(lambda segment: self._scan_segment(segment, segments), range(segments))
+                return [routine for segment_routines in results for routine in segment_routines]
+        except ClientError as e:
+            logger.error(f"Error listing routines: {e}")
+            raise
+    
+    def list_routines_page(self, limit=None, next_token=None):
+        """
+        Return a single page of routines and the token for the next one.
+        
+        Returns:
+            tuple: (list of Routine, next_token or None when there are no more pages)
+        """
+        scan_kwargs = {}
+        if limit:
+            scan_kwargs['Limit'] = limit
+        start_key = decode_next_token(next_token)
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        
         try:
-            response = self.table.scan()
+            response = self.table.scan(**scan_kwargs)
             items = response.get('Items', [])
-            return [Routine.from_dict(item) for item in items]
+            last_key = response.get('LastEvaluatedKey')
+            routines = routines_from_items(items)
+            if limit and last_key and len(routines) < len(items):
+                # Limit also counted the collection version item: read one more routine
+                response = self.table.scan(Limit=1, ExclusiveStartKey=last_key)
+                routines.extend(routines_from_items(response.get('Items', [])))
+                last_key = response.get('LastEvaluatedKey')
+            return routines, encode_next_token(last_key)
         except ClientError as e:
             logger.error(f"Error listing routines: {e}")
             raise
+    
+    def iter_routine_pages(self, page_size=None):
+        """Yield routines one scan page at a time, without loading the whole table"""
+        scan_kwargs = {'Limit': page_size} if page_size else {}
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            yield routines_from_items(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            scan_kwargs['ExclusiveStartKey'] = last_key
+    
+    def _scan_segment(self, segment, total_segments):
+        # boto3 resources are not thread safe, so each segment goes through the
+        # table's client, which is (and still converts items to Python types)
+        client = self.table.meta.client
+        scan_kwargs = {
+            'TableName': self.table.name,
+            'Segment': segment,
+            'TotalSegments': total_segments
+        }
+        routines = []
+        while True:
+            response = client.scan(**scan_kwargs)
+            routines.extend(routines_from_items(response.get('Items', [])))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return routines
+            scan_kwargs['ExclusiveStartKey'] = last_key
             
     def create_routine(self, routine_data):
         try:
@@ -41,67 +324,190 @@ class RoutineService:
             
             # Create routine object
             routine = Routine.from_dict(routine_data)
+            routine.validate()
+            check_routine_id(routine)
+            routine.version = 1
             
-            # Save to DynamoDB
-            self.table.put_item(Item=routine.to_dict())
+            # Save to DynamoDB, bumping the collection version in the same transaction
+            self._transact_write([{'Put': {'TableName': self.table.name, 'Item': to_item(routine)}}])
             
             return routine
         except ClientError as e:
             logger.error(f"Error creating routine: {e}")
             raise
             
-    def update_routine(self, routine_id, routine_data):
+    def bulk_create_routines(self, routines_data):
+        """
+        Create (or replace, when an id is given) many routines at once.
+        
+        Items are written with TransactWriteItems, up to 99 routines per
+        transaction plus the collection version bump, so each chunk and its
+        bump commit together. Invalid items are skipped and reported instead
+        of failing the whole batch.
+        
+        Returns:
+            tuple: (list of saved Routine, list of {'index', 'message'} errors)
+        """
+        from boto3.dynamodb.types import TypeSerializer
+        serializer = TypeSerializer()
+        routines = []
+        errors = []
+        for index, data in enumerate(routines_data):
+            try:
+                routine = Routine.from_dict(data)
+                routine.validate()
+                check_routine_id(routine)
+                routine.version = 1
+                # Catch values DynamoDB cannot store (e.g. floats) before the batch is sent
+                serializer.serialize(to_item(routine))
+                routines.append(routine)
+            except (ValueError, TypeError) as e:
+                errors.append({'index': index, 'message': str(e)})
+        
+        # A transaction cannot touch the same item twice: the last routine with an id wins
+        items = list({routine.id: to_item(routine) for routine in routines}.values())
         try:
-            # Check if routine exists
-            existing_routine = self.get_routine(routine_id)
-            if not existing_routine:
-                return None
-                
-            # Update routine object
-            routine = Routine.from_dict(routine_data)
-            routine.id = routine_id
-            routine.created_at = existing_routine.created_at
-            routine.updated_at = datetime.now().isoformat()
-            
-            # Prepare update expression
-            update_expr = "SET "
-            expr_attr_values = {}
-            expr_attr_names = {}
-            
-            routine_dict = routine.to_dict()
-            for key, value in routine_dict.items():
-                if key != 'id':  # Don't update the ID
-                    update_expr += f"#{key} = :{key}, "
-                    expr_attr_values[f":{key}"] = value
-                    expr_attr_names[f"#{key}"] = key
-                    
-            # Remove trailing comma and space
-            update_expr = update_expr[:-2]
-            
-            # Update in DynamoDB
-            response = self.table.update_item(
-                Key={'id': routine_id},
-                UpdateExpression=update_expr,
-                ExpressionAttributeValues=expr_attr_values,
-                ExpressionAttributeNames=expr_attr_names,
-                ReturnValues="ALL_NEW"
-            )
-            
-            return Routine.from_dict(response.get('Attributes'))
+            for start in range(0, len(items), TRANSACTION_MAX_ROUTINES):
+                chunk = items[start:start + TRANSACTION_MAX_ROUTINES]
+                self._transact_write([{'Put': {'TableName': self.table.name, 'Item': item}} for item in chunk])
+            return routines, errors
+        except ClientError as e:
+            logger.error(f"Error creating routines in bulk: {e}")
+            raise
+    
+    def update_routine(self, routine_id, routine_data, expected_version=None):
+        """
+        Partially update a routine in a single write.
+        
+        Only the fields present in `routine_data` are written, and `version` is
+        incremented atomically, in the same transaction as the collection
+        version. With `expected_version` the write only succeeds if the stored
+        version still matches; otherwise VersionConflictError is raised with the
+        current version, so the caller can retry on top of it.
+        
+        Returns None when the routine does not exist (the conditional check
+        fails) instead of reading it first. Transactions return no attributes,
+        so the updated routine is read back with a consistent read.
+        """
+        changes = Routine.validate_changes(routine_data)
+        if routine_id == COLLECTION_VERSION_ID:
+            return None
+        changes['updated_at'] = datetime.now().isoformat()
+        if 'schedule' in changes:
+            changes['schedule_bucket'] = schedule_bucket(changes['schedule'])
+        
+        set_exprs = ["#version = if_not_exists(#version, :zero) + :one"]
+        remove_exprs = []
+        expr_attr_names = {'#id': 'id', '#version': 'version'}
+        expr_attr_values = {':zero': 0, ':one': 1}
+        for key, value in changes.items():
+            expr_attr_names[f"#{key}"] = key
+            if value is None:
+                # Empty values are dropped, like in to_item (index keys cannot be NULL)
+                remove_exprs.append(f"#{key}")
+            else:
+                set_exprs.append(f"#{key} = :{key}")
+                expr_attr_values[f":{key}"] = value
+        
+        update_expr = "SET " + ", ".join(set_exprs)
+        if remove_exprs:
+            update_expr += " REMOVE " + ", ".join(remove_exprs)
+        
+        condition = "attribute_exists(#id)"
+        if expected_version is not None:
+            if expected_version == 0:
+                # Items written before versioning have no version attribute
+                condition += " AND attribute_not_exists(#version)"
+            else:
+                condition += " AND #version = :expected_version"
+                expr_attr_values[':expected_version'] = expected_version
+        
+        try:
+            self._transact_write([{
+                'Update': {
+                    'TableName': self.table.name,
+                    'Key': {'id': routine_id},
+                    'UpdateExpression': update_expr,
+                    'ExpressionAttributeValues': expr_attr_values,
+                    'ExpressionAttributeNames': expr_attr_names,
+                    'ConditionExpression': condition,
+                    # Tells "not found" from "version conflict" without another read
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }
+            }])
+            response = self.table.get_item(Key={'id': routine_id}, ConsistentRead=True)
+            item = response.get('Item')
+            return Routine.from_dict(item) if item else None
         except ClientError as e:
+            reason = cancellation_reason(e)
+            if reason.get('Code') == 'ConditionalCheckFailed':
+                current = reason.get('Item')
+                if not current:
+                    return None
+                # The item comes back in the low-level format ({'N': '3'})
+                current_version = int(current.get('version', {}).get('N', 0))
+                raise VersionConflictError(routine_id, expected_version, current_version)
             logger.error(f"Error updating routine: {e}")
             raise
             
     def delete_routine(self, routine_id):
+        """Delete a routine in a single write; returns False when it does not exist"""
+        if routine_id == COLLECTION_VERSION_ID:
+            return False
         try:
-            # Check if routine exists
-            existing_routine = self.get_routine(routine_id)
-            if not existing_routine:
-                return False
-                
-            # Delete from DynamoDB
-            self.table.delete_item(Key={'id': routine_id})
+            self._transact_write([{
+                'Delete': {
+                    'TableName': self.table.name,
+                    'Key': {'id': routine_id},
+                    'ConditionExpression': "attribute_exists(id)"
+                }
+            }])
             return True
         except ClientError as e:
+            if cancellation_reason(e).get('Code') == 'ConditionalCheckFailed':
+                return False
             logger.error(f"Error deleting routine: {e}")
-            raise 
\ No newline at end of file
+            raise 
+    
+    def get_collection_version(self):
+        """
+        Return (version, updated_at) of the routines collection, or (0, None)
+        before the first write. One strongly consistent read of a tiny item.
+        """
+        try:
+            response = self.table.get_item(Key={'id': COLLECTION_VERSION_ID}, ConsistentRead=True)
+        except ClientError as e:
+            logger.error(f"Error getting collection version: {e}")
+            raise
+        item = response.get('Item') or {}
+        return int(item.get('version', 0)), item.get('updated_at')
+    
+    def _transact_write(self, actions):
+        """
+        Run `actions` and the collection version bump in one TransactWriteItems,
+        so a write and the list ETag never diverge.
+        
+        Transactions cancelled only because another one was bumping the
+        collection version at the same time are retried with exponential
+        backoff; any other cancellation (e.g. a failed condition) is raised.
+        """
+        bump = {
+            'Update': {
+                'TableName': self.table.name,
+                'Key': {'id': COLLECTION_VERSION_ID},
+                'UpdateExpression': "SET #updated_at = :now ADD #version :one",
+                'ExpressionAttributeNames': {'#updated_at': 'updated_at', '#version': 'version'},
+                'ExpressionAttributeValues': {':now': datetime.utcnow().isoformat(), ':one': 1}
+            }
+        }
+        # The table's client converts Python values, like the resource does
+        client = self.table.meta.client
+        for attempt in range(TRANSACTION_MAX_RETRIES + 1):
+            try:
+                client.transact_write_items(TransactItems=[*actions, bump])
+                return
+            except ClientError as e:
+                codes = {reason.get('Code') for reason in e.response.get('CancellationReasons') or []}
+                if e.response['Error']['Code'] != 'TransactionCanceledException' or 'TransactionConflict' not in codes or attempt == TRANSACTION_MAX_RETRIES:
+                    raise
+                time.sleep(TRANSACTION_BACKOFF_SECONDS * (2 ** attempt))
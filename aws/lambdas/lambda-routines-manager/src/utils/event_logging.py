@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import logging
+
+# Fraction of invocations whose event is logged on entry (the handler's error path
+# logs the event of every failed invocation)
+SAMPLE_RATE = float(os.environ.get('LOG_EVENT_SAMPLE_RATE', '1.0'))
+
+# Strings longer than this are truncated in the log
+MAX_STRING_CHARS = int(os.environ.get('LOG_EVENT_MAX_CHARS', '512'))
+
+# Lists and dicts longer than this only have their first items logged
+MAX_ITEMS = int(os.environ.get('LOG_EVENT_MAX_ITEMS', '20'))
+
+# Deeper values are replaced by a placeholder
+MAX_DEPTH = 6
+
+# Keys whose values never reach the logs (compared case-insensitively)
+REDACTED_FIELDS = frozenset(
+    field.strip().lower()
+    for field in os.environ.get(
+        'LOG_REDACTED_FIELDS',
+        'authorization,cookie,set-cookie,api-key,x-api-key,password,token,access_token,refresh_token'
+    ).split(',')
+    if field.strip()
+)
+
+REDACTED = '[REDACTED]'
+
+def summarize(value, depth=0):
+    """
+    Return a redacted, size-capped copy of `value`.
+    
+    Only the kept part is visited, so the cost depends on the limits and not on
+    the size of the payload.
+    """
+    if isinstance(value, str):
+        if len(value) > MAX_STRING_CHARS:
+            return f"{value[:MAX_STRING_CHARS]}...[+{len(value) - MAX_STRING_CHARS} chars]"
+        return value
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if depth >= MAX_DEPTH:
+        return f"[{type(value).__name__}]"
+    if isinstance(value, dict):
+        summary = {}
+        for index, (key, item) in enumerate(value.items()):
+            if index == MAX_ITEMS:
+                summary['...'] = f"[+{len(value) - MAX_ITEMS} keys]"
+                break
+            if str(key).lower() in REDACTED_FIELDS:
+                summary[key] = REDACTED
+            else:
+                summary[key] = summarize(item, depth + 1)
+        return summary
+    if isinstance(value, (list, tuple)):
+        summary = [summarize(item, depth + 1) for item in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            summary.append(f"[+{len(value) - MAX_ITEMS} items]")
+        return summary
+    return summarize(str(value), depth)
+
+class EventSummary:
+    """Log argument that only builds the (summarized) JSON when the record is emitted"""
+    
+    __slots__ = ('event',)
+    
+    def __init__(self, event):
+        self.event = event
+    
+    def __str__(self):
+        return json.dumps(summarize(self.event), ensure_ascii=False, default=str)
+
+def log_event(logger, event, level=logging.INFO):
+    """
+    Log the invocation event as one structured JSON line, sampled by
+    LOG_EVENT_SAMPLE_RATE. Costs nothing when `level` is disabled.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if SAMPLE_RATE < 1.0 and random.random() >= SAMPLE_RATE:
+        return
+    logger.log(level, 'Event: %s', EventSummary(event))
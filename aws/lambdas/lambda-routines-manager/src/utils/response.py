@@ -0,0 +1,91 @@
+import json
+import os
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+logger = logging.getLogger()
+
+# HTTP dates use English names regardless of locale (and email.utils costs ~10 ms to import)
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def _default(obj):
+    # DynamoDB numbers come back as Decimal; encode them as floats, like DecimalEncoder
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_json(body):
+    """Standard library encoder: byte-for-byte the output the handler always produced"""
+    return json.dumps(body, default=_default)
+
+def dumps_orjson(body):
+    """
+    orjson encoder: same JSON values, but compact and with non-ASCII characters
+    written as UTF-8 instead of \\u escapes, so the bytes differ from dumps_json
+    """
+    return orjson.dumps(body, default=_default).decode('utf-8')
+
+SERIALIZERS = {
+    'json': dumps_json,
+    'orjson': dumps_orjson
+}
+
+def get_serializer(name):
+    """Return the serializer registered as `name`, falling back to 'json' when orjson is missing"""
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown response serializer: {name}. Use one of: {', '.join(SERIALIZERS)}")
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson is not installed, using the standard json encoder")
+        name = 'json'
+    return SERIALIZERS[name]
+
+# Chosen once per container; RESPONSE_SERIALIZER=orjson opts into the faster encoder
+_serialize = get_serializer(os.environ.get('RESPONSE_SERIALIZER', 'json'))
+
+def set_serializer(serializer):
+    """Replace the response serializer, by name or with any callable taking the body"""
+    global _serialize
+    _serialize = get_serializer(serializer) if isinstance(serializer, str) else serializer
+
+def json_response(status_code, body, headers=None):
+    """Build an API Gateway response with `body` serialized by the active serializer"""
+    response = {
+        'statusCode': status_code,
+        'body': _serialize(body)
+    }
+    if headers:
+        response['headers'] = headers
+    return response
+
+def build_response(status_code, message, data=None, headers=None, **fields):
+    """Build the handler's standard {'message', 'data', ...} response"""
+    return json_response(status_code, {'message': message, 'data': data, **fields}, headers)
+
+def not_modified(headers):
+    """304 response for a conditional GET: the validators, and no body"""
+    return {
+        'statusCode': 304,
+        'headers': headers,
+        'body': ''
+    }
+
+def http_date(value):
+    """Format an ISO string or datetime (naive values are UTC) as an HTTP date, for Last-Modified"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return (
+        f"{WEEKDAYS[value.weekday()]}, {value.day:02d} {MONTHS[value.month - 1]} {value.year} "
+        f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT"
+    )
@@ -0,0 +1,197 @@
+"""
+Benchmarks do Lambda de rotinas (handler + RoutineService).
+
+Mede list, get, create, update, delete, bulk e query em vários tamanhos de
+tabela e grava um relatório JSON com p50/p95 por operação. Só roda com
+RUN_BENCHMARKS=1:
+
+    RUN_BENCHMARKS=1 python -m pytest tests/test_benchmarks.py -s
+
+Por padrão usa o moto, no próprio processo. Com DYNAMODB_ENDPOINT_URL (ex.:
+http://localhost:8000) roda contra o DynamoDB Local, criando as tabelas a
+partir de dynamodb-local-config.json.
+"""
+import contextlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.handlers import routine_handler
+from src.handlers.routine_handler import lambda_handler
+from src.services import routine_service
+
+pytestmark = pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason="benchmarks lentos; use RUN_BENCHMARKS=1")
+
+# Tamanhos de tabela e repetições de cada operação
+SIZES = [int(size) for size in os.environ.get('BENCHMARK_SIZES', '100,1000,5000').split(',')]
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', '30'))
+
+# Relatório gerado e, opcionalmente, um relatório anterior para comparar
+REPORT_PATH = os.environ.get('BENCHMARK_REPORT', 'benchmark-report.json')
+BASELINE_PATH = os.environ.get('BENCHMARK_BASELINE')
+# Quanto o p50 pode piorar em relação ao baseline (1.5 = 50% mais lento).
+# O p95 fica só no relatório: com poucas execuções ele é quase o máximo, e oscila demais
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', '1.5'))
+
+ENDPOINT_URL = routine_service.DYNAMODB_ENDPOINT_URL
+BACKEND = 'dynamodb-local' if ENDPOINT_URL else 'moto'
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dynamodb-local-config.json')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+if ENDPOINT_URL:
+    # O DynamoDB Local aceita qualquer credencial
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+
+STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+FREQUENCIES = ["daily", "weekly", "monthly", "weekdays", "weekends"]
+PRIORITIES = ["low", "medium", "high"]
+
+# Durações por tamanho de tabela e operação: {"1000": {"get": {...}}}
+results = {}
+
+def percentile(values, pct):
+    """Retorna o percentil `pct` (0-100) de uma lista de valores (nearest rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(durations):
+    return {
+        "runs": len(durations),
+        "p50_ms": round(percentile(durations, 50), 3),
+        "p95_ms": round(percentile(durations, 95), 3),
+        "mean_ms": round(sum(durations) / len(durations), 3),
+        "max_ms": round(max(durations), 3)
+    }
+
+def make_routine(index):
+    return {
+        "name": f"Rotina {index}",
+        "description": f"Rotina de benchmark número {index}",
+        "status": STATUSES[index % len(STATUSES)],
+        "frequency": FREQUENCIES[index % len(FREQUENCIES)],
+        "priority": PRIORITIES[index % len(PRIORITIES)],
+        "schedule": f"{index % 24:02d}:{(index * 7) % 60:02d}",
+        "tags": ["benchmark", f"grupo-{index % 10}"],
+        "estimated_duration": 15 + index % 60,
+        "start_date": "2023-04-05T08:00:00"
+    }
+
+def create_table(table_name):
+    """Cria a tabela com a definição de dynamodb-local-config.json (mesmos índices do template.yaml)."""
+    with open(CONFIG_PATH) as config_file:
+        config = json.load(config_file)
+    config.pop('TableNames', None)
+    dynamodb = boto3.resource('dynamodb', endpoint_url=ENDPOINT_URL)
+    table = dynamodb.create_table(TableName=table_name, **config)
+    table.wait_until_exists()
+    return table
+
+def backend_context():
+    return contextlib.nullcontext() if ENDPOINT_URL else mock_aws()
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report():
+    """Grava o relatório JSON depois de todas as medições do módulo."""
+    yield
+    if not results:
+        return
+    report = {
+        "backend": BACKEND,
+        "generated_at": datetime.utcnow().isoformat(),
+        "iterations": ITERATIONS,
+        "results": results
+    }
+    with open(REPORT_PATH, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"\nRelatório de benchmarks gravado em {REPORT_PATH}")
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}_itens")
+def routines_table(request):
+    """Tabela populada com `size` rotinas, usada pelo handler durante as medições."""
+    size = request.param
+    table_name = f"RoutinesBenchmark{size}"
+    with backend_context(), pytest.MonkeyPatch.context() as patch:
+        patch.setenv('ROUTINES_TABLE', table_name)
+        # Singletons recriados para a tabela (e o backend) do benchmark
+        patch.setattr(routine_service, '_dynamodb', None)
+        patch.setattr(routine_handler, '_service', None)
+        
+        table = create_table(table_name)
+        routines, errors = routine_handler.get_routine_service().bulk_create_routines(
+            [make_routine(index) for index in range(size)]
+        )
+        assert not errors
+        yield size, [routine.id for routine in routines]
+        table.delete()
+
+def create_for_delete(ids, rng):
+    # A rotina removida é criada fora da medição
+    routine = routine_handler.get_routine_service().create_routine(make_routine(rng.randrange(10000)))
+    return {"httpMethod": "DELETE", "pathParameters": {"id": routine.id}}
+
+# Operação: (monta o evento, status esperado, fração de ITERATIONS)
+# As leituras vêm antes das escritas, para medi-las no tamanho anunciado
+OPERATIONS = {
+    "list_page": (lambda ids, rng: {"httpMethod": "GET", "queryStringParameters": {"limit": "100"}}, 200, 1),
+    "list_all": (lambda ids, rng: {"httpMethod": "GET"}, 200, 0.2),
+    "get": (lambda ids, rng: {"httpMethod": "GET", "pathParameters": {"id": rng.choice(ids)}}, 200, 1),
+    "get_many": (lambda ids, rng: {"httpMethod": "GET", "queryStringParameters": {"ids": ",".join(rng.sample(ids, min(50, len(ids))))}}, 200, 1),
+    "query_status": (lambda ids, rng: {"httpMethod": "GET", "queryStringParameters": {"status": rng.choice(STATUSES)}}, 200, 0.5),
+    "query_schedule": (lambda ids, rng: {"httpMethod": "GET", "queryStringParameters": {"schedule": f"{rng.randrange(24):02d}"}}, 200, 1),
+    "create": (lambda ids, rng: {"httpMethod": "POST", "body": json.dumps(make_routine(rng.randrange(10000)))}, 201, 1),
+    "bulk_create": (lambda ids, rng: {"httpMethod": "POST", "body": json.dumps([make_routine(rng.randrange(10000)) for _ in range(25)])}, 201, 0.5),
+    "update": (lambda ids, rng: {"httpMethod": "PUT", "pathParameters": {"id": rng.choice(ids)}, "body": json.dumps({"status": rng.choice(STATUSES)})}, 200, 1),
+    "delete": (create_for_delete, 204, 1),
+}
+
+def load_baseline():
+    if not BASELINE_PATH:
+        return None
+    with open(BASELINE_PATH) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("backend") != BACKEND:
+        print(f"\nBaseline gerado com {baseline.get('backend')}, não comparável com {BACKEND}")
+        return None
+    return baseline.get("results", {})
+
+baseline = load_baseline()
+
+@pytest.mark.parametrize("operation", list(OPERATIONS))
+def test_operation_latency(routines_table, operation):
+    size, ids = routines_table
+    make_event, expected_status, share = OPERATIONS[operation]
+    rng = random.Random(f"{size}-{operation}")
+    
+    # Uma chamada de aquecimento, fora das medições
+    lambda_handler(make_event(ids, rng), None)
+    
+    durations = []
+    for _ in range(max(3, int(ITERATIONS * share))):
+        event = make_event(ids, rng)
+        start = time.perf_counter()
+        response = lambda_handler(event, None)
+        durations.append((time.perf_counter() - start) * 1000)
+        assert response['statusCode'] == expected_status, response['body'][:500]
+    
+    stats = summarize(durations)
+    results.setdefault(str(size), {})[operation] = stats
+    print(f"\n{BACKEND}, {size} itens, {operation}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms ({stats['runs']} execuções)")
+    
+    previous = (baseline or {}).get(str(size), {}).get(operation)
+    if previous:
+        # Folga mínima de 1 ms para operações rápidas, em que o ruído domina
+        limit = max(previous['p50_ms'] * TOLERANCE, previous['p50_ms'] + 1.0)
+        assert stats['p50_ms'] <= limit, (
+            f"Regressão em {operation} ({size} itens): p50 {stats['p50_ms']:.2f} ms, "
+            f"baseline {previous['p50_ms']:.2f} ms (limite {limit:.2f} ms)"
+        )
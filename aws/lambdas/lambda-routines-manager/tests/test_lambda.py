@@ -1,10 +1,25 @@
+import copy
 import json
+import logging
 import os
 import boto3
+import pytest
 from moto import mock_aws
+import math
+import time
 from src.handlers.routine_handler import lambda_handler
+from src.services.routine_service import RoutineService, VersionConflictError
+from src.models.routine import Routine
+from src.utils import response as response_module
+from src.utils.response import build_response
+from src.utils import event_logging
+from src.utils.decimal_encoder import DecimalEncoder
+from src.handlers import routine_handler
+from src.services import routine_service
 from botocore.exceptions import ClientError
 from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
 
 # Configurar variáveis de ambiente
 os.environ['ROUTINES_TABLE'] = 'Routines'
@@ -21,7 +36,32 @@ def setup_dynamodb():
                 {'AttributeName': 'id', 'KeyType': 'HASH'}
             ],
             AttributeDefinitions=[
-                {'AttributeName': 'id', 'AttributeType': 'S'}
+                {'AttributeName': 'id', 'AttributeType': 'S'},
+                {'AttributeName': 'status', 'AttributeType': 'S'},
+                {'AttributeName': 'frequency', 'AttributeType': 'S'},
+                {'AttributeName': 'schedule_bucket', 'AttributeType': 'S'},
+                {'AttributeName': 'schedule', 'AttributeType': 'S'}
+            ],
+            # Mesmos índices do template.yaml
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': 'StatusIndex',
+                    'KeySchema': [{'AttributeName': 'status', 'KeyType': 'HASH'}],
+                    'Projection': {'ProjectionType': 'ALL'}
+                },
+                {
+                    'IndexName': 'FrequencyIndex',
+                    'KeySchema': [{'AttributeName': 'frequency', 'KeyType': 'HASH'}],
+                    'Projection': {'ProjectionType': 'ALL'}
+                },
+                {
+                    'IndexName': 'ScheduleIndex',
+                    'KeySchema': [
+                        {'AttributeName': 'schedule_bucket', 'KeyType': 'HASH'},
+                        {'AttributeName': 'schedule', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'}
+                }
             ],
             BillingMode='PAY_PER_REQUEST'
         )
@@ -235,6 +275,744 @@ def test_delete_routine():
     
     return response
 
+def populate_routines(table, count):
+    # Itens de ~300 bytes: 10k itens passam do limite de 1 MB por scan
+    with table.batch_writer() as batch:
+        for i in range(count):
+            batch.put_item(Item={
+                'id': f"routine-{i:05d}",
+                'name': f"Rotina {i}",
+                'description': "x" * 200,
+                'status': "pending",
+                'frequency': "daily",
+                'priority': "medium",
+                'tags': ["benchmark"],
+                'estimated_duration': 30
+            })
+
+@mock_aws
+def test_list_routines_paginates_large_table():
+    table = setup_dynamodb()
+    populate_routines(table, 10000)
+    service = RoutineService()
+    
+    # Um único scan para em 1 MB
+    assert 'LastEvaluatedKey' in table.scan()
+    
+    start = time.perf_counter()
+    sequential = service.list_routines(segments=1)
+    sequential_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    parallel = service.list_routines(segments=4)
+    parallel_time = time.perf_counter() - start
+    
+    print(f"\nScan sequencial: {sequential_time:.2f}s, scan paralelo (4 segmentos): {parallel_time:.2f}s")
+    assert len(sequential) == 10000
+    assert {r.id for r in parallel} == {r.id for r in sequential}
+    
+    pages = list(service.iter_routine_pages(page_size=2500))
+    assert sum(len(page) for page in pages) == 10000
+    assert all(len(page) <= 2500 for page in pages)
+
+@mock_aws
+def test_list_routines_with_next_token():
+    table = setup_dynamodb()
+    populate_routines(table, 10000)
+    
+    ids = set()
+    next_token = None
+    requests = 0
+    while True:
+        params = {'limit': '1000'}
+        if next_token:
+            params['next_token'] = next_token
+        response = lambda_handler({"httpMethod": "GET", "queryStringParameters": params}, None)
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert len(body['data']) <= 1000
+        ids.update(r['id'] for r in body['data'])
+        requests += 1
+        next_token = body['next_token']
+        if not next_token:
+            break
+    
+    assert len(ids) == 10000
+    assert requests >= 10
+
+@mock_aws
+def test_list_routines_invalid_pagination_parameters():
+    setup_dynamodb()
+    
+    for params in ({'next_token': 'not-a-token'}, {'limit': '0'}, {'limit': 'abc'}):
+        response = lambda_handler({"httpMethod": "GET", "queryStringParameters": params}, None)
+        assert response['statusCode'] == 400
+
+@mock_aws
+def test_warm_invocations_reuse_service():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    routine_id = json.loads(create_response['body'])['data']['id']
+    event = {"httpMethod": "GET", "pathParameters": {"id": routine_id}}
+    
+    def mean_invocation_time(invocations, reset):
+        total = 0.0
+        for _ in range(invocations):
+            if reset:
+                # Comportamento anterior: um RoutineService (e boto3.resource) por invocação
+                routine_handler._service = None
+                routine_service._dynamodb = None
+            start = time.perf_counter()
+            response = lambda_handler(event, None)
+            total += time.perf_counter() - start
+            assert response['statusCode'] == 200
+        return total / invocations
+    
+    cold = mean_invocation_time(100, reset=True)
+    service = routine_handler.get_routine_service()
+    warm = mean_invocation_time(1000, reset=False)
+    
+    print(f"\nPor invocação: {cold * 1000:.2f} ms recriando o recurso, {warm * 1000:.2f} ms reutilizando (1000 invocações)")
+    assert routine_handler.get_routine_service() is service
+    assert warm < cold
+
+def count_dynamodb_requests(service):
+    """Conta as chamadas à API do DynamoDB feitas pelo cliente do serviço"""
+    calls = []
+    service.table.meta.client.meta.events.register(
+        'before-call.dynamodb.*',
+        lambda model, **kwargs: calls.append(model.name)
+    )
+    return calls
+
+@mock_aws
+def test_update_and_delete_use_one_write():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    routine_id = json.loads(create_response['body'])['data']['id']
+    created_at = json.loads(create_response['body'])['data']['created_at']
+    service = RoutineService()
+    calls = count_dynamodb_requests(service)
+    
+    updated = service.update_routine(routine_id, {"name": "Nova", "description": "Atualizada"})
+    assert updated.name == "Nova"
+    assert updated.created_at.isoformat() == created_at
+    # Uma escrita (a rotina e a versão da coleção na mesma transação) e a releitura da rotina
+    assert calls == ['TransactWriteItems', 'GetItem']
+    
+    assert service.delete_routine(routine_id) is True
+    assert calls == ['TransactWriteItems', 'GetItem', 'TransactWriteItems']
+    
+    # Rotina inexistente: a falha da condição vira None/False, sem requisição extra
+    calls.clear()
+    assert service.update_routine(routine_id, {"name": "Nova", "description": "Atualizada"}) is None
+    assert service.delete_routine(routine_id) is False
+    assert calls == ['TransactWriteItems', 'TransactWriteItems']
+    assert service.get_routine(routine_id) is None
+
+@mock_aws
+def test_update_and_delete_missing_routine_return_404():
+    setup_dynamodb()
+    
+    update_event = {
+        "httpMethod": "PUT",
+        "pathParameters": {"id": "missing"},
+        "body": json.dumps({"name": "Rotina", "description": "Descrição"})
+    }
+    assert lambda_handler(update_event, None)['statusCode'] == 404
+    
+    delete_event = {"httpMethod": "DELETE", "pathParameters": {"id": "missing"}}
+    assert lambda_handler(delete_event, None)['statusCode'] == 404
+
+@mock_aws
+def test_partial_update_only_writes_changed_fields():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    created = json.loads(create_response['body'])['data']
+    assert created['version'] == 1
+    service = RoutineService()
+    sent = []
+    service.table.meta.client.meta.events.register(
+        'provide-client-params.dynamodb.TransactWriteItems',
+        lambda params, **kwargs: sent.extend(action['Update'] for action in params['TransactItems'][:-1] if 'Update' in action)
+    )
+    
+    # Dois agentes alterando campos diferentes, sem ler a rotina antes: nenhum sobrescreve o outro
+    service.update_routine(created['id'], {"status": "in_progress"})
+    updated = service.update_routine(created['id'], {"priority": "low"})
+    
+    assert updated.status == "in_progress"
+    assert updated.priority == "low"
+    assert updated.name == created['name']
+    assert updated.tags == created['tags']
+    assert updated.version == 3
+    assert sorted(sent[1]['ExpressionAttributeNames'].values()) == ["id", "priority", "updated_at", "version"]
+    
+    with pytest.raises(ValueError):
+        service.update_routine(created['id'], {"id": "outro", "version": 7})
+    with pytest.raises(ValueError):
+        service.update_routine(created['id'], {"frequency": "hourly"})
+
+@mock_aws
+def test_update_with_stale_version_returns_409():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    routine_id = json.loads(create_response['body'])['data']['id']
+    
+    def update(fields):
+        return lambda_handler({
+            "httpMethod": "PUT",
+            "pathParameters": {"id": routine_id},
+            "body": json.dumps(fields)
+        }, None)
+    
+    response = update({"status": "completed", "version": 1})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['data']['version'] == 2
+    
+    # Outro cliente ainda com a versão 1: conflito, com a versão atual para tentar de novo
+    response = update({"status": "cancelled", "version": 1})
+    assert response['statusCode'] == 409
+    assert json.loads(response['body'])['current_version'] == 2
+    
+    response = update({"status": "cancelled", "version": 2})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['data']['status'] == "cancelled"
+    
+    assert update({"status": "cancelled", "version": "x"})['statusCode'] == 400
+    assert update({"status": "cancelled", "version": 1})['statusCode'] == 409
+
+@mock_aws
+def test_update_legacy_routine_without_version():
+    table = setup_dynamodb()
+    table.put_item(Item={"id": "legado", "name": "Rotina", "description": "Sem versão", "frequency": "daily"})
+    service = RoutineService()
+    
+    assert service.get_routine("legado").version == 0
+    updated = service.update_routine("legado", {"status": "completed"}, expected_version=0)
+    assert updated.version == 1
+    with pytest.raises(VersionConflictError):
+        service.update_routine("legado", {"status": "pending"}, expected_version=0)
+
+@mock_aws
+def test_list_routines_conditional_get():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    routine_id = json.loads(create_response['body'])['data']['id']
+    service = routine_handler.get_routine_service()
+    calls = count_dynamodb_requests(service)
+    
+    response = lambda_handler({"httpMethod": "GET"}, None)
+    assert response['statusCode'] == 200
+    etag = response['headers']['ETag']
+    assert response['headers']['Last-Modified'].endswith(" GMT")
+    assert len(json.loads(response['body'])['data']) == 1
+    
+    # Nada mudou: 304 sem body, e sem scan (só a leitura da versão da coleção)
+    calls.clear()
+    response = lambda_handler({"httpMethod": "GET", "headers": {"if-none-match": etag}}, None)
+    assert response['statusCode'] == 304
+    assert response['body'] == ''
+    assert response['headers']['ETag'] == etag
+    assert calls == ['GetItem']
+    
+    # Mapping template: cabeçalhos em params.header
+    event = {"httpMethod": "GET", "params": {"header": {"If-None-Match": f'W/{etag}'}}}
+    assert lambda_handler(event, None)['statusCode'] == 304
+    
+    # Cada filtro é uma representação diferente
+    filtered = lambda_handler({"httpMethod": "GET", "queryStringParameters": {"status": "pending"}}, None)
+    assert filtered['headers']['ETag'] != etag
+    
+    lambda_handler({
+        "httpMethod": "PUT",
+        "pathParameters": {"id": routine_id},
+        "body": json.dumps({"status": "completed"})
+    }, None)
+    response = lambda_handler({"httpMethod": "GET", "headers": {"If-None-Match": etag}}, None)
+    assert response['statusCode'] == 200
+    assert response['headers']['ETag'] != etag
+
+@mock_aws
+def test_get_routine_conditional_get():
+    setup_dynamodb()
+    create_response = test_create_routine()
+    routine_id = json.loads(create_response['body'])['data']['id']
+    event = {"httpMethod": "GET", "pathParameters": {"id": routine_id}}
+    
+    etag = lambda_handler(event, None)['headers']['ETag']
+    response = lambda_handler({**event, "headers": {"If-None-Match": etag}}, None)
+    assert response['statusCode'] == 304
+    
+    lambda_handler({"httpMethod": "PUT", "pathParameters": {"id": routine_id}, "body": json.dumps({"priority": "low"})}, None)
+    assert lambda_handler({**event, "headers": {"If-None-Match": etag}}, None)['statusCode'] == 200
+
+@mock_aws
+def test_collection_version_item_is_hidden():
+    setup_dynamodb()
+    test_create_routine()
+    service = routine_handler.get_routine_service()
+    assert service.get_collection_version()[0] == 1
+    
+    assert len(service.list_routines()) == 1
+    assert len(service.list_routines_page(10)[0]) == 1
+    assert service.get_routine(routine_service.COLLECTION_VERSION_ID) is None
+    assert service.batch_get_routines([routine_service.COLLECTION_VERSION_ID]) == ([], [routine_service.COLLECTION_VERSION_ID])
+    assert service.delete_routine(routine_service.COLLECTION_VERSION_ID) is False
+    with pytest.raises(ValueError):
+        service.create_routine({"id": routine_service.COLLECTION_VERSION_ID, "name": "Rotina", "description": "Reservada"})
+
+@mock_aws
+def test_collection_version_is_written_with_each_mutation(monkeypatch):
+    setup_dynamodb()
+    service = routine_handler.get_routine_service()
+    routine_id = json.loads(test_create_routine()['body'])['data']['id']
+    assert service.get_collection_version()[0] == 1
+    
+    put = {"httpMethod": "PUT", "pathParameters": {"id": routine_id}, "body": json.dumps({"priority": "high"})}
+    assert lambda_handler(put, None)['statusCode'] == 200
+    assert service.get_collection_version()[0] == 2
+    
+    # Nada gravado, nada incrementado
+    missing = {**put, "pathParameters": {"id": "inexistente"}}
+    assert lambda_handler(missing, None)['statusCode'] == 404
+    conflict = {**put, "body": json.dumps({"priority": "low", "version": 1})}
+    assert lambda_handler(conflict, None)['statusCode'] == 409
+    assert service.get_collection_version()[0] == 2
+    
+    # Lote com id repetido: uma transação por bloco de 99 rotinas
+    items = [{"id": f"lote-{i % 150}", "name": f"Rotina {i}", "description": "Lote"} for i in range(160)]
+    assert lambda_handler({"httpMethod": "POST", "body": json.dumps(items)}, None)['statusCode'] == 201
+    assert service.get_collection_version()[0] == 4
+    assert service.get_routine("lote-0").name == "Rotina 150"
+    
+    assert lambda_handler({"httpMethod": "DELETE", "pathParameters": {"id": routine_id}}, None)['statusCode'] == 204
+    assert service.get_collection_version()[0] == 5
+    
+    # Se a transação falha, nem a rotina nem a versão da coleção mudam
+    client = service.table.meta.client
+    def failing_transaction(**kwargs):
+        raise ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'falha'}}, 'TransactWriteItems')
+    monkeypatch.setattr(client, 'transact_write_items', failing_transaction)
+    response = lambda_handler({"httpMethod": "POST", "body": json.dumps({"name": "Falha", "description": "Não gravada"})}, None)
+    assert response['statusCode'] == 500
+    monkeypatch.undo()
+    assert service.get_collection_version()[0] == 5
+    assert len(service.list_routines()) == 150
+
+@mock_aws
+def test_routine_pages_skip_the_collection_version_item():
+    table = setup_dynamodb()
+    service = RoutineService()
+    for i in range(3):
+        service.create_routine({"id": f"pagina-{i}", "name": f"Rotina {i}", "description": "Paginada"})
+    assert len(table.scan()['Items']) == 4
+    
+    # Cada página tem `limit` rotinas, mesmo quando o scan também leu o item da versão
+    ids, next_token = [], None
+    while True:
+        routines, next_token = service.list_routines_page(1, next_token)
+        if not next_token:
+            assert len(routines) <= 1
+            ids.extend(routine.id for routine in routines)
+            break
+        assert len(routines) == 1
+        ids.extend(routine.id for routine in routines)
+    assert sorted(ids) == ["pagina-0", "pagina-1", "pagina-2"]
+
+@mock_aws
+def test_bulk_create_routines_reports_invalid_items():
+    setup_dynamodb()
+    
+    event = {
+        "httpMethod": "POST",
+        "body": json.dumps({"routines": [
+            {"name": "Leitura", "description": "20 páginas", "frequency": "daily"},
+            {"name": "Sem descrição"},
+            {"name": "Academia", "description": "Treino", "frequency": "sometimes"},
+            {"id": "fixed-id", "name": "Meditação", "description": "10 minutos", "frequency": "weekly"}
+        ]})
+    }
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 207
+    
+    body = json.loads(response['body'])
+    assert [r['name'] for r in body['data']] == ["Leitura", "Meditação"]
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    assert RoutineService().get_routine("fixed-id").name == "Meditação"
+    
+    # Nenhum item válido
+    event["body"] = json.dumps([{"name": "Sem descrição"}])
+    assert lambda_handler(event, None)['statusCode'] == 400
+
+@mock_aws
+def test_index_keys_must_be_non_empty_strings():
+    setup_dynamodb()
+    
+    def create(fields):
+        return lambda_handler({"httpMethod": "POST", "body": json.dumps(fields)}, None)
+    
+    # O moto não confere o tipo das chaves dos GSIs; no DynamoDB real seriam 500
+    assert create({"name": "a", "description": "b", "schedule": 8})['statusCode'] == 400
+    assert create({"name": "a", "description": "b", "status": 1})['statusCode'] == 400
+    assert create({"name": "a", "description": "b", "status": ""})['statusCode'] == 400
+    assert create({"name": "a", "description": "b", "schedule": None})['statusCode'] == 201
+    
+    # Em lote, o item inválido vira um erro do item, sem abortar os demais
+    response = lambda_handler({
+        "httpMethod": "POST",
+        "body": json.dumps({"routines": [
+            {"name": "Leitura", "description": "20 páginas", "schedule": "08:00"},
+            {"name": "Corrida", "description": "5 km", "schedule": 8},
+            {"name": "Inglês", "description": "Aula", "status": 3}
+        ]})
+    }, None)
+    assert response['statusCode'] == 207
+    body = json.loads(response['body'])
+    assert [r['name'] for r in body['data']] == ["Leitura"]
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    
+    routine_id = body['data'][0]['id']
+    for fields in ({"schedule": 8}, {"status": 2}, {"frequency": ""}):
+        response = lambda_handler({
+            "httpMethod": "PUT",
+            "pathParameters": {"id": routine_id},
+            "body": json.dumps(fields)
+        }, None)
+        assert response['statusCode'] == 400
+    assert RoutineService().get_routine(routine_id).schedule == "08:00"
+
+def test_schedule_bucket_ignores_non_strings():
+    assert routine_service.schedule_bucket("8:30") == "08"
+    assert routine_service.schedule_bucket(8) is None
+    assert routine_service.schedule_bucket(None) is None
+
+def skip_moto_transaction_backup(monkeypatch):
+    """
+    O moto copia a tabela inteira para cada ação de um TransactWriteItems (para
+    desfazer a transação se ela falhar), o que torna as escritas proporcionais
+    ao tamanho da tabela. No DynamoDB o custo não depende dela: nos testes de
+    volume, a cópia é dispensada
+    """
+    from moto.dynamodb import models as dynamodb_models
+    deepcopy = copy.deepcopy
+    def copy_items_only(value, *args):
+        return value if isinstance(value, dynamodb_models.Table) else deepcopy(value, *args)
+    monkeypatch.setattr(dynamodb_models, 'copy', SimpleNamespace(deepcopy=copy_items_only))
+
+@mock_aws
+def test_bulk_create_throughput(monkeypatch):
+    setup_dynamodb()
+    skip_moto_transaction_backup(monkeypatch)
+    items = [
+        {"name": f"Rotina {i}", "description": "Importada", "frequency": "daily", "tags": ["importação"]}
+        for i in range(10000)
+    ]
+    service = routine_handler.get_routine_service()
+    calls = count_dynamodb_requests(service)
+    
+    start = time.perf_counter()
+    for item in items[:500]:
+        response = lambda_handler({"httpMethod": "POST", "body": json.dumps(item)}, None)
+        assert response['statusCode'] == 201
+    single_rate = 500 / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    response = lambda_handler({"httpMethod": "POST", "body": json.dumps(items)}, None)
+    bulk_rate = 10000 / (time.perf_counter() - start)
+    
+    assert response['statusCode'] == 201
+    assert len(json.loads(response['body'])['data']) == 10000
+    # 500 criações individuais e os 10k itens em transações de 99 rotinas
+    assert calls.count('TransactWriteItems') == 500 + math.ceil(10000 / 99)
+    print(f"\nPOST individual: {single_rate:.0f} rotinas/s, POST em lote: {bulk_rate:.0f} rotinas/s (10k itens, {math.ceil(10000 / 99)} TransactWriteItems)")
+
+@mock_aws
+def test_batch_get_routines_by_ids():
+    table = setup_dynamodb()
+    populate_routines(table, 300)
+    ids = [f"routine-{i:05d}" for i in range(0, 300, 2)]
+    
+    event = {"httpMethod": "GET", "queryStringParameters": {"ids": ",".join(ids + ["missing", ids[0]])}}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert [r['id'] for r in body['data']] == ids
+    assert body['missing'] == ["missing"]
+    
+    event["queryStringParameters"] = {"ids": " , "}
+    assert lambda_handler(event, None)['statusCode'] == 400
+
+@mock_aws
+def test_batch_get_unprocessed_keys_are_retried(monkeypatch):
+    table = setup_dynamodb()
+    populate_routines(table, 150)
+    service = RoutineService()
+    original = service.dynamodb.batch_get_item
+    attempts = []
+    
+    def flaky_batch_get_item(RequestItems):
+        # Primeira chamada de cada lote: devolve metade das chaves como não processadas
+        keys = RequestItems['Routines']['Keys']
+        attempts.append(len(keys))
+        if len(attempts) % 2 == 1 and len(keys) > 1:
+            half = len(keys) // 2
+            response = original(RequestItems={'Routines': {'Keys': keys[:half]}})
+            response['UnprocessedKeys'] = {'Routines': {'Keys': keys[half:]}}
+            return response
+        return original(RequestItems=RequestItems)
+    
+    monkeypatch.setattr(service.dynamodb, 'batch_get_item', flaky_batch_get_item)
+    monkeypatch.setattr(routine_service, 'BATCH_GET_BACKOFF_SECONDS', 0)
+    routines, missing = service.batch_get_routines([f"routine-{i:05d}" for i in range(150)])
+    
+    assert len(routines) == 150 and not missing
+    # Lotes de 100 e 50 chaves, cada um com uma nova tentativa
+    assert attempts == [100, 50, 50, 25]
+
+@mock_aws
+def test_batch_get_vs_per_item_loop():
+    table = setup_dynamodb()
+    populate_routines(table, 1000)
+    service = RoutineService()
+    calls = count_dynamodb_requests(service)
+    ids = [f"routine-{i:05d}" for i in range(0, 1000, 2)]
+    
+    start = time.perf_counter()
+    looped = [service.get_routine(routine_id) for routine_id in ids]
+    loop_time = time.perf_counter() - start
+    loop_requests = len(calls)
+    
+    start = time.perf_counter()
+    batched, missing = service.batch_get_routines(ids)
+    batch_time = time.perf_counter() - start
+    batch_requests = len(calls) - loop_requests
+    
+    print(f"\n500 rotinas: loop get_item {loop_time:.2f}s ({loop_requests} requisições), "
+          f"batch_get_item {batch_time:.2f}s ({batch_requests} requisições)")
+    assert [r.id for r in batched] == [r.id for r in looped]
+    assert not missing
+    assert batch_requests == 5
+
+@mock_aws
+def test_query_routines_by_filters():
+    setup_dynamodb()
+    service = RoutineService()
+    for name, status, frequency, schedule in [
+        ("Corrida", "pending", "daily", "08:00"),
+        ("Leitura", "pending", "weekly", "08:30"),
+        ("Inglês", "completed", "daily", "20:00"),
+        ("Sem horário", None, "monthly", None)
+    ]:
+        service.create_routine({
+            "name": name, "description": name, "status": status,
+            "frequency": frequency, "schedule": schedule
+        })
+    
+    def names(params):
+        response = lambda_handler({"httpMethod": "GET", "queryStringParameters": params}, None)
+        assert response['statusCode'] == 200
+        return sorted(r['name'] for r in json.loads(response['body'])['data'])
+    
+    assert names({"status": "pending"}) == ["Corrida", "Leitura"]
+    assert names({"frequency": "daily"}) == ["Corrida", "Inglês"]
+    assert names({"schedule": "08:00"}) == ["Corrida"]
+    assert names({"schedule": "08"}) == ["Corrida", "Leitura"]
+    assert names({"status": "pending", "frequency": "weekly"}) == ["Leitura"]
+    assert names({"schedule": "08", "status": "pending", "frequency": "daily"}) == ["Corrida"]
+    
+    response = lambda_handler({"httpMethod": "GET", "queryStringParameters": {"schedule": "25:00"}}, None)
+    assert response['statusCode'] == 400
+    
+    # Atualizar removendo o horário tira a rotina do ScheduleIndex
+    corrida = service.query_by_schedule("08:00")[0]
+    service.update_routine(corrida.id, {"name": "Corrida", "description": "Corrida", "schedule": None})
+    assert names({"schedule": "08"}) == ["Leitura"]
+
+def estimate_read_units(items):
+    """
+    Estima as RCUs (leitura eventualmente consistente: 0,5 por 4 KB) pelo
+    tamanho dos itens, já que o moto sempre reporta 1 unidade consumida
+    """
+    size = sum(len(json.dumps(item, default=str).encode('utf-8')) for item in items)
+    return math.ceil(size / 4096) * 0.5
+
+@pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason="benchmark lento (50k itens); use RUN_BENCHMARKS=1")
+@mock_aws
+def test_query_vs_scan_large_table():
+    table = setup_dynamodb()
+    statuses = ["pending", "in_progress", "completed", "cancelled"]
+    frequencies = ["daily", "weekly", "monthly", "weekdays", "weekends"]
+    with table.batch_writer() as batch:
+        for i in range(50000):
+            batch.put_item(Item=routine_service.to_item(Routine(
+                id=f"routine-{i:05d}",
+                name=f"Rotina {i}",
+                description="Rotina de teste",
+                status=statuses[i % 4],
+                frequency=frequencies[i % 5],
+                schedule=f"{i % 24:02d}:{(i % 2) * 30:02d}"
+            )))
+    service = RoutineService()
+    
+    start = time.perf_counter()
+    scanned = service.list_routines()
+    scan_matches = [r for r in scanned if r.status == "pending"]
+    scan_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    queried = service.query_by_status("pending")
+    query_time = time.perf_counter() - start
+    
+    scan_units = estimate_read_units(r.to_dict() for r in scanned)
+    query_units = estimate_read_units(r.to_dict() for r in queried)
+    print(f"\n50k rotinas, status=pending: scan {scan_time:.2f}s (~{scan_units:.0f} RCUs), "
+          f"query {query_time:.2f}s (~{query_units:.0f} RCUs)")
+    
+    assert {r.id for r in queried} == {r.id for r in scan_matches}
+    assert len(queried) == 12500
+    assert query_units < scan_units / 3
+    assert query_time < scan_time
+
+def test_routine_dates_are_parsed_lazily():
+    item = {
+        "id": "r1", "name": "Corrida", "description": "5 km",
+        "start_date": "2023-04-05T08:00:00", "created_at": "2023-04-05T12:00:00"
+    }
+    routine = Routine.from_dict(item)
+    
+    # to_dict devolve as strings sem convertê-las
+    assert routine.to_dict()['start_date'] == "2023-04-05T08:00:00"
+    assert isinstance(routine._start_date, str)
+    
+    assert routine.start_date == datetime(2023, 4, 5, 8, 0)
+    assert routine.to_dict()['start_date'] == "2023-04-05T08:00:00"
+    assert routine.to_item() == {key: value for key, value in routine.to_dict().items() if value is not None}
+    
+    invalid = Routine.from_dict({"name": "Rotina", "description": "Data inválida", "end_date": "amanhã"})
+    with pytest.raises(ValueError):
+        invalid.validate()
+
+def test_routine_round_trip_micro_benchmark():
+    item = {
+        "id": "r1", "name": "Corrida", "description": "5 km", "status": "pending",
+        "schedule": "08:00", "frequency": "daily", "priority": "high", "tags": ["saúde"],
+        "estimated_duration": 30, "version": 1, "start_date": "2023-04-05T08:00:00", "end_date": "2023-04-05T08:30:00",
+        "created_at": "2023-04-05T12:00:00", "updated_at": "2023-04-05T12:00:00"
+    }
+    
+    start = time.perf_counter()
+    for _ in range(100000):
+        result = Routine.from_dict(item).to_dict()
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n100k from_dict/to_dict: {elapsed:.2f}s ({elapsed * 10:.2f} µs por ida e volta)")
+    assert result == item
+
+def routine_list_body(count):
+    # Itens como vêm do DynamoDB: números em Decimal
+    routines = [
+        Routine.from_dict({
+            "id": f"routine-{i:05d}", "name": f"Rotina {i}", "description": "Exercícios pela manhã",
+            "tags": ["saúde", "exercício"], "estimated_duration": Decimal(30),
+            "start_date": "2023-04-05T08:00:00", "created_at": "2023-04-05T12:00:00"
+        })
+        for i in range(count)
+    ]
+    return {'message': "Successfully retrieved routines at GET /routines", 'data': [r.to_dict() for r in routines]}
+
+def test_response_serializer_is_byte_compatible():
+    body = routine_list_body(3)
+    response = build_response(200, body['message'], body['data'])
+    assert response['body'] == json.dumps(body, cls=DecimalEncoder)
+    
+    if response_module.orjson is not None:
+        assert json.loads(response_module.dumps_orjson(body)) == json.loads(response['body'])
+
+@pytest.mark.parametrize("count", [1000, 10000])
+def test_response_serializer_benchmark(count):
+    body = routine_list_body(count)
+    serializers = [("json.dumps + DecimalEncoder", lambda b: json.dumps(b, cls=DecimalEncoder))]
+    serializers += [(name, response_module.get_serializer(name)) for name in response_module.SERIALIZERS]
+    
+    print(f"\nLista com {count} rotinas:")
+    for name, serialize in serializers:
+        start = time.perf_counter()
+        for _ in range(10):
+            serialize(body)
+        print(f"  {name:<28} {(time.perf_counter() - start) / 10 * 1000:7.2f} ms")
+
+def test_event_logging_is_redacted_and_capped():
+    event = {
+        "httpMethod": "POST",
+        "headers": {"Authorization": "Bearer segredo", "Content-Type": "application/json"},
+        "body": json.dumps([{"name": f"Rotina {i}", "description": "x" * 100} for i in range(1000)]),
+        "params": {"querystring": {f"p{i}": str(i) for i in range(50)}}
+    }
+    logged = str(event_logging.EventSummary(event))
+    
+    assert "segredo" not in logged
+    assert json.loads(logged)["headers"]["Authorization"] == event_logging.REDACTED
+    assert len(logged) < 4096
+    assert "[+30 keys]" in logged
+
+def test_event_logging_sampling(caplog, monkeypatch):
+    logger = logging.getLogger("test.event_logging")
+    
+    with caplog.at_level(logging.INFO, logger="test.event_logging"):
+        monkeypatch.setattr(event_logging, "SAMPLE_RATE", 0.0)
+        event_logging.log_event(logger, {"httpMethod": "GET"})
+        assert not caplog.records
+        
+        monkeypatch.setattr(event_logging, "SAMPLE_RATE", 1.0)
+        event_logging.log_event(logger, {"httpMethod": "GET"})
+        assert caplog.records[0].getMessage() == 'Event: {"httpMethod": "GET"}'
+
+def test_failed_invocation_logs_event_outside_the_sample(caplog, monkeypatch):
+    def failing_service():
+        raise RuntimeError("falha inesperada")
+    
+    monkeypatch.setattr(event_logging, "SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(routine_handler, "get_routine_service", failing_service)
+    
+    with caplog.at_level(logging.INFO):
+        response = lambda_handler({"httpMethod": "GET", "headers": {"Authorization": "Bearer segredo"}}, None)
+    
+    assert response["statusCode"] == 500
+    errors = [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert '"httpMethod": "GET"' in errors[0]
+    assert "segredo" not in errors[0]
+    assert not [record for record in caplog.records if record.getMessage().startswith("Event:")]
+
+def test_event_logging_overhead_benchmark(caplog):
+    body = [{"name": f"Rotina {i}", "description": "Exercícios pela manhã", "tags": ["saúde"]} for i in range(10000)]
+    events = {
+        "body em string": {"httpMethod": "POST", "body": json.dumps(body)},
+        "body em dict": {"httpMethod": "POST", "body": {"routines": body}}
+    }
+    logger = logging.getLogger("benchmark.event_logging")
+    
+    def old_logging(event):
+        logger.info('Event: %s', json.dumps(event))
+        logger.info('Request body: %s', event['body'])
+    
+    def mean_time(log, event, runs=5):
+        start = time.perf_counter()
+        for _ in range(runs):
+            log(event)
+        return (time.perf_counter() - start) / runs * 1000
+    
+    print()
+    for label, event in events.items():
+        with caplog.at_level(logging.INFO, logger="benchmark.event_logging"):
+            old = mean_time(old_logging, event)
+            new = mean_time(lambda e: event_logging.log_event(logger, e), event)
+        with caplog.at_level(logging.WARNING, logger="benchmark.event_logging"):
+            disabled = mean_time(lambda e: event_logging.log_event(logger, e), event)
+        print(f"10k rotinas, {label}: anterior {old:.2f} ms, novo {new:.3f} ms, novo com INFO desligado {disabled:.4f} ms")
+        assert new < old
+
 if __name__ == "__main__":
     test_create_routine()
     test_list_routines()
@@ -1,6 +1,19 @@
-from .base_agent import BaseAgent
-from .orchestrator_agent import OrchestratorAgent
-from .specialized.task_agent import TaskAgent
-from .specialized.routine_agent import RoutineAgent
+from .base_agent import BaseAgent, get_llm
+from .session import ConversationSession
+from .streaming import TokenStreamHandler
+from .orchestrator_agent import OrchestratorAgent, get_orchestrator_agent
+from .specialized.task_agent import TaskAgent, get_task_agent
+from .specialized.routine_agent import RoutineAgent, get_routine_agent
 
-__all__ = ['BaseAgent', 'OrchestratorAgent', 'TaskAgent', 'RoutineAgent'] 
\ No newline at end of file
+__all__ = [
+    'BaseAgent',
+    'ConversationSession',
+    'TokenStreamHandler',
+    'OrchestratorAgent',
+    'TaskAgent',
+    'RoutineAgent',
+    'get_llm',
+    'get_orchestrator_agent',
+    'get_task_agent',
+    'get_routine_agent'
+]
@@ -1,47 +1,106 @@
+from functools import lru_cache
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from config.settings import get_settings
+from .memory import get_memory_strategy
+from .session import ConversationSession
 
 # Obter configurações
 settings = get_settings()
 
+@lru_cache()
+def get_llm() -> ChatOpenAI:
+    """Retorna o cliente ChatOpenAI compartilhado por todos os agentes do processo."""
+    return ChatOpenAI(
+        temperature=0.7,
+        model_name="gpt-4o-mini",
+        # Os tokens são emitidos via on_llm_new_token para o streaming do /ws
+        streaming=True,
+        openai_api_key=settings.openai_api_key,
+        openai_api_base=settings.openai_api_base
+    )
+
 class BaseAgent:
     def __init__(self, system_prompt="Você é um assistente útil e amigável. Responda de forma clara e concisa."):
-        # Inicializar o modelo de linguagem
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-4o-mini",
-            openai_api_key=settings.openai_api_key
-        )
-        
-        # Inicializar o histórico de conversa
-        self.conversation_history = [
-            SystemMessage(content=system_prompt)
-        ]
+        self.system_prompt = system_prompt
+        
+        # Inicializar o modelo de linguagem (compartilhado)
+        self.llm = get_llm()
+        
+        # Estratégia que limita o histórico enviado ao LLM (compartilhada)
+        self.memory = get_memory_strategy()
+        
+        # Sessão padrão, usada quando nenhuma sessão é informada
+        self.session = self.new_session()
     
-    def process_message(self, message):
+    @property
+    def conversation_history(self):
+        """Histórico de conversa da sessão padrão do agente."""
+        return self.session.conversation_history
+    
+    @conversation_history.setter
+    def conversation_history(self, value):
+        self.session.conversation_history = value
+    
+    def new_session(self) -> ConversationSession:
+        """Cria o estado de conversa de uma nova sessão (ex.: uma conexão WebSocket)."""
+        return ConversationSession(self.system_prompt)
+    
+    def process_message(self, message, session: ConversationSession = None):
         """
         Processa uma mensagem do usuário e retorna a resposta do agente.
         
         Args:
             message (str): A mensagem do usuário
-            
+            session (ConversationSession): Sessão da conversa; usa a sessão padrão se omitida
+        
         Returns:
             str: A resposta do agente
         """
+        session = session or self.session
+        
         # Adicionar a mensagem do usuário ao histórico
-        self.conversation_history.append(HumanMessage(content=message))
+        session.conversation_history.append(HumanMessage(content=message))
+        self.memory.compact(session)
         
         # Obter resposta do modelo
-        response = self.llm.invoke(self.conversation_history)
+        response = self.llm.invoke(session.conversation_history)
         response_text = response.content
         
         # Adicionar a resposta ao histórico
-        self.conversation_history.append(AIMessage(content=response_text))
+        session.conversation_history.append(AIMessage(content=response_text))
         
         return response_text
     
+    def _convert_chat_history(self, chat_history) -> list:
+        """
+        Converte o histórico de chat recebido para o formato do LangChain.
+        
+        Args:
+            chat_history (list): Mensagens do LangChain ou dicionários com 'role' e 'content'
+        
+        Returns:
+            list: Mensagens humanas e do assistente (as mensagens do sistema já estão no prompt)
+        """
+        langchain_history = []
+        if chat_history:
+            for msg in chat_history:
+                # Verificar o tipo de mensagem
+                if isinstance(msg, HumanMessage):
+                    langchain_history.append(msg)
+                elif isinstance(msg, AIMessage):
+                    langchain_history.append(msg)
+                elif isinstance(msg, SystemMessage):
+                    # Ignorar mensagens do sistema, pois já estão no prompt
+                    continue
+                elif isinstance(msg, dict):
+                    # Se for um dicionário, converter para o formato apropriado
+                    if msg.get("role") == "user":
+                        langchain_history.append(HumanMessage(content=msg.get("content", "")))
+                    elif msg.get("role") == "assistant":
+                        langchain_history.append(AIMessage(content=msg.get("content", "")))
+        return langchain_history
+    
     def reset_conversation(self):
         """Reseta o histórico de conversa, mantendo apenas a mensagem do sistema."""
-        system_message = self.conversation_history[0]
-        self.conversation_history = [system_message] 
\ No newline at end of file
+        self.session.reset()
@@ -0,0 +1,125 @@
+import logging
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+from config.settings import get_settings
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+TASK_ROUTE = "task"
+ROUTINE_ROUTE = "routine"
+
+# Padrões (sobre o texto em minúsculas e sem acentos) e seus pesos
+TASK_PATTERNS: List[Tuple[str, float]] = [
+    (r"\btarefas?\b", 1.0),
+    (r"\btasks?\b", 1.0),
+    # Só as formas em inglês: "todo"/"todos" sozinhos são "tudo/todos" em português
+    (r"\b(to-dos?|todo ?lists?)\b", 0.8),
+    (r"\bpendencias?\b", 0.6),
+]
+
+ROUTINE_PATTERNS: List[Tuple[str, float]] = [
+    (r"\brotinas?\b", 1.0),
+    (r"\broutines?\b", 1.0),
+    (r"\bhabitos?\b", 0.7),
+    (r"\b(diariamente|semanalmente|mensalmente|todo dia|todos os dias|toda semana)\b", 0.5),
+]
+
+class RoutingDecision(NamedTuple):
+    """Resultado da classificação: rota (ou None), confiança (0-1) e o motivo."""
+    route: Optional[str]
+    confidence: float
+    reason: str
+
+class IntentRouter:
+    """
+    Classificador local por palavras-chave que decide entre o agente de tarefas
+    e o de rotinas sem chamar o LLM.
+    
+    Quando a confiança fica abaixo de `min_confidence`, o orquestrador segue
+    pelo roteamento via LLM. O router também estima o tempo da etapa de
+    roteamento do LLM (média móvel), para registrar quanto cada atalho economiza.
+    """
+    
+    def __init__(self, min_confidence: float = 0.8):
+        self.min_confidence = min_confidence
+        self._task_patterns = [(re.compile(pattern), weight) for pattern, weight in TASK_PATTERNS]
+        self._routine_patterns = [(re.compile(pattern), weight) for pattern, weight in ROUTINE_PATTERNS]
+        self._lock = threading.Lock()
+        self.llm_hop_seconds: Optional[float] = None
+        self.shortcuts = 0
+        self.time_saved_seconds = 0.0
+    
+    def _normalize(self, message: str) -> str:
+        text = unicodedata.normalize("NFKD", message.lower())
+        return "".join(char for char in text if not unicodedata.combining(char))
+    
+    def _score(self, text: str, patterns) -> Tuple[float, List[str]]:
+        score = 0.0
+        matches = []
+        for pattern, weight in patterns:
+            match = pattern.search(text)
+            if match:
+                score += weight
+                matches.append(match.group(0))
+        return score, matches
+    
+    def classify(self, message: str) -> RoutingDecision:
+        """
+        Classifica a mensagem.
+        
+        A confiança cresce com o peso das palavras encontradas e cai quando a
+        mensagem menciona tarefas e rotinas ao mesmo tempo.
+        """
+        text = self._normalize(message)
+        task_score, task_matches = self._score(text, self._task_patterns)
+        routine_score, routine_matches = self._score(text, self._routine_patterns)
+        
+        if not task_score and not routine_score:
+            return RoutingDecision(None, 0.0, "nenhuma palavra-chave")
+        
+        if task_score >= routine_score:
+            route, top, other, matches = TASK_ROUTE, task_score, routine_score, task_matches
+        else:
+            route, top, other, matches = ROUTINE_ROUTE, routine_score, task_score, routine_matches
+        
+        confidence = (top / (top + other)) * min(1.0, 0.5 + 0.4 * top)
+        return RoutingDecision(route, round(confidence, 2), f"palavras-chave: {', '.join(matches)}")
+    
+    def decide(self, message: str) -> Optional[RoutingDecision]:
+        """Retorna a decisão se ela for confiável o bastante para pular o LLM, senão None."""
+        decision = self.classify(message)
+        if decision.route and decision.confidence >= self.min_confidence:
+            return decision
+        logger.info(f"IntentRouter: usando roteamento via LLM (confiança {decision.confidence:.2f}, {decision.reason})")
+        return None
+    
+    def record_llm_hop(self, seconds: float):
+        """Registra o tempo gasto pelo orquestrador (fora do subagente) em um turno roteado pelo LLM."""
+        with self._lock:
+            if self.llm_hop_seconds is None:
+                self.llm_hop_seconds = seconds
+            else:
+                self.llm_hop_seconds = 0.8 * self.llm_hop_seconds + 0.2 * seconds
+    
+    def record_shortcut(self, decision: RoutingDecision, classify_seconds: float):
+        """Registra um turno roteado localmente e o tempo economizado estimado."""
+        with self._lock:
+            self.shortcuts += 1
+            saved = max(0.0, (self.llm_hop_seconds or 0.0) - classify_seconds)
+            self.time_saved_seconds += saved
+        estimate = f"{saved:.2f}s" if self.llm_hop_seconds is not None else "ainda sem medição do LLM"
+        logger.info(
+            f"IntentRouter: rota '{decision.route}' (confiança {decision.confidence:.2f}, {decision.reason}) "
+            f"decidida em {classify_seconds * 1000:.2f} ms; economia estimada {estimate} "
+            f"({self.shortcuts} atalhos, {self.time_saved_seconds:.2f}s no total)"
+        )
+
+@lru_cache()
+def get_intent_router() -> IntentRouter:
+    """Retorna o router de intenções compartilhado pelo processo."""
+    return IntentRouter(get_settings().intent_router_min_confidence)
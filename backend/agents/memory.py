@@ -0,0 +1,219 @@
+import logging
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from config.settings import get_settings
+from .session import ConversationSession
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Tokens extras que a OpenAI contabiliza por mensagem (papel e separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Resumo da conversa anterior:"
+
+SUMMARY_PROMPT = """Resuma a conversa abaixo em poucas frases, em português, mantendo
+nomes, IDs, datas e pedidos pendentes do usuário. Responda apenas com o resumo.
+
+{conversation}"""
+
+
+@lru_cache()
+def _get_encoding():
+    """Retorna o encoding do tiktoken, ou None se não puder ser carregado (ex.: sem rede)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Memory: tiktoken indisponível, usando estimativa de 4 caracteres por token: {str(e)}")
+        return None
+
+
+def count_tokens(messages: List[BaseMessage]) -> int:
+    """Conta os tokens de uma lista de mensagens como a OpenAI os cobra."""
+    encoding = _get_encoding()
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if encoding is not None:
+            total += len(encoding.encode(content))
+        else:
+            total += len(content) // 4 + 1
+        total += MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def is_summary(message: BaseMessage) -> bool:
+    """Indica se a mensagem é o resumo criado pelo `SummarizingMemory`."""
+    return isinstance(message, AIMessage) and str(message.content).startswith(SUMMARY_PREFIX)
+
+
+class MemoryStrategy:
+    """
+    Estratégia que limita o histórico de uma sessão antes de cada chamada ao LLM.
+    
+    A mensagem do sistema (posição 0) é sempre mantida. As estratégias alteram o
+    histórico da própria sessão, então o que é descartado também deixa de ocupar
+    memória, e registram na sessão quantos tokens foram economizados no turno.
+    """
+    
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+    
+    def compact(self, session: ConversationSession) -> int:
+        """Limita o histórico da sessão e retorna os tokens economizados no turno."""
+        before = count_tokens(session.conversation_history)
+        session.conversation_history = self._compact(session.conversation_history)
+        return self._record(session, before)
+    
+    async def acompact(self, session: ConversationSession) -> int:
+        """Versão assíncrona de compact."""
+        before = count_tokens(session.conversation_history)
+        session.conversation_history = await self._acompact(session.conversation_history)
+        return self._record(session, before)
+    
+    def _compact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        raise NotImplementedError
+    
+    async def _acompact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        return self._compact(history)
+    
+    def _record(self, session: ConversationSession, before: int) -> int:
+        saved = max(0, before - count_tokens(session.conversation_history))
+        session.tokens_saved_last_turn = saved
+        session.tokens_saved_total += saved
+        if saved:
+            logger.info(f"Memory: {type(self).__name__} economizou {saved} tokens neste turno ({session.tokens_saved_total} no total)")
+        return saved
+    
+    def _split_recent(self, messages: List[BaseMessage], budget: int) -> int:
+        """
+        Retorna o índice a partir do qual as mensagens mais recentes cabem em `budget`.
+        
+        A última mensagem (a pergunta atual do usuário) é sempre mantida. O corte
+        nunca começa em uma resposta do assistente, para não separá-la da pergunta.
+        """
+        start = len(messages)
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            used += count_tokens([messages[index]])
+            if used > budget and start < len(messages):
+                break
+            start = index
+        while start < len(messages) - 1 and not isinstance(messages[start], HumanMessage):
+            start += 1
+        return start
+
+
+class NoMemoryLimit(MemoryStrategy):
+    """Mantém o histórico completo (comportamento anterior)."""
+    
+    def __init__(self):
+        super().__init__(max_tokens=0)
+    
+    def _compact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        return history
+
+
+class SlidingWindowMemory(MemoryStrategy):
+    """Mantém a mensagem do sistema e as mensagens mais recentes que cabem em `max_tokens`."""
+    
+    def _compact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        if count_tokens(history) <= self.max_tokens:
+            return history
+        system, messages = history[0], history[1:]
+        budget = self.max_tokens - count_tokens([system])
+        return [system] + messages[self._split_recent(messages, budget):]
+
+
+class SummarizingMemory(MemoryStrategy):
+    """
+    Quando o histórico passa de `max_tokens`, resume as mensagens mais antigas
+    em uma única mensagem e mantém as recentes (até `keep_tokens`).
+    
+    O resumo é uma mensagem do assistente com o prefixo `SUMMARY_PREFIX`, e não
+    uma mensagem do sistema: o orquestrador descarta as mensagens do sistema ao
+    repassar o histórico aos subagentes, que são quem escreve a resposta.
+    """
+    
+    def __init__(self, max_tokens: int, keep_tokens: int, llm=None):
+        super().__init__(max_tokens)
+        self.keep_tokens = keep_tokens
+        self._llm = llm
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            from .base_agent import get_llm
+            self._llm = get_llm()
+        return self._llm
+    
+    def _partition(self, history: List[BaseMessage]):
+        """Separa o histórico em (sistema, mensagens a resumir, mensagens mantidas)."""
+        system, messages = history[0], history[1:]
+        start = self._split_recent(messages, self.keep_tokens)
+        return system, messages[:start], messages[start:]
+    
+    def _summary_request(self, old: List[BaseMessage]) -> List[BaseMessage]:
+        lines = []
+        for message in old:
+            if is_summary(message):
+                # Resumo de uma compactação anterior
+                lines.append(message.content)
+            else:
+                role = "Usuário" if isinstance(message, HumanMessage) else "Assistente"
+                lines.append(f"{role}: {message.content}")
+        return [HumanMessage(content=SUMMARY_PROMPT.format(conversation="\n".join(lines)))]
+    
+    def _build(self, system: BaseMessage, summary: str, recent: List[BaseMessage]) -> List[BaseMessage]:
+        return [system, AIMessage(content=f"{SUMMARY_PREFIX} {summary}")] + recent
+    
+    def _compact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        if count_tokens(history) <= self.max_tokens:
+            return history
+        system, old, recent = self._partition(history)
+        if not old:
+            return history
+        summary = self.llm.invoke(self._summary_request(old)).content
+        return self._build(system, summary, recent)
+    
+    async def _acompact(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        if count_tokens(history) <= self.max_tokens:
+            return history
+        system, old, recent = self._partition(history)
+        if not old:
+            return history
+        summary = (await self.llm.ainvoke(self._summary_request(old))).content
+        return self._build(system, summary, recent)
+
+
+def create_memory_strategy(strategy: str, max_tokens: int, keep_tokens: Optional[int] = None) -> MemoryStrategy:
+    """
+    Cria a estratégia de memória pelo nome.
+    
+    Args:
+        strategy (str): "none", "sliding_window" ou "summary"
+        max_tokens (int): Limite de tokens do histórico enviado ao LLM
+        keep_tokens (int): Tokens recentes mantidos sem resumo (apenas "summary")
+    """
+    if strategy == "none":
+        return NoMemoryLimit()
+    if strategy == "sliding_window":
+        return SlidingWindowMemory(max_tokens)
+    if strategy == "summary":
+        return SummarizingMemory(max_tokens, keep_tokens or max_tokens // 2)
+    raise ValueError(f"Estratégia de memória desconhecida: {strategy}")
+
+
+@lru_cache()
+def get_memory_strategy() -> MemoryStrategy:
+    """Retorna a estratégia de memória configurada, compartilhada pelo processo."""
+    settings = get_settings()
+    return create_memory_strategy(
+        settings.memory_strategy,
+        settings.memory_max_tokens,
+        settings.memory_summary_keep_tokens
+    )
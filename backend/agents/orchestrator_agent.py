@@ -1,11 +1,16 @@
 from .base_agent import BaseAgent
-from .specialized.task_agent import TaskAgent
-from .specialized.routine_agent import RoutineAgent
+from .session import ConversationSession
+from .specialized.task_agent import get_task_agent
+from .specialized.routine_agent import get_routine_agent
+from .intent_router import TASK_ROUTE, get_intent_router
+from config.settings import get_settings
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.tools import Tool
 from typing import Dict, List, Any, Optional
+from contextvars import ContextVar
+from functools import lru_cache
 import logging
 import traceback
 import time
@@ -15,36 +20,36 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sessão da conversa em andamento. O orquestrador é compartilhado entre as
+# conexões, então as ferramentas de roteamento leem o histórico daqui.
+_current_session: ContextVar[Optional[ConversationSession]] = ContextVar("current_session", default=None)
+
+# Tempo gasto nos subagentes durante o turno em andamento. É um dicionário para
+# que as ferramentas o atualizem mesmo quando rodam em outra task
+_turn_stats: ContextVar[Optional[dict]] = ContextVar("turn_stats", default=None)
+
+# Mapeamento de dias da semana em português
+WEEKDAYS = {
+    0: "Segunda-feira",
+    1: "Terça-feira",
+    2: "Quarta-feira",
+    3: "Quinta-feira",
+    4: "Sexta-feira",
+    5: "Sábado",
+    6: "Domingo"
+}
+
 class OrchestratorAgent(BaseAgent):
     def __init__(self):
-        # Obter data atual
-        today = datetime.now()
-        date_str = today.strftime("%d/%m/%Y")
-        
-        # Mapeamento de dias da semana em português
-        weekdays = {
-            0: "Segunda-feira",
-            1: "Terça-feira",
-            2: "Quarta-feira",
-            3: "Quinta-feira",
-            4: "Sexta-feira",
-            5: "Sábado",
-            6: "Domingo"
-        }
-        weekday = weekdays[today.weekday()]
-        
-        system_prompt = f"""Você é um agente orquestrador que coordena outros agentes especializados.
-        Data atual: {date_str} ({weekday})
-        Sua função é analisar as mensagens dos usuários e direcioná-las para o agente apropriado.
-        Você tem acesso a ferramentas para rotear mensagens para diferentes agentes especializados.
-        Sempre forneça respostas claras e organizadas."""
-        
-        super().__init__(system_prompt)
+        super().__init__(self._build_system_prompt())
         
         # Inicializar agentes especializados
         logger.info("OrchestratorAgent: Inicializando agentes especializados")
-        self.task_agent = TaskAgent()
-        self.routine_agent = RoutineAgent()
+        self.task_agent = get_task_agent()
+        self.routine_agent = get_routine_agent()
+        
+        # Classificador local que evita a etapa de roteamento do LLM quando a intenção é clara
+        self.intent_router = get_intent_router() if get_settings().intent_router_enabled else None
         
         # Definir as ferramentas de roteamento
         logger.info("OrchestratorAgent: Configurando ferramentas de roteamento")
@@ -52,19 +57,22 @@ class OrchestratorAgent(BaseAgent):
             Tool(
                 name="route_to_task_agent",
                 func=self.route_to_task_agent,
+                coroutine=self.aroute_to_task_agent,
                 description="Roteia uma mensagem para o agente de tarefas. Use esta ferramenta quando a mensagem estiver relacionada a tarefas, como criar, listar, atualizar ou remover tarefas."
             ),
             Tool(
                 name="route_to_routine_agent",
                 func=self.route_to_routine_agent,
+                coroutine=self.aroute_to_routine_agent,
                 description="Roteia uma mensagem para o agente de rotinas. Use esta ferramenta quando a mensagem estiver relacionada a rotinas, como criar, listar, atualizar ou remover rotinas."
             )
         ]
         
         # Criar o prompt para o agente
         logger.info("OrchestratorAgent: Configurando prompt do agente")
+        # O prompt do sistema é informado a cada chamada, pois contém a data atual
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", "{system_prompt}"),
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
@@ -86,6 +94,52 @@ class OrchestratorAgent(BaseAgent):
             verbose=True
         )
     
+    def _build_system_prompt(self) -> str:
+        """Monta o prompt do sistema com a data atual."""
+        today = datetime.now()
+        date_str = today.strftime("%d/%m/%Y")
+        weekday = WEEKDAYS[today.weekday()]
+        
+        return f"""Você é um agente orquestrador que coordena outros agentes especializados.
+        Data atual: {date_str} ({weekday})
+        Sua função é analisar as mensagens dos usuários e direcioná-las para o agente apropriado.
+        Você tem acesso a ferramentas para rotear mensagens para diferentes agentes especializados.
+        Sempre forneça respostas claras e organizadas."""
+    
+    def new_session(self) -> ConversationSession:
+        """Cria uma nova sessão com a data atual no prompt do sistema."""
+        return ConversationSession(self._build_system_prompt())
+    
+    def _active_session(self) -> ConversationSession:
+        """Retorna a sessão da mensagem em processamento (ou a sessão padrão)."""
+        return _current_session.get() or self.session
+    
+    def _filtered_history(self) -> list:
+        """Histórico da sessão ativa sem as mensagens do sistema, como os subagentes esperam."""
+        history = self._active_session().conversation_history
+        return [msg for msg in history if not isinstance(msg, SystemMessage)]
+    
+    def _record_subagent_time(self, elapsed_time: float):
+        stats = _turn_stats.get()
+        if stats is not None:
+            stats["subagent_seconds"] += elapsed_time
+    
+    def _shortcut_agent(self, message: str):
+        """Retorna o subagente escolhido pelo router local, ou None para usar o LLM."""
+        if self.intent_router is None:
+            return None
+        classify_start = time.perf_counter()
+        decision = self.intent_router.decide(message)
+        if decision is None:
+            return None
+        self.intent_router.record_shortcut(decision, time.perf_counter() - classify_start)
+        return self.task_agent if decision.route == TASK_ROUTE else self.routine_agent
+    
+    def _record_llm_hop(self, start_time: float, stats: dict):
+        """Mede o tempo do orquestrador fora dos subagentes em um turno roteado pelo LLM."""
+        if self.intent_router is not None:
+            self.intent_router.record_llm_hop(time.time() - start_time - stats["subagent_seconds"])
+    
     def route_to_task_agent(self, message: str) -> str:
         """Roteia uma mensagem para o agente de tarefas de forma síncrona."""
         try:
@@ -93,16 +147,17 @@ class OrchestratorAgent(BaseAgent):
             logger.info(f"OrchestratorAgent: Iniciando route_to_task_agent com mensagem: {message}")
             
             # Filtrar mensagens do sistema do histórico de conversa
-            filtered_history = [msg for msg in self.conversation_history if not isinstance(msg, SystemMessage)]
+            filtered_history = self._filtered_history()
             
             # Chamar diretamente o método síncrono do TaskAgent
             logger.info("OrchestratorAgent: Chamando process_message do TaskAgent")
             response = self.task_agent.process_message(message, chat_history=filtered_history)
             
             elapsed_time = time.time() - start_time
+            self._record_subagent_time(elapsed_time)
             logger.info(f"OrchestratorAgent: Resposta recebida do agente de tarefas em {elapsed_time:.2f}s: {response}")
             return response
-                
+        
         except Exception as e:
             elapsed_time = time.time() - start_time
             error_msg = f"Erro ao rotear mensagem para o agente de tarefas após {elapsed_time:.2f}s: {str(e)}"
@@ -117,16 +172,17 @@ class OrchestratorAgent(BaseAgent):
             logger.info(f"OrchestratorAgent: Iniciando route_to_routine_agent com mensagem: {message}")
             
             # Filtrar mensagens do sistema do histórico de conversa
-            filtered_history = [msg for msg in self.conversation_history if not isinstance(msg, SystemMessage)]
+            filtered_history = self._filtered_history()
             
             # Chamar diretamente o método síncrono do RoutineAgent
             logger.info("OrchestratorAgent: Chamando process_message do RoutineAgent")
             response = self.routine_agent.process_message(message, chat_history=filtered_history)
             
             elapsed_time = time.time() - start_time
+            self._record_subagent_time(elapsed_time)
             logger.info(f"OrchestratorAgent: Resposta recebida do agente de rotinas em {elapsed_time:.2f}s: {response}")
             return response
-                
+        
         except Exception as e:
             elapsed_time = time.time() - start_time
             error_msg = f"Erro ao rotear mensagem para o agente de rotinas após {elapsed_time:.2f}s: {str(e)}"
@@ -134,33 +190,171 @@ class OrchestratorAgent(BaseAgent):
             logger.error(f"OrchestratorAgent: Traceback: {traceback.format_exc()}")
             return error_msg
     
-    def process_message(self, message: str, response_format: str = "markdown", websocket=None):
+    async def aroute_to_task_agent(self, message: str) -> str:
+        """Roteia uma mensagem para o agente de tarefas sem bloquear o loop de eventos."""
+        start_time = time.time()
+        try:
+            logger.info(f"OrchestratorAgent: Iniciando aroute_to_task_agent com mensagem: {message}")
+            
+            # Filtrar mensagens do sistema do histórico de conversa
+            filtered_history = self._filtered_history()
+            
+            logger.info("OrchestratorAgent: Chamando aprocess_message do TaskAgent")
+            response = await self.task_agent.aprocess_message(message, chat_history=filtered_history)
+            
+            elapsed_time = time.time() - start_time
+            self._record_subagent_time(elapsed_time)
+            logger.info(f"OrchestratorAgent: Resposta recebida do agente de tarefas em {elapsed_time:.2f}s: {response}")
+            return response
+        
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            error_msg = f"Erro ao rotear mensagem para o agente de tarefas após {elapsed_time:.2f}s: {str(e)}"
+            logger.error(f"OrchestratorAgent: {error_msg}")
+            logger.error(f"OrchestratorAgent: Traceback: {traceback.format_exc()}")
+            return error_msg
+    
+    async def aroute_to_routine_agent(self, message: str) -> str:
+        """Roteia uma mensagem para o agente de rotinas sem bloquear o loop de eventos."""
+        start_time = time.time()
+        try:
+            logger.info(f"OrchestratorAgent: Iniciando aroute_to_routine_agent com mensagem: {message}")
+            
+            # Filtrar mensagens do sistema do histórico de conversa
+            filtered_history = self._filtered_history()
+            
+            logger.info("OrchestratorAgent: Chamando aprocess_message do RoutineAgent")
+            response = await self.routine_agent.aprocess_message(message, chat_history=filtered_history)
+            
+            elapsed_time = time.time() - start_time
+            self._record_subagent_time(elapsed_time)
+            logger.info(f"OrchestratorAgent: Resposta recebida do agente de rotinas em {elapsed_time:.2f}s: {response}")
+            return response
+        
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            error_msg = f"Erro ao rotear mensagem para o agente de rotinas após {elapsed_time:.2f}s: {str(e)}"
+            logger.error(f"OrchestratorAgent: {error_msg}")
+            logger.error(f"OrchestratorAgent: Traceback: {traceback.format_exc()}")
+            return error_msg
+    
+    def process_message(self, message: str, response_format: str = "markdown", websocket=None, session: ConversationSession = None):
         """Processa uma mensagem de forma síncrona."""
+        session = session or self.session
+        session_token = _current_session.set(session)
         try:
             start_time = time.time()
             logger.info(f"OrchestratorAgent: Processando mensagem: {message}")
             # Adicionar a mensagem do usuário ao histórico
-            self.conversation_history.append(HumanMessage(content=message))
+            session.conversation_history.append(HumanMessage(content=message))
             
-            # Obter resposta do agente
-            logger.info("OrchestratorAgent: Invocando agent_executor")
-            response = self.agent_executor.invoke({
-                "input": message,
-                "chat_history": self.conversation_history[:-1]
-            })
+            # Limitar o histórico enviado ao LLM
+            self.memory.compact(session)
+            
+            # Intenção clara: ir direto ao subagente, sem a etapa de roteamento do LLM
+            shortcut_agent = self._shortcut_agent(message)
+            if shortcut_agent is not None:
+                response_text = shortcut_agent.process_message(message, chat_history=self._filtered_history())
+            else:
+                # Obter resposta do agente
+                logger.info("OrchestratorAgent: Invocando agent_executor")
+                stats = {"subagent_seconds": 0.0}
+                stats_token = _turn_stats.set(stats)
+                try:
+                    response = self.agent_executor.invoke({
+                        "input": message,
+                        "system_prompt": session.conversation_history[0].content,
+                        "chat_history": session.conversation_history[:-1]
+                    })
+                finally:
+                    _turn_stats.reset(stats_token)
+                self._record_llm_hop(start_time, stats)
+                response_text = response["output"]
             
-            response_text = response["output"]
             elapsed_time = time.time() - start_time
             logger.info(f"OrchestratorAgent: Resposta obtida em {elapsed_time:.2f}s: {response_text}")
             
             # Adicionar a resposta ao histórico
-            self.conversation_history.append(AIMessage(content=response_text))
+            session.conversation_history.append(AIMessage(content=response_text))
             
             return response_text
+        
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            error_message = f"Erro ao processar mensagem após {elapsed_time:.2f}s: {str(e)}"
+            logger.error(f"OrchestratorAgent: {error_message}")
+            logger.error(f"OrchestratorAgent: Traceback: {traceback.format_exc()}")
+            raise Exception(error_message)
+        finally:
+            _current_session.reset(session_token)
+    
+    async def aprocess_message(self, message: str, response_format: str = "markdown", websocket=None, session: ConversationSession = None, callbacks: Optional[List] = None):
+        """
+        Processa uma mensagem sem bloquear o loop de eventos.
+        
+        As chamadas ao LLM e às APIs de tarefas e rotinas são aguardadas, então
+        várias conexões podem ser atendidas ao mesmo tempo pelo mesmo worker.
+        `callbacks` são repassados apenas à geração que produz a resposta final
+        (ex.: um TokenStreamHandler): a do orquestrador ou, quando o router local
+        escolhe o subagente, a do próprio subagente.
+        """
+        session = session or self.session
+        session_token = _current_session.set(session)
+        start_time = time.time()
+        try:
+            logger.info(f"OrchestratorAgent: Processando mensagem: {message}")
+            # Adicionar a mensagem do usuário ao histórico
+            session.conversation_history.append(HumanMessage(content=message))
             
+            # Limitar o histórico enviado ao LLM
+            await self.memory.acompact(session)
+            
+            # Intenção clara: ir direto ao subagente, sem a etapa de roteamento do LLM.
+            # Nesse caso a resposta final é a do subagente, então ela é que é transmitida
+            shortcut_agent = self._shortcut_agent(message)
+            if shortcut_agent is not None:
+                response_text = await shortcut_agent.aprocess_message(
+                    message,
+                    chat_history=self._filtered_history(),
+                    callbacks=callbacks
+                )
+            else:
+                # Obter resposta do agente
+                logger.info("OrchestratorAgent: Invocando agent_executor (async)")
+                stats = {"subagent_seconds": 0.0}
+                stats_token = _turn_stats.set(stats)
+                try:
+                    response = await self.agent_executor.ainvoke(
+                        {
+                            "input": message,
+                            "system_prompt": session.conversation_history[0].content,
+                            "chat_history": session.conversation_history[:-1]
+                        },
+                        config={"callbacks": callbacks}
+                    )
+                finally:
+                    _turn_stats.reset(stats_token)
+                self._record_llm_hop(start_time, stats)
+                response_text = response["output"]
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"OrchestratorAgent: Resposta obtida em {elapsed_time:.2f}s: {response_text}")
+            
+            # Adicionar a resposta ao histórico
+            session.conversation_history.append(AIMessage(content=response_text))
+            
+            return response_text
+        
         except Exception as e:
             elapsed_time = time.time() - start_time
             error_message = f"Erro ao processar mensagem após {elapsed_time:.2f}s: {str(e)}"
             logger.error(f"OrchestratorAgent: {error_message}")
             logger.error(f"OrchestratorAgent: Traceback: {traceback.format_exc()}")
-            raise Exception(error_message) 
\ No newline at end of file
+            raise Exception(error_message)
+        finally:
+            _current_session.reset(session_token)
+
+@lru_cache()
+def get_orchestrator_agent() -> OrchestratorAgent:
+    """Retorna o agente orquestrador compartilhado pelo processo."""
+    return OrchestratorAgent()
@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.agent import ExceptionTool
+from langchain.agents.tools import InvalidTool
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+from langchain_core.tools import BaseTool
+
+from config.settings import get_settings
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+@lru_cache()
+def get_tool_pool() -> ThreadPoolExecutor:
+    """Retorna o pool de threads compartilhado que executa as ferramentas síncronas em paralelo."""
+    return ThreadPoolExecutor(
+        max_workers=get_settings().agent_tool_max_concurrency,
+        thread_name_prefix="agent-tool"
+    )
+
+class ParallelAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor que executa ao mesmo tempo as ferramentas pedidas pelo LLM
+    em um mesmo passo (tool calls paralelas da OpenAI).
+    
+    O AgentExecutor do LangChain executa as ações de um passo uma depois da
+    outra no caminho síncrono, e sem limite no assíncrono. Aqui o caminho
+    síncrono usa o pool de `get_tool_pool()` e o assíncrono um semáforo, ambos
+    limitados a `AGENT_TOOL_MAX_CONCURRENCY`. As observações voltam ao LLM na
+    ordem em que as ações foram pedidas, qualquer que seja a ordem de término.
+    """
+    
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager=None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        try:
+            intermediate_steps = self._prepare_intermediate_steps(intermediate_steps)
+            output = self.agent.plan(
+                intermediate_steps,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException as e:
+            action = self._parsing_error_action(e)
+            if run_manager:
+                run_manager.on_agent_action(action, color="green")
+            observation = ExceptionTool().run(
+                action.tool_input,
+                verbose=self.verbose,
+                color=None,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **self.agent.tool_run_logging_kwargs(),
+            )
+            yield AgentStep(action=action, observation=observation)
+            return
+        
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+        
+        actions = [output] if isinstance(output, AgentAction) else output
+        for action in actions:
+            yield action
+        for action in actions:
+            if run_manager:
+                run_manager.on_agent_action(action, color="green")
+        
+        if len(actions) == 1:
+            yield self._perform_action(actions[0], name_to_tool_map, color_mapping, run_manager)
+            return
+        
+        logger.info(f"ParallelAgentExecutor: Executando {len(actions)} ferramentas em paralelo")
+        # Cada ação roda com uma cópia do contexto atual (ex.: a sessão do orquestrador)
+        futures = [
+            get_tool_pool().submit(contextvars.copy_context().run, self._perform_action, action, name_to_tool_map, color_mapping, run_manager)
+            for action in actions
+        ]
+        for future in futures:
+            yield future.result()
+    
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager=None,
+    ) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        try:
+            intermediate_steps = self._prepare_intermediate_steps(intermediate_steps)
+            output = await self.agent.aplan(
+                intermediate_steps,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException as e:
+            action = self._parsing_error_action(e)
+            observation = await ExceptionTool().arun(
+                action.tool_input,
+                verbose=self.verbose,
+                color=None,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **self.agent.tool_run_logging_kwargs(),
+            )
+            yield AgentStep(action=action, observation=observation)
+            return
+        
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+        
+        actions = [output] if isinstance(output, AgentAction) else output
+        for action in actions:
+            yield action
+        
+        semaphore = asyncio.Semaphore(get_settings().agent_tool_max_concurrency)
+        
+        async def perform(action: AgentAction) -> AgentStep:
+            async with semaphore:
+                if run_manager:
+                    await run_manager.on_agent_action(action, verbose=self.verbose, color="green")
+                return await self._aperform_action(action, name_to_tool_map, color_mapping, run_manager)
+        
+        if len(actions) > 1:
+            logger.info(f"ParallelAgentExecutor: Executando {len(actions)} ferramentas em paralelo")
+        # gather devolve os resultados na ordem das ações
+        for step in await asyncio.gather(*(perform(action) for action in actions)):
+            yield step
+    
+    def _parsing_error_action(self, error: OutputParserException) -> AgentAction:
+        """Ação "_Exception" devolvida ao LLM em erros de parsing, como no AgentExecutor."""
+        handle = self.handle_parsing_errors
+        if handle is False:
+            raise ValueError(
+                "An output parsing error occurred. "
+                "In order to pass this error back to the agent and have it try "
+                "again, pass `handle_parsing_errors=True` to the AgentExecutor. "
+                f"This is the error: {str(error)}"
+            )
+        text = str(error)
+        if handle is True:
+            if error.send_to_llm:
+                observation = str(error.observation)
+                text = str(error.llm_output)
+            else:
+                observation = "Invalid or incomplete response"
+        elif isinstance(handle, str):
+            observation = handle
+        elif callable(handle):
+            observation = handle(error)
+        else:
+            raise ValueError("Got unexpected type of `handle_parsing_errors`")
+        return AgentAction("_Exception", observation, text)
+    
+    def _tool_call(self, action: AgentAction, name_to_tool_map: Dict[str, BaseTool], color_mapping: Dict[str, str]) -> Tuple[BaseTool, object, Optional[str], dict]:
+        """Ferramenta, entrada, cor e kwargs de log de uma ação (InvalidTool se o nome não existir)."""
+        tool_run_kwargs = self.agent.tool_run_logging_kwargs()
+        if action.tool not in name_to_tool_map:
+            tool_input = {
+                "requested_tool_name": action.tool,
+                "available_tool_names": list(name_to_tool_map.keys()),
+            }
+            return InvalidTool(), tool_input, None, tool_run_kwargs
+        tool = name_to_tool_map[action.tool]
+        if tool.return_direct:
+            tool_run_kwargs["llm_prefix"] = ""
+        return tool, action.tool_input, color_mapping[action.tool], tool_run_kwargs
+    
+    def _perform_action(self, action: AgentAction, name_to_tool_map, color_mapping, run_manager) -> AgentStep:
+        tool, tool_input, color, tool_run_kwargs = self._tool_call(action, name_to_tool_map, color_mapping)
+        observation = tool.run(
+            tool_input,
+            verbose=self.verbose,
+            color=color,
+            callbacks=run_manager.get_child() if run_manager else None,
+            **tool_run_kwargs,
+        )
+        return AgentStep(action=action, observation=observation)
+    
+    async def _aperform_action(self, action: AgentAction, name_to_tool_map, color_mapping, run_manager) -> AgentStep:
+        tool, tool_input, color, tool_run_kwargs = self._tool_call(action, name_to_tool_map, color_mapping)
+        observation = await tool.arun(
+            tool_input,
+            verbose=self.verbose,
+            color=color,
+            callbacks=run_manager.get_child() if run_manager else None,
+            **tool_run_kwargs,
+        )
+        return AgentStep(action=action, observation=observation)
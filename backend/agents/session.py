@@ -0,0 +1,23 @@
+from langchain_core.messages import SystemMessage
+
+
+class ConversationSession:
+    """
+    Estado leve de uma conversa.
+    
+    Os agentes (clientes LLM, prompts, ferramentas e executores) são
+    compartilhados pelo processo; apenas este objeto é criado por conexão.
+    """
+    
+    def __init__(self, system_prompt: str):
+        self.conversation_history = [
+            SystemMessage(content=system_prompt)
+        ]
+        self.last_text = ""
+        # Tokens descartados ou resumidos pela estratégia de memória
+        self.tokens_saved_last_turn = 0
+        self.tokens_saved_total = 0
+    
+    def reset(self):
+        """Reseta o histórico de conversa, mantendo apenas a mensagem do sistema."""
+        self.conversation_history = [self.conversation_history[0]]
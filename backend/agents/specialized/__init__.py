@@ -1,4 +1,4 @@
-from .task_agent import TaskAgent
-from .routine_agent import RoutineAgent
+from .task_agent import TaskAgent, get_task_agent
+from .routine_agent import RoutineAgent, get_routine_agent
 
-__all__ = ['TaskAgent', 'RoutineAgent'] 
\ No newline at end of file
+__all__ = ['TaskAgent', 'RoutineAgent', 'get_task_agent', 'get_routine_agent']
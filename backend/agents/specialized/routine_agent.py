@@ -1,20 +1,26 @@
 import json
 import logging
+import re
 import time
 import traceback
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 
-import requests
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents import create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.tools import Tool
 from langchain_openai import ChatOpenAI
 
 from ..base_agent import BaseAgent
+from ..parallel_executor import ParallelAgentExecutor
+from ..tool_results import ROUTINE_COLUMNS, compact_record, compact_table
 from config.settings import get_settings
+from utils.cache import MISSING, TTLCache
+from utils.http_client import aconditional_get, arequest, conditional_get, get_conditional_cache, get_session
+from utils.lambda_response import lambda_items, lambda_message, parse_lambda_response
 from utils.logger import get_logger
 
 # Configurar logging
@@ -23,11 +29,47 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Chave do snapshot das rotinas no cache do agente
+ROUTINES_SNAPSHOT_KEY = "routines"
+
 class RoutineAPIClient:
     """Cliente para interagir com a API de rotinas."""
     
     def __init__(self):
         self.base_url = "https://api.itenorio.com/lambda/routines"
+        # Últimas respostas com ETag: listas que não mudaram voltam como 304, sem corpo
+        self.conditional_cache = get_conditional_cache()
+    
+    def _handle_response(self, operation: str, response) -> tuple[bool, str, dict]:
+        """
+        Interpreta a resposta da API (requests ou httpx).
+        
+        Args:
+            operation: Nome da operação sendo realizada
+            response: Resposta HTTP
+        
+        Returns:
+            tuple[bool, str, dict]: (sucesso, mensagem, dados)
+        """
+        # Verificar status code
+        if not 200 <= response.status_code < 300:
+            error_msg = f"Erro na API durante {operation}. Status code: {response.status_code}"
+            try:
+                api_message = lambda_message(response.json())
+                if api_message:
+                    error_msg = f"{error_msg}. Mensagem: {api_message}"
+            except ValueError:
+                error_msg = f"{error_msg}. Resposta: {response.text}"
+            
+            logger.error(f"RoutineAgent: {error_msg}")
+            return False, error_msg, {}
+        
+        try:
+            return True, "", parse_lambda_response(response.json())
+        except ValueError:
+            error_msg = f"Erro ao decodificar resposta da API durante {operation}"
+            logger.error(f"RoutineAgent: {error_msg}")
+            return False, error_msg, {}
     
     def _make_request(self, operation: str, method: str, url: str, **kwargs) -> tuple[bool, str, dict]:
         """
@@ -37,54 +79,41 @@ class RoutineAPIClient:
             operation: Nome da operação sendo realizada
             method: Método HTTP (GET, POST, PUT, DELETE)
             url: URL da API
-            **kwargs: Argumentos adicionais para requests
-            
+            **kwargs: Argumentos adicionais para requests.Session.request
+        
+        GETs são condicionais (If-None-Match): se nada mudou, a API responde 304
+        e a resposta anterior é reaproveitada.
+        
         Returns:
             tuple[bool, str, dict]: (sucesso, mensagem, dados)
         """
         try:
             logger.info(f"RoutineAgent: Fazendo requisição {method} para {url}")
-            response = getattr(requests, method.lower())(url, **kwargs)
-            
-            # Verificar status code
-            if not 200 <= response.status_code < 300:
-                error_msg = f"Erro na API durante {operation}. Status code: {response.status_code}"
-                try:
-                    error_data = response.json()
-                    if isinstance(error_data, dict):
-                        if 'body' in error_data and isinstance(error_data['body'], str):
-                            try:
-                                body_data = json.loads(error_data['body'])
-                                if 'message' in body_data:
-                                    error_msg = f"{error_msg}. Mensagem: {body_data['message']}"
-                            except json.JSONDecodeError:
-                                error_msg = f"{error_msg}. Resposta: {error_data['body']}"
-                        elif 'message' in error_data:
-                            error_msg = f"{error_msg}. Mensagem: {error_data['message']}"
-                except (json.JSONDecodeError, ValueError):
-                    error_msg = f"{error_msg}. Resposta: {response.text}"
-                
-                logger.error(f"RoutineAgent: {error_msg}")
-                return False, error_msg, {}
-            
-            # Parse response data
-            response_data = response.json()
-            
-            # Handle AWS Lambda response format
-            if isinstance(response_data, dict) and 'body' in response_data:
-                if isinstance(response_data['body'], str):
-                    try:
-                        body_data = json.loads(response_data['body'])
-                        return True, "", body_data
-                    except json.JSONDecodeError:
-                        error_msg = f"Erro ao decodificar resposta da API durante {operation}"
-                        logger.error(f"RoutineAgent: {error_msg}")
-                        return False, error_msg, {}
-                else:
-                    return True, "", response_data['body']
-            
-            return True, "", response_data
-            
+            if method == "GET":
+                response = conditional_get(url, self.conditional_cache, **kwargs)
+            else:
+                response = get_session().request(method, url, **kwargs)
+            return self._handle_response(operation, response)
+        
+        except Exception as e:
+            error_msg = f"Erro ao fazer requisição {method} para {url}: {str(e)}"
+            logger.error(f"RoutineAgent: {error_msg}")
+            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+            return False, error_msg, {}
+    
+    async def _amake_request(self, operation: str, method: str, url: str, **kwargs) -> tuple[bool, str, dict]:
+        """Versão assíncrona de _make_request, sobre o cliente httpx compartilhado."""
+        try:
+            logger.info(f"RoutineAgent: Fazendo requisição {method} para {url}")
+            # httpx espera corpos já serializados em 'content'
+            if isinstance(kwargs.get('data'), str):
+                kwargs['content'] = kwargs.pop('data')
+            if method == "GET":
+                response = await aconditional_get(url, self.conditional_cache, **kwargs)
+            else:
+                response = await arequest(method, url, **kwargs)
+            return self._handle_response(operation, response)
+        
         except Exception as e:
             error_msg = f"Erro ao fazer requisição {method} para {url}: {str(e)}"
             logger.error(f"RoutineAgent: {error_msg}")
@@ -99,17 +128,71 @@ class RoutineAPIClient:
         """Obtém uma rotina específica."""
         return self._make_request(f"obtenção da rotina {routine_id}", "GET", f"{self.base_url}/{routine_id}")
     
+    def get_routines_by_ids(self, routine_ids: list[str]) -> tuple[bool, str, dict]:
+        """Obtém várias rotinas em uma requisição (IDs inexistentes vêm em `missing`)."""
+        return self._make_request("obtenção de rotinas por ID", "GET", self.base_url, params={"ids": ",".join(routine_ids)})
+    
     def create_routine(self, data: str, headers: dict) -> tuple[bool, str, dict]:
         """Cria uma nova rotina."""
         return self._make_request("criação de rotina", "POST", self.base_url, data=data, headers=headers)
     
-    def update_routine(self, routine_id: str, data: dict) -> tuple[bool, str, dict]:
-        """Atualiza uma rotina existente."""
-        return self._make_request(f"atualização da rotina {routine_id}", "PUT", f"{self.base_url}/{routine_id}", json=data)
+    def bulk_create_routines(self, routines: list[dict]) -> tuple[bool, str, dict]:
+        """
+        Cria (ou substitui, quando o id é informado) várias rotinas em uma requisição.
+        
+        Os itens inválidos não interrompem o lote: vêm em `errors` na resposta,
+        com o índice e o motivo de cada um.
+        """
+        return self._make_request("criação de rotinas em lote", "POST", self.base_url, json={"routines": routines})
+    
+    def is_version_conflict(self, error_msg: str, result: dict) -> bool:
+        """Identifica o 409 da API (status HTTP com proxy, ou `current_version` no corpo com mapping template)."""
+        return "Status code: 409" in error_msg or (isinstance(result, dict) and "current_version" in result)
+    
+    def update_routine(self, routine_id: str, changes: dict, expected_version: Optional[int] = None) -> tuple[bool, str, dict]:
+        """
+        Atualiza apenas os campos em `changes` (delta).
+        
+        Com `expected_version` a escrita é condicional: se a rotina mudou desde
+        essa versão, a API responde 409 (ver is_version_conflict) e nada é
+        gravado. O conflito não é reenviado aqui: cabe a quem chama reler a
+        rotina e decidir.
+        """
+        payload = changes if expected_version is None else {**changes, "version": expected_version}
+        return self._make_request(f"atualização da rotina {routine_id}", "PUT", f"{self.base_url}/{routine_id}", json=payload)
     
     def delete_routine(self, routine_id: str) -> tuple[bool, str, dict]:
         """Deleta uma rotina existente."""
         return self._make_request(f"remoção da rotina {routine_id}", "DELETE", f"{self.base_url}/{routine_id}")
+    
+    async def aget_routines(self) -> tuple[bool, str, dict]:
+        """Lista todas as rotinas (assíncrono)."""
+        return await self._amake_request("listagem de rotinas", "GET", self.base_url)
+    
+    async def aget_routine(self, routine_id: str) -> tuple[bool, str, dict]:
+        """Obtém uma rotina específica (assíncrono)."""
+        return await self._amake_request(f"obtenção da rotina {routine_id}", "GET", f"{self.base_url}/{routine_id}")
+    
+    async def aget_routines_by_ids(self, routine_ids: list[str]) -> tuple[bool, str, dict]:
+        """Obtém várias rotinas em uma requisição (assíncrono)."""
+        return await self._amake_request("obtenção de rotinas por ID", "GET", self.base_url, params={"ids": ",".join(routine_ids)})
+    
+    async def acreate_routine(self, data: str, headers: dict) -> tuple[bool, str, dict]:
+        """Cria uma nova rotina (assíncrono)."""
+        return await self._amake_request("criação de rotina", "POST", self.base_url, data=data, headers=headers)
+    
+    async def abulk_create_routines(self, routines: list[dict]) -> tuple[bool, str, dict]:
+        """Cria várias rotinas em uma requisição (assíncrono)."""
+        return await self._amake_request("criação de rotinas em lote", "POST", self.base_url, json={"routines": routines})
+    
+    async def aupdate_routine(self, routine_id: str, changes: dict, expected_version: Optional[int] = None) -> tuple[bool, str, dict]:
+        """Versão assíncrona de update_routine (delta, condicional com `expected_version`)."""
+        payload = changes if expected_version is None else {**changes, "version": expected_version}
+        return await self._amake_request(f"atualização da rotina {routine_id}", "PUT", f"{self.base_url}/{routine_id}", json=payload)
+    
+    async def adelete_routine(self, routine_id: str) -> tuple[bool, str, dict]:
+        """Deleta uma rotina existente (assíncrono)."""
+        return await self._amake_request(f"remoção da rotina {routine_id}", "DELETE", f"{self.base_url}/{routine_id}")
 
 class RoutineAgent(BaseAgent):
     """Agente especializado em gerenciar rotinas."""
@@ -122,6 +205,8 @@ class RoutineAgent(BaseAgent):
         system_prompt = """Você é um agente especializado em gerenciamento de rotinas.
         Sua função é ajudar a criar, listar, atualizar e remover rotinas.
         Você tem acesso a uma API de rotinas e deve usar as ferramentas disponíveis para realizar essas operações.
+        Quando precisar de várias consultas independentes (por exemplo, os detalhes de várias rotinas), peça todas as ferramentas de uma vez.
+        As ferramentas retornam as rotinas em JSON compacto; listas vêm como uma tabela com "cols" (nomes das colunas) e "rows" (uma lista de valores por rotina), e "missing" lista os IDs não encontrados. As chaves são id, name, desc (descrição), status, sched (horário), freq (frequência), pri (prioridade), tags, min (duração estimada em minutos), start e end (datas de início e fim) e ver (versão). Apresente as rotinas ao usuário em texto legível, nunca em JSON.
         
         Ao criar ou atualizar rotinas, apenas o campo 'name' é obrigatório.
         Os demais campos são opcionais e têm os seguintes valores padrão:
@@ -131,6 +216,7 @@ class RoutineAgent(BaseAgent):
         - priority: 'low'
         
         Para ocultar os campos opcionais é só não enviar o campo, não é necessário enviar o campo com valor None.
+        Ao atualizar, inclua version=<ver> com a versão da rotina que você leu: se ela mudou desde então, nada é gravado e a ferramenta devolve a rotina atual para você confirmar a alteração com o usuário.
         """
         
         super().__init__(system_prompt)
@@ -138,6 +224,10 @@ class RoutineAgent(BaseAgent):
         # Inicializar o cliente da API
         self.api_client = RoutineAPIClient()
         
+        # Snapshot das rotinas injetado no histórico, reaproveitado entre turnos
+        # e sessões até expirar ou ser invalidado por uma alteração
+        self.snapshot_cache = TTLCache(settings.snapshot_cache_ttl_seconds)
+        
         # Definir campos obrigatórios e seus tipos
         self.required_fields = {
             'name': str
@@ -164,26 +254,31 @@ class RoutineAgent(BaseAgent):
             Tool(
                 name="get_routines",
                 func=self.get_routines,
+                coroutine=self.aget_routines,
                 description="Lista todas as rotinas disponíveis. Use esta ferramenta quando o usuário quiser ver todas as rotinas."
             ),
             Tool(
                 name="get_routine",
                 func=self.get_routine,
-                description="Obtém detalhes de uma rotina específica pelo ID. Use esta ferramenta quando o usuário quiser ver detalhes de uma rotina específica."
+                coroutine=self.aget_routine,
+                description="Obtém detalhes de uma ou mais rotinas pelo ID. Use esta ferramenta quando o usuário quiser ver detalhes de rotinas específicas; para várias rotinas, informe todos os IDs de uma vez, separados por vírgula."
             ),
             Tool(
                 name="create_routine",
                 func=self.create_routine,
+                coroutine=self.acreate_routine,
                 description="Cria uma nova rotina. Use esta ferramenta quando o usuário quiser criar uma nova rotina."
             ),
             Tool(
                 name="update_routine",
                 func=self.update_routine,
+                coroutine=self.aupdate_routine,
                 description="Atualiza uma rotina existente. Use esta ferramenta quando o usuário quiser modificar uma rotina existente."
             ),
             Tool(
                 name="delete_routine",
                 func=self.delete_routine,
+                coroutine=self.adelete_routine,
                 description="Remove uma rotina pelo ID. Use esta ferramenta quando o usuário quiser excluir uma rotina."
             )
         ]
@@ -197,8 +292,8 @@ class RoutineAgent(BaseAgent):
         ])
         
         # Criar o agente
-        logger.info("RoutineAgent: Criando agente com OpenAI Functions")
-        self.agent = create_openai_functions_agent(
+        logger.info("RoutineAgent: Criando agente com OpenAI Tools (chamadas paralelas)")
+        self.agent = create_openai_tools_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt
@@ -206,7 +301,7 @@ class RoutineAgent(BaseAgent):
         
         # Criar o executor do agente
         logger.info("RoutineAgent: Configurando executor do agente")
-        self.agent_executor = AgentExecutor(
+        self.agent_executor = ParallelAgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True
@@ -214,7 +309,7 @@ class RoutineAgent(BaseAgent):
         
         elapsed_time = time.time() - start_time
         logger.info(f"RoutineAgent: Inicialização concluída em {elapsed_time:.2f}s")
-        
+    
     def _validate_routine_data(self, data: dict, is_update: bool = False) -> str:
         """
         Validates routine data.
@@ -222,7 +317,7 @@ class RoutineAgent(BaseAgent):
         Args:
             data: Dictionary with routine data
             is_update: If True, doesn't validate required fields (for partial updates)
-            
+        
         Returns:
             str: Validation result message
         """
@@ -233,8 +328,9 @@ class RoutineAgent(BaseAgent):
                 if 'name' not in data or not data['name'].strip():
                     return "O campo 'name' é obrigatório"
             
-            # Aplicar valores padrão para campos não fornecidos
-            default_values = {
+            # Aplicar valores padrão para campos não fornecidos (na atualização,
+            # só os campos enviados são gravados, então nada é preenchido)
+            default_values = {} if is_update else {
                 'status': 'pending',
                 'schedule': '09:00',
                 'frequency': 'daily',
@@ -295,11 +391,19 @@ class RoutineAgent(BaseAgent):
                             return "Duração deve ser maior ou igual a zero"
             
             return "OK"
-            
+        
         except Exception as e:
             logger.error(f"RoutineAgent: Erro ao validar dados: {str(e)}")
             return f"Erro ao validar dados: {str(e)}"
-
+    
+    def _handle_error(self, action: str, start_time: float, error: Exception) -> str:
+        """Logs an operation error and returns the message for the user."""
+        elapsed_time = time.time() - start_time
+        error_msg = f"Error {action} after {elapsed_time:.2f}s: {str(error)}"
+        logger.error(f"RoutineAgent: {error_msg}")
+        logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+        return error_msg
+    
     def process_message(self, message: str, response_format: str = "markdown", websocket=None, chat_history=None) -> str:
         """Processa uma mensagem de forma síncrona."""
         try:
@@ -307,37 +411,12 @@ class RoutineAgent(BaseAgent):
             logger.info(f"RoutineAgent: Processing message: {message}")
             
             # Converter o histórico de chat para o formato do LangChain
-            langchain_history = []
-            if chat_history:
-                for msg in chat_history:
-                    # Verificar o tipo de mensagem
-                    if isinstance(msg, HumanMessage):
-                        langchain_history.append(msg)
-                    elif isinstance(msg, AIMessage):
-                        langchain_history.append(msg)
-                    elif isinstance(msg, SystemMessage):
-                        # Ignorar mensagens do sistema, pois já estão no prompt
-                        continue
-                    elif isinstance(msg, dict):
-                        # Se for um dicionário, converter para o formato apropriado
-                        if msg.get("role") == "user":
-                            langchain_history.append(HumanMessage(content=msg.get("content", "")))
-                        elif msg.get("role") == "assistant":
-                            langchain_history.append(AIMessage(content=msg.get("content", "")))
-            
-            # Verificar se já carregamos as rotinas no histórico
-            routines_loaded = False
-            for msg in langchain_history:
-                if isinstance(msg, AIMessage) and "Here are all your routines:" in msg.content:
-                    routines_loaded = True
-                    break
-            
-            # Se não carregamos as rotinas ainda, carregar agora
-            if not routines_loaded:
-                logger.info("RoutineAgent: Loading routines into chat history")
-                routines_message = self._load_routines_into_history()
-                if routines_message:
-                    langchain_history.append(AIMessage(content=routines_message))
+            langchain_history = self._convert_chat_history(chat_history)
+            
+            # Injetar o snapshot das rotinas (em cache entre turnos)
+            routines_message = self._load_routines_into_history()
+            if routines_message:
+                langchain_history.append(AIMessage(content=routines_message))
             
             # Processar a mensagem usando o executor do agente
             response = self.agent_executor.invoke({
@@ -350,78 +429,160 @@ class RoutineAgent(BaseAgent):
             
             logger.info(f"RoutineAgent: Response obtained in {elapsed_time:.2f}s: {result}")
             return result
-            
+        
         except Exception as e:
+            return self._handle_error("processing message", start_time, e)
+    
+    async def aprocess_message(self, message: str, response_format: str = "markdown", websocket=None, chat_history=None, callbacks=None) -> str:
+        """
+        Processa uma mensagem sem bloquear o loop de eventos.
+        
+        `callbacks` são repassados ao executor (ex.: para transmitir a resposta
+        quando o orquestrador encaminha a mensagem direto a este agente).
+        """
+        start_time = time.time()
+        try:
+            logger.info(f"RoutineAgent: Processing message: {message}")
+            
+            # Converter o histórico de chat para o formato do LangChain
+            langchain_history = self._convert_chat_history(chat_history)
+            
+            # Injetar o snapshot das rotinas (em cache entre turnos)
+            routines_message = await self._aload_routines_into_history()
+            if routines_message:
+                langchain_history.append(AIMessage(content=routines_message))
+            
+            # Processar a mensagem usando o executor do agente
+            response = await self.agent_executor.ainvoke(
+                {
+                    "input": message,
+                    "chat_history": langchain_history
+                },
+                config={"callbacks": callbacks}
+            )
+            
             elapsed_time = time.time() - start_time
-            error_msg = f"Error processing message after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
-
-    def _load_routines_into_history(self) -> str:
+            result = response.get("output", "Sorry, I couldn't process your request.")
+            
+            logger.info(f"RoutineAgent: Response obtained in {elapsed_time:.2f}s: {result}")
+            return result
+        
+        except Exception as e:
+            return self._handle_error("processing message", start_time, e)
+    
+    def _format_routines_history(self, success: bool, error_msg: str, data: dict) -> Optional[str]:
+        """Monta a mensagem do histórico com todas as rotinas."""
+        if not success:
+            logger.error(f"RoutineAgent: Error loading routines: {error_msg}")
+            return None
+        
+        # Obter os dados das rotinas
+        routines = lambda_items(data)
+        if not routines:
+            logger.info("RoutineAgent: No routines found to load into history")
+            return None
+        
+        result = f"Here are all your routines:\n{compact_table(routines, ROUTINE_COLUMNS)}"
+        
+        logger.info(f"RoutineAgent: Loaded {len(routines)} routines into chat history")
+        return result
+    
+    def invalidate_snapshot(self):
+        """Descarta o snapshot das rotinas; o próximo turno busca a lista novamente."""
+        self.snapshot_cache.invalidate(ROUTINES_SNAPSHOT_KEY)
+    
+    def _cached_snapshot(self):
+        """Retorna o snapshot em cache (pode ser None, sem rotinas) ou MISSING."""
+        snapshot = self.snapshot_cache.get(ROUTINES_SNAPSHOT_KEY)
+        if snapshot is not MISSING:
+            logger.info("RoutineAgent: Using cached routines snapshot")
+        return snapshot
+    
+    def _store_snapshot(self, success: bool, error_msg: str, data: dict) -> Optional[str]:
+        """Formata o snapshot e o armazena em cache se a busca deu certo."""
+        snapshot = self._format_routines_history(success, error_msg, data)
+        if success:
+            self.snapshot_cache.set(ROUTINES_SNAPSHOT_KEY, snapshot)
+        return snapshot
+    
+    def _load_routines_into_history(self) -> Optional[str]:
         """
         Carrega todas as rotinas no histórico de chat.
         
+        A lista é buscada na API apenas quando não há snapshot válido em cache.
+        Falhas não são armazenadas, para que o próximo turno tente novamente.
+        
         Returns:
             str: Mensagem formatada com todas as rotinas ou None se não houver rotinas
         """
+        snapshot = self._cached_snapshot()
+        if snapshot is not MISSING:
+            return snapshot
+        
         try:
             logger.info("RoutineAgent: Loading all routines into chat history")
             
             # Buscar todas as rotinas
-            success, error_msg, data = self.api_client.get_routines()
-            if not success:
-                logger.error(f"RoutineAgent: Error loading routines: {error_msg}")
-                return None
-            
-            # Obter os dados das rotinas
-            routines = data.get('data', [])
-            if not routines:
-                logger.info("RoutineAgent: No routines found to load into history")
-                return None
-            
-            # Formatar a mensagem
-            result = "Here are all your routines:\n\n"
-            
-            field_labels = {
-                'name': 'Name',
-                'description': 'Description',
-                'status': 'Status',
-                'schedule': 'Schedule',
-                'frequency': 'Frequency',
-                'priority': 'Priority',
-                'tags': 'Tags',
-                'estimated_duration': 'Duration',
-                'start_date': 'Start Date',
-                'end_date': 'End Date',
-                'id': 'ID'
-            }
-            
-            for routine in routines:
-                if isinstance(routine, dict):
-                    result += f"**{routine.get('name', 'No name')}**\n"
-                    for field, label in field_labels.items():
-                        if field in routine:
-                            value = routine[field]
-                            if field == 'tags' and isinstance(value, list):
-                                value = ', '.join(value)
-                            elif field == 'estimated_duration':
-                                value = f"{value} minutes"
-                            if field != 'name':  # Name already added as title
-                                result += f"- **{label}:** {value}\n"
-                    result += "\n"
-                else:
-                    # If routine is a string or other type, just display the value
-                    result += f"**Routine:** {routine}\n\n"
-            
-            logger.info(f"RoutineAgent: Loaded {len(routines)} routines into chat history")
-            return result
+            return self._store_snapshot(*self.api_client.get_routines())
+        
+        except Exception as e:
+            logger.error(f"RoutineAgent: Error loading routines into history: {str(e)}")
+            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+            return None
+    
+    async def _aload_routines_into_history(self) -> Optional[str]:
+        """Versão assíncrona de _load_routines_into_history."""
+        snapshot = self._cached_snapshot()
+        if snapshot is not MISSING:
+            return snapshot
+        
+        try:
+            logger.info("RoutineAgent: Loading all routines into chat history")
             
+            return self._store_snapshot(*await self.api_client.aget_routines())
+        
         except Exception as e:
             logger.error(f"RoutineAgent: Error loading routines into history: {str(e)}")
             logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
             return None
-
+    
+    def _extract_api_error(self, result: dict) -> Optional[str]:
+        """Retorna a mensagem de erro contida no resultado da API, se houver."""
+        error_msg = lambda_message(result)
+        if error_msg and "Error" in error_msg:
+            logger.error(f"RoutineAgent: API returned error: {error_msg}")
+            return error_msg
+        return None
+    
+    def _extract_routine_id(self, result: dict) -> Optional[str]:
+        """Retorna o ID da rotina contido no resultado da API, se houver."""
+        result = parse_lambda_response(result)
+        if isinstance(result, dict):
+            return result.get("id")
+        return None
+    
+    def _render_routines(self, success: bool, error_msg: str, result: dict, start_time: float) -> str:
+        """Formata a resposta da listagem de rotinas."""
+        # Log detalhado da resposta da API
+        logger.info(f"RoutineAgent: API list response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
+        
+        api_error = self._extract_api_error(result)
+        if api_error:
+            return api_error
+        
+        if not success:
+            return error_msg
+        
+        routines_data = lambda_items(result)
+        if not routines_data:
+            return "No routines found."
+        
+        response = compact_table(routines_data, ROUTINE_COLUMNS)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"RoutineAgent: Routines listed in {elapsed_time:.2f}s")
+        return response
+    
     def get_routines(self, _=None) -> str:
         """Lista todas as rotinas."""
         try:
@@ -429,67 +590,74 @@ class RoutineAgent(BaseAgent):
             logger.info("RoutineAgent: Listing all routines")
             
             success, error_msg, result = self.api_client.get_routines()
+            return self._render_routines(success, error_msg, result, start_time)
+        
+        except Exception as e:
+            return self._handle_error("listing routines", start_time, e)
+    
+    async def aget_routines(self, _=None) -> str:
+        """Versão assíncrona de get_routines."""
+        start_time = time.time()
+        try:
+            logger.info("RoutineAgent: Listing all routines")
             
-            # Log detalhado da resposta da API
-            logger.info(f"RoutineAgent: API list response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
-            
-            # Verificar se há mensagem de erro no resultado
-            if result and isinstance(result, dict):
-                # Verificar se há mensagem de erro no resultado
-                if "message" in result and "Error" in result["message"]:
-                    error_msg = result["message"]
-                    logger.error(f"RoutineAgent: API returned error: {error_msg}")
-                    return error_msg
-                
-                # Verificar se há erro no corpo da resposta
-                if "body" in result and isinstance(result["body"], str):
-                    try:
-                        body_data = json.loads(result["body"])
-                        if "message" in body_data and "Error" in body_data["message"]:
-                            error_msg = body_data["message"]
-                            logger.error(f"RoutineAgent: API returned error in body: {error_msg}")
-                            return error_msg
-                    except json.JSONDecodeError:
-                        pass
-            
-            if not success:
-                return error_msg
-            
-            # Obter os dados das rotinas
-            routines_data = None
-            if result and isinstance(result, dict):
-                if "data" in result:
-                    routines_data = result["data"]
-                elif "body" in result and isinstance(result["body"], dict) and "data" in result["body"]:
-                    routines_data = result["body"]["data"]
-            
-            if not routines_data:
-                return "No routines found."
-            
-            # Formatar a resposta
-            response = "Here are all your routines:\n\n"
-            for routine in routines_data:
-                response += f"**{routine.get('name', 'No name')}**\n"
-                for key, value in routine.items():
-                    if key != 'name':  # Name already added as title
-                        if isinstance(value, list):
-                            value = ", ".join(value)
-                        response += f"- **{key}:** {value}\n"
-                response += "\n"
-            
-            elapsed_time = time.time() - start_time
-            logger.info(f"RoutineAgent: Routines listed in {elapsed_time:.2f}s")
-            return response
-            
+            success, error_msg, result = await self.api_client.aget_routines()
+            return self._render_routines(success, error_msg, result, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Error listing routines after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+            return self._handle_error("listing routines", start_time, e)
+    
+    def _render_routine(self, routine_id: str, success: bool, error_msg: str, result: dict, start_time: float) -> str:
+        """Formata a resposta com os detalhes de uma rotina."""
+        # Log detalhado da resposta da API
+        logger.info(f"RoutineAgent: API get response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
+        
+        api_error = self._extract_api_error(result)
+        if api_error:
+            return api_error
+        
+        if not success:
+            return error_msg
+        
+        # Obter os dados da rotina
+        result = parse_lambda_response(result)
+        routine_data = result.get("data") if isinstance(result, dict) else None
+        if not isinstance(routine_data, dict) or not routine_data:
+            return f"Routine with ID {routine_id} not found."
+        
+        response = compact_record(routine_data, ROUTINE_COLUMNS)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"RoutineAgent: Routine retrieved in {elapsed_time:.2f}s")
+        return response
+    
+    def _split_routine_ids(self, routine_id: str) -> list[str]:
+        """Separa os IDs informados por vírgula, ponto e vírgula ou espaço (sem repetições)."""
+        return list(dict.fromkeys(part for part in re.split(r"[\s,;]+", routine_id.strip()) if part))
+    
+    def _render_routines_by_ids(self, success: bool, error_msg: str, result: dict, start_time: float) -> str:
+        """Formata a resposta da busca de várias rotinas por ID."""
+        api_error = self._extract_api_error(result)
+        if api_error:
+            return api_error
+        
+        if not success:
             return error_msg
+        
+        routines = result.get("data") or [] if isinstance(result, dict) else []
+        missing = result.get("missing") or [] if isinstance(result, dict) else []
+        
+        if missing:
+            response = compact_table(routines, ROUTINE_COLUMNS, missing=missing)
+        else:
+            response = compact_table(routines, ROUTINE_COLUMNS)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"RoutineAgent: {len(routines)} routines retrieved by ID in {elapsed_time:.2f}s")
+        return response
     
     def get_routine(self, routine_id: str = "", _=None) -> str:
-        """Obtém uma rotina específica pelo ID."""
+        """Obtém uma rotina específica pelo ID (ou várias, em uma única requisição)."""
         try:
             start_time = time.time()
             
@@ -497,64 +665,129 @@ class RoutineAgent(BaseAgent):
             if not routine_id:
                 logger.warning("RoutineAgent: Attempt to get routine without ID")
                 return "Please provide the ID of the routine you want to get."
-                
+            
+            routine_ids = self._split_routine_ids(routine_id)
+            if len(routine_ids) > 1:
+                logger.info(f"RoutineAgent: Getting {len(routine_ids)} routines in batch")
+                success, error_msg, result = self.api_client.get_routines_by_ids(routine_ids)
+                return self._render_routines_by_ids(success, error_msg, result, start_time)
+            
             logger.info(f"RoutineAgent: Getting routine {routine_id}")
             
             success, error_msg, result = self.api_client.get_routine(routine_id)
+            return self._render_routine(routine_id, success, error_msg, result, start_time)
+        
+        except Exception as e:
+            return self._handle_error("getting routine", start_time, e)
+    
+    async def aget_routine(self, routine_id: str = "", _=None) -> str:
+        """Versão assíncrona de get_routine."""
+        start_time = time.time()
+        try:
+            if not routine_id:
+                logger.warning("RoutineAgent: Attempt to get routine without ID")
+                return "Please provide the ID of the routine you want to get."
             
-            # Log detalhado da resposta da API
-            logger.info(f"RoutineAgent: API get response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
-            
-            # Verificar se há mensagem de erro no resultado
-            if result and isinstance(result, dict):
-                # Verificar se há mensagem de erro no resultado
-                if "message" in result and "Error" in result["message"]:
-                    error_msg = result["message"]
-                    logger.error(f"RoutineAgent: API returned error: {error_msg}")
-                    return error_msg
-                
-                # Verificar se há erro no corpo da resposta
-                if "body" in result and isinstance(result["body"], str):
-                    try:
-                        body_data = json.loads(result["body"])
-                        if "message" in body_data and "Error" in body_data["message"]:
-                            error_msg = body_data["message"]
-                            logger.error(f"RoutineAgent: API returned error in body: {error_msg}")
-                            return error_msg
-                    except json.JSONDecodeError:
-                        pass
-            
-            if not success:
-                return error_msg
-            
-            # Obter os dados da rotina
-            routine_data = None
-            if result and isinstance(result, dict):
-                if "data" in result:
-                    routine_data = result["data"]
-                elif "body" in result and isinstance(result["body"], dict) and "data" in result["body"]:
-                    routine_data = result["body"]["data"]
-            
-            if not routine_data:
-                return f"Routine with ID {routine_id} not found."
-            
-            # Formatar a resposta
-            response = f"Routine details:\n\n"
-            for key, value in routine_data.items():
-                if isinstance(value, list):
-                    value = ", ".join(value)
-                response += f"{key}: {value}\n"
+            routine_ids = self._split_routine_ids(routine_id)
+            if len(routine_ids) > 1:
+                logger.info(f"RoutineAgent: Getting {len(routine_ids)} routines in batch")
+                success, error_msg, result = await self.api_client.aget_routines_by_ids(routine_ids)
+                return self._render_routines_by_ids(success, error_msg, result, start_time)
             
-            elapsed_time = time.time() - start_time
-            logger.info(f"RoutineAgent: Routine retrieved in {elapsed_time:.2f}s")
-            return response
+            logger.info(f"RoutineAgent: Getting routine {routine_id}")
             
+            success, error_msg, result = await self.api_client.aget_routine(routine_id)
+            return self._render_routine(routine_id, success, error_msg, result, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Error getting routine after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+            return self._handle_error("getting routine", start_time, e)
+    
+    def _build_routine_data(self, input_str: str) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Converte a entrada 'name|description|status|...' nos dados da rotina.
+        
+        Returns:
+            tuple: (dados, None) em caso de sucesso ou (None, mensagem de erro)
+        """
+        # Verificar se input_str está vazio
+        if not input_str:
+            logger.warning("RoutineAgent: Attempt to create routine without data")
+            return None, "Please provide the routine data you want to create."
+        
+        # Parse input string
+        parts = input_str.split('|')
+        if len(parts) < 1:
+            return None, "Invalid format. At least the name field is required."
+        
+        # Extrair o nome (campo obrigatório)
+        name = parts[0].strip()
+        if not name:
+            return None, "The name field is required and cannot be empty."
+        
+        # Inicializar dados com valores padrão
+        data = {
+            "name": name,
+            "status": "pending",
+            "schedule": "09:00",
+            "frequency": "daily",
+            "priority": "low",
+            "tags": [],
+            "estimated_duration": 0,
+            "description": ""  # Adicionar descrição vazia por padrão
+        }
+        
+        # Adicionar campos opcionais se fornecidos
+        if len(parts) > 1 and parts[1].strip():
+            data["description"] = parts[1].strip()
+        if len(parts) > 2 and parts[2].strip():
+            data["status"] = parts[2].strip()
+        if len(parts) > 3 and parts[3].strip():
+            data["schedule"] = parts[3].strip()
+        if len(parts) > 4 and parts[4].strip():
+            data["frequency"] = parts[4].strip()
+        if len(parts) > 5 and parts[5].strip():
+            data["priority"] = parts[5].strip()
+        if len(parts) > 6 and parts[6].strip():
+            data["tags"] = [tag.strip() for tag in parts[6].split(',')]
+        if len(parts) > 7 and parts[7].strip():
+            try:
+                data["estimated_duration"] = int(parts[7].strip())
+            except ValueError:
+                return None, "Duration must be an integer"
+        if len(parts) > 8 and parts[8].strip():
+            data["start_date"] = parts[8].strip()
+        if len(parts) > 9 and parts[9].strip():
+            data["end_date"] = parts[9].strip()
+        
+        # Validate data
+        validation_result = self._validate_routine_data(data)
+        if validation_result != "OK":
+            return None, validation_result
+        
+        # Log dos dados que serão enviados
+        logger.info(f"RoutineAgent: Sending data to API: {json.dumps(data, ensure_ascii=False)}")
+        return data, None
+    
+    def _render_mutation(self, action: str, success: bool, error_msg: str, result: dict, start_time: float) -> str:
+        """Formata a resposta da criação ou atualização de uma rotina."""
+        api_error = self._extract_api_error(result)
+        if api_error:
+            return api_error
+        
+        if not success:
             return error_msg
+        
+        # Verificar se o resultado contém um ID
+        routine_id = self._extract_routine_id(result)
+        
+        elapsed_time = time.time() - start_time
+        if routine_id:
+            success_msg = f"Routine {action} successfully!\nID: {routine_id}"
+        else:
+            success_msg = f"Routine {action} successfully, but no ID was returned."
+        
+        logger.info(f"RoutineAgent: Routine {action} in {elapsed_time:.2f}s: {success_msg}")
+        return success_msg
     
     def create_routine(self, input_str: str = "", _=None) -> str:
         """Cria uma nova rotina."""
@@ -562,118 +795,200 @@ class RoutineAgent(BaseAgent):
             start_time = time.time()
             logger.info(f"RoutineAgent: Creating routine with input: {input_str}")
             
-            # Verificar se input_str está vazio
-            if not input_str:
-                logger.warning("RoutineAgent: Attempt to create routine without data")
-                return "Please provide the routine data you want to create."
-            
-            # Parse input string
-            parts = input_str.split('|')
-            if len(parts) < 1:
-                return "Invalid format. At least the name field is required."
-            
-            # Extrair o nome (campo obrigatório)
-            name = parts[0].strip()
-            if not name:
-                return "The name field is required and cannot be empty."
-            
-            # Inicializar dados com valores padrão
-            data = {
-                "name": name,
-                "status": "pending",
-                "schedule": "09:00",
-                "frequency": "daily",
-                "priority": "low",
-                "tags": [],
-                "estimated_duration": 0,
-                "description": ""  # Adicionar descrição vazia por padrão
-            }
-            
-            # Adicionar campos opcionais se fornecidos
-            if len(parts) > 1 and parts[1].strip():
-                data["description"] = parts[1].strip()
-            if len(parts) > 2 and parts[2].strip():
-                data["status"] = parts[2].strip()
-            if len(parts) > 3 and parts[3].strip():
-                data["schedule"] = parts[3].strip()
-            if len(parts) > 4 and parts[4].strip():
-                data["frequency"] = parts[4].strip()
-            if len(parts) > 5 and parts[5].strip():
-                data["priority"] = parts[5].strip()
-            if len(parts) > 6 and parts[6].strip():
-                data["tags"] = [tag.strip() for tag in parts[6].split(',')]
-            if len(parts) > 7 and parts[7].strip():
-                try:
-                    data["estimated_duration"] = int(parts[7].strip())
-                except ValueError:
-                    return "Duration must be an integer"
-            if len(parts) > 8 and parts[8].strip():
-                data["start_date"] = parts[8].strip()
-            if len(parts) > 9 and parts[9].strip():
-                data["end_date"] = parts[9].strip()
-            
-            # Validate data
-            validation_result = self._validate_routine_data(data)
-            if validation_result != "OK":
-                return validation_result
-            
-            # Log dos dados que serão enviados
-            logger.info(f"RoutineAgent: Sending data to API: {json.dumps(data, ensure_ascii=False)}")
+            data, validation_error = self._build_routine_data(input_str)
+            if validation_error:
+                return validation_error
             
             # Make request
             success, error_msg, result = self.api_client.create_routine(
                 json.dumps(data),
                 {'Content-Type': 'application/json'}
             )
+            self.invalidate_snapshot()
             
             # Log do resultado da API
             logger.info(f"RoutineAgent: API response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, ensure_ascii=False)}")
+            return self._render_mutation("created", success, error_msg, result, start_time)
+        
+        except Exception as e:
+            return self._handle_error("creating routine", start_time, e)
+    
+    async def acreate_routine(self, input_str: str = "", _=None) -> str:
+        """Versão assíncrona de create_routine."""
+        start_time = time.time()
+        try:
+            logger.info(f"RoutineAgent: Creating routine with input: {input_str}")
             
-            # Verificar se há mensagem de erro no resultado
-            if result and isinstance(result, dict):
-                # Verificar se há mensagem de erro no resultado
-                if "message" in result and "Error" in result["message"]:
-                    error_msg = result["message"]
-                    logger.error(f"RoutineAgent: API returned error: {error_msg}")
-                    return error_msg
-                
-                # Verificar se há erro no corpo da resposta
-                if "body" in result and isinstance(result["body"], str):
-                    try:
-                        body_data = json.loads(result["body"])
-                        if "message" in body_data and "Error" in body_data["message"]:
-                            error_msg = body_data["message"]
-                            logger.error(f"RoutineAgent: API returned error in body: {error_msg}")
-                            return error_msg
-                    except json.JSONDecodeError:
-                        pass
-            
-            if not success:
-                return error_msg
-            
-            # Verificar se o resultado contém um ID
-            routine_id = None
-            if result and isinstance(result, dict):
-                if "id" in result:
-                    routine_id = result["id"]
-                elif "body" in result and isinstance(result["body"], dict) and "id" in result["body"]:
-                    routine_id = result["body"]["id"]
+            data, validation_error = self._build_routine_data(input_str)
+            if validation_error:
+                return validation_error
             
-            elapsed_time = time.time() - start_time
-            if routine_id:
-                success_msg = f"Routine created successfully!\nID: {routine_id}"
-            else:
-                success_msg = "Routine created successfully, but no ID was returned."
-            
-            logger.info(f"RoutineAgent: Routine created in {elapsed_time:.2f}s: {success_msg}")
-            return success_msg
+            success, error_msg, result = await self.api_client.acreate_routine(
+                json.dumps(data),
+                {'Content-Type': 'application/json'}
+            )
+            self.invalidate_snapshot()
             
+            # Log do resultado da API
+            logger.info(f"RoutineAgent: API response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, ensure_ascii=False)}")
+            return self._render_mutation("created", success, error_msg, result, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Error creating routine after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("creating routine", start_time, e)
+    
+    def _parse_routine_updates(self, input_str: str) -> tuple[Optional[str], Optional[dict], Optional[str]]:
+        """
+        Converte a entrada 'routine_id|field1=value1|...' nos campos a atualizar.
+        
+        O campo opcional `version` é a versão da rotina que o LLM leu; ele segue
+        em `updates` e é separado do delta em update_routine.
+        
+        Returns:
+            tuple: (routine_id, campos, None) em caso de sucesso ou (None, None, mensagem de erro)
+        """
+        # Verificar se input_str está vazio
+        if not input_str:
+            logger.warning("RoutineAgent: Attempt to update routine without data")
+            return None, None, "Please provide the routine data you want to update."
+        
+        # Parse input string
+        parts = input_str.split('|')
+        if len(parts) < 2:
+            return None, None, "Invalid format. Use: 'routine_id|field1=value1|field2=value2|...'"
+        
+        routine_id = parts[0]
+        
+        # Preparar os dados de atualização
+        updates = {}
+        
+        # Mapeamento de nomes de campos alternativos para nomes padrão
+        field_mapping = {
+            'description': 'description',
+            'desc': 'description',
+            'name': 'name',
+            'title': 'name',
+            'status': 'status',
+            'schedule': 'schedule',
+            'time': 'schedule',
+            'frequency': 'frequency',
+            'freq': 'frequency',
+            'priority': 'priority',
+            'pri': 'priority',
+            'tags': 'tags',
+            'tag': 'tags',
+            'estimated_duration': 'estimated_duration',
+            'duration': 'estimated_duration',
+            'estimatedduration': 'estimated_duration',
+            'start_date': 'start_date',
+            'startdate': 'start_date',
+            'start': 'start_date',
+            'end_date': 'end_date',
+            'enddate': 'end_date',
+            'end': 'end_date',
+            'version': 'version',
+            'ver': 'version'
+        }
+        
+        # Parse update fields
+        for part in parts[1:]:
+            if '=' not in part:
+                continue
+            field, value = part.split('=', 1)
+            field = field.strip().lower()
+            value = value.strip()
+            
+            # Mapear o nome do campo para o nome padrão
+            if field in field_mapping:
+                field = field_mapping[field]
+            
+            # Handle special fields with proper type conversion
+            if field == 'tags':
+                updates[field] = [tag.strip() for tag in value.split(',')] if value else []
+            elif field == 'estimated_duration':
+                try:
+                    updates[field] = int(value) if value else 0
+                except (ValueError, TypeError):
+                    logger.warning(f"RoutineAgent: Invalid value for estimated_duration: {value}")
+                    return None, None, f"Invalid value for estimated_duration: {value}. Must be an integer."
+            elif field == 'version':
+                # Versão lida pelo LLM (coluna `ver`): torna a atualização condicional
+                try:
+                    updates[field] = int(value)
+                except (ValueError, TypeError):
+                    logger.warning(f"RoutineAgent: Invalid value for version: {value}")
+                    return None, None, f"Invalid value for version: {value}. Must be an integer."
+            elif field == 'status' and not value:
+                updates[field] = self.default_values['status']
+            elif field == 'frequency' and not value:
+                updates[field] = self.default_values['frequency']
+            elif field == 'priority' and not value:
+                updates[field] = self.default_values['priority']
+            elif field in ['schedule', 'start_date', 'end_date'] and not value:
+                updates[field] = None
+            else:
+                updates[field] = value
+        
+        if not any(field != 'version' for field in updates):
+            return None, None, "No fields to update were provided."
+        
+        # Log das atualizações
+        logger.info(f"RoutineAgent: Update fields: {json.dumps(updates, indent=2)}")
+        return routine_id, updates, None
+    
+    def _prepare_routine_updates(self, updates: dict) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Normaliza e valida apenas os campos a atualizar (o delta enviado à API).
+        
+        Returns:
+            tuple: (campos a atualizar, None) em caso de sucesso ou (None, mensagem de erro)
+        """
+        changes = dict(updates)
+        
+        # Garantir que campos de data sejam strings ou None
+        for date_field in ['start_date', 'end_date']:
+            if changes.get(date_field) is not None:
+                changes[date_field] = str(changes[date_field])
+        
+        # Garantir que estimated_duration seja um inteiro
+        if 'estimated_duration' in changes:
+            try:
+                changes['estimated_duration'] = int(changes['estimated_duration'])
+            except (ValueError, TypeError):
+                logger.warning(f"RoutineAgent: Invalid value for estimated_duration: {changes['estimated_duration']}")
+                return None, f"Invalid value for estimated_duration: {changes['estimated_duration']}. Must be an integer."
+        
+        validation_result = self._validate_routine_data(changes, is_update=True)
+        if validation_result != "OK":
+            logger.warning(f"RoutineAgent: Validation failed: {validation_result}")
+            return None, validation_result
+        
+        logger.info(f"RoutineAgent: Update delta: {json.dumps(changes, indent=2)}")
+        return changes, None
+    
+    def _routine_data(self, success: bool, result: dict) -> Optional[dict]:
+        """Dados da rotina em uma resposta de obtenção da API, se houver."""
+        result = parse_lambda_response(result) if success else None
+        routine_data = result.get("data") if isinstance(result, dict) else None
+        return routine_data if isinstance(routine_data, dict) and routine_data else None
+    
+    def _render_conflict(self, routine_id: str, expected_version: int, success: bool, result: dict) -> str:
+        """
+        Informa ao LLM que a rotina mudou desde a versão lida e nada foi gravado.
+        
+        A rotina atual vai junto para que o LLM confira com o usuário se a
+        alteração ainda faz sentido antes de reenviá-la com a nova versão.
+        """
+        logger.warning(f"RoutineAgent: Version conflict on routine {routine_id} (expected version {expected_version})")
+        routine_data = self._routine_data(success, result)
+        if not routine_data:
+            return f"Routine {routine_id} was changed by someone else since version {expected_version} and was not updated."
+        
+        current_version = routine_data.get("version", 0)
+        return (
+            f"Routine {routine_id} was changed by someone else since version {expected_version} and was not updated. "
+            f"Current routine: {compact_record(routine_data, ROUTINE_COLUMNS)}. "
+            f"Tell the user what changed and, if they still want the update, send it again with version={current_version}."
+        )
     
     def update_routine(self, input_str: str = "", _=None) -> str:
         """Atualiza uma rotina existente."""
@@ -681,178 +996,81 @@ class RoutineAgent(BaseAgent):
             start_time = time.time()
             logger.info(f"RoutineAgent: Updating routine with input: {input_str}")
             
-            # Verificar se input_str está vazio
-            if not input_str:
-                logger.warning("RoutineAgent: Attempt to update routine without data")
-                return "Please provide the routine data you want to update."
-            
-            # Parse input string
-            parts = input_str.split('|')
-            if len(parts) < 2:
-                return "Invalid format. Use: 'routine_id|field1=value1|field2=value2|...'"
-            
-            routine_id = parts[0]
-            
-            # Primeiro, buscar a rotina existente
-            success, error_msg, existing_data = self.api_client.get_routine(routine_id)
-            if not success:
-                return f"Error fetching existing routine: {error_msg}"
-            
-            # Obter os dados existentes da rotina
-            existing_routine = existing_data.get('data', {})
-            if not existing_routine:
-                return f"Routine with ID {routine_id} not found."
-            
-            # Log dos dados existentes
-            logger.info(f"RoutineAgent: Existing routine data: {json.dumps(existing_routine, indent=2)}")
-            
-            # Preparar os dados de atualização
-            updates = {}
-            
-            # Mapeamento de nomes de campos alternativos para nomes padrão
-            field_mapping = {
-                'description': 'description',
-                'desc': 'description',
-                'name': 'name',
-                'title': 'name',
-                'status': 'status',
-                'schedule': 'schedule',
-                'time': 'schedule',
-                'frequency': 'frequency',
-                'freq': 'frequency',
-                'priority': 'priority',
-                'pri': 'priority',
-                'tags': 'tags',
-                'tag': 'tags',
-                'estimated_duration': 'estimated_duration',
-                'duration': 'estimated_duration',
-                'estimatedduration': 'estimated_duration',
-                'start_date': 'start_date',
-                'startdate': 'start_date',
-                'start': 'start_date',
-                'end_date': 'end_date',
-                'enddate': 'end_date',
-                'end': 'end_date'
-            }
-            
-            # Parse update fields
-            for part in parts[1:]:
-                if '=' not in part:
-                    continue
-                field, value = part.split('=', 1)
-                field = field.strip().lower()
-                value = value.strip()
-                
-                # Mapear o nome do campo para o nome padrão
-                if field in field_mapping:
-                    field = field_mapping[field]
-                
-                # Handle special fields with proper type conversion
-                if field == 'tags':
-                    updates[field] = [tag.strip() for tag in value.split(',')] if value else []
-                elif field == 'estimated_duration':
-                    try:
-                        updates[field] = int(value) if value else 0
-                    except (ValueError, TypeError):
-                        logger.warning(f"RoutineAgent: Invalid value for estimated_duration: {value}")
-                        return f"Invalid value for estimated_duration: {value}. Must be an integer."
-                elif field == 'status' and not value:
-                    updates[field] = self.default_values['status']
-                elif field == 'frequency' and not value:
-                    updates[field] = self.default_values['frequency']
-                elif field == 'priority' and not value:
-                    updates[field] = self.default_values['priority']
-                elif field in ['schedule', 'start_date', 'end_date'] and not value:
-                    updates[field] = None
-                else:
-                    updates[field] = value
-            
-            if not updates:
-                return "No fields to update were provided."
-            
-            # Log das atualizações
-            logger.info(f"RoutineAgent: Update fields: {json.dumps(updates, indent=2)}")
-            
-            # Mesclar os dados existentes com as atualizações
-            merged_data = existing_routine.copy()
-            merged_data.update(updates)
-            
-            # Garantir que campos de data sejam strings ou None
-            for date_field in ['start_date', 'end_date']:
-                if date_field in merged_data:
-                    if merged_data[date_field] is None:
-                        merged_data[date_field] = None
-                    else:
-                        merged_data[date_field] = str(merged_data[date_field])
-            
-            # Garantir que estimated_duration seja um inteiro
-            if 'estimated_duration' in merged_data:
-                try:
-                    merged_data['estimated_duration'] = int(merged_data['estimated_duration'])
-                except (ValueError, TypeError):
-                    logger.warning(f"RoutineAgent: Invalid value for estimated_duration: {merged_data['estimated_duration']}")
-                    return f"Invalid value for estimated_duration: {merged_data['estimated_duration']}. Must be an integer."
+            routine_id, updates, parse_error = self._parse_routine_updates(input_str)
+            if parse_error:
+                return parse_error
             
-            # Log dos dados mesclados
-            logger.info(f"RoutineAgent: Merged data: {json.dumps(merged_data, indent=2)}")
+            expected_version = updates.pop('version', None)
+            changes, validation_error = self._prepare_routine_updates(updates)
+            if validation_error:
+                return validation_error
             
-            # Validar os dados mesclados
-            validation_result = self._validate_routine_data(merged_data, is_update=True)
-            if validation_result != "OK":
-                logger.warning(f"RoutineAgent: Validation failed: {validation_result}")
-                return validation_result
+            # Enviar só os campos alterados: a API grava o delta sem sobrescrever o resto.
+            # Com a versão que o LLM leu a escrita é condicional; sem ela, é direta (uma única chamada)
+            success, error_msg, result = self.api_client.update_routine(routine_id, changes, expected_version)
+            self.invalidate_snapshot()
             
-            # Fazer a requisição de atualização com os dados mesclados
-            success, error_msg, result = self.api_client.update_routine(routine_id, merged_data)
+            if expected_version is not None and self.api_client.is_version_conflict(error_msg, result):
+                # Não reenviar o delta às cegas: devolver a rotina atual ao LLM
+                read_success, read_error, read_result = self.api_client.get_routine(routine_id)
+                return self._render_conflict(routine_id, expected_version, read_success, read_result)
             
             # Log detalhado da resposta da API
             logger.info(f"RoutineAgent: API update response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
+            return self._render_mutation("updated", success, error_msg, result, start_time)
+        
+        except Exception as e:
+            return self._handle_error("updating routine", start_time, e)
+    
+    async def aupdate_routine(self, input_str: str = "", _=None) -> str:
+        """Versão assíncrona de update_routine."""
+        start_time = time.time()
+        try:
+            logger.info(f"RoutineAgent: Updating routine with input: {input_str}")
             
-            # Verificar se há mensagem de erro no resultado
-            if result and isinstance(result, dict):
-                # Verificar se há mensagem de erro no resultado
-                if "message" in result and "Error" in result["message"]:
-                    error_msg = result["message"]
-                    logger.error(f"RoutineAgent: API returned error: {error_msg}")
-                    return error_msg
-                
-                # Verificar se há erro no corpo da resposta
-                if "body" in result and isinstance(result["body"], str):
-                    try:
-                        body_data = json.loads(result["body"])
-                        if "message" in body_data and "Error" in body_data["message"]:
-                            error_msg = body_data["message"]
-                            logger.error(f"RoutineAgent: API returned error in body: {error_msg}")
-                            return error_msg
-                    except json.JSONDecodeError:
-                        pass
-            
-            if not success:
-                return error_msg
-            
-            # Verificar se o resultado contém um ID
-            routine_id = None
-            if result and isinstance(result, dict):
-                if "id" in result:
-                    routine_id = result["id"]
-                elif "body" in result and isinstance(result["body"], dict) and "id" in result["body"]:
-                    routine_id = result["body"]["id"]
+            routine_id, updates, parse_error = self._parse_routine_updates(input_str)
+            if parse_error:
+                return parse_error
             
-            elapsed_time = time.time() - start_time
-            if routine_id:
-                success_msg = f"Routine updated successfully!\nID: {routine_id}"
-            else:
-                success_msg = "Routine updated successfully, but no ID was returned."
+            expected_version = updates.pop('version', None)
+            changes, validation_error = self._prepare_routine_updates(updates)
+            if validation_error:
+                return validation_error
+            
+            # Enviar só os campos alterados: a API grava o delta sem sobrescrever o resto.
+            # Com a versão que o LLM leu a escrita é condicional; sem ela, é direta (uma única chamada)
+            success, error_msg, result = await self.api_client.aupdate_routine(routine_id, changes, expected_version)
+            self.invalidate_snapshot()
             
-            logger.info(f"RoutineAgent: Routine updated in {elapsed_time:.2f}s: {success_msg}")
-            return success_msg
+            if expected_version is not None and self.api_client.is_version_conflict(error_msg, result):
+                # Não reenviar o delta às cegas: devolver a rotina atual ao LLM
+                read_success, read_error, read_result = await self.api_client.aget_routine(routine_id)
+                return self._render_conflict(routine_id, expected_version, read_success, read_result)
             
+            # Log detalhado da resposta da API
+            logger.info(f"RoutineAgent: API update response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
+            return self._render_mutation("updated", success, error_msg, result, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Error updating routine after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
+            return self._handle_error("updating routine", start_time, e)
+    
+    def _render_deletion(self, routine_id: str, success: bool, error_msg: str, result: dict, start_time: float) -> str:
+        """Formata a resposta da remoção de uma rotina."""
+        # Log detalhado da resposta da API
+        logger.info(f"RoutineAgent: API delete response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
+        
+        api_error = self._extract_api_error(result)
+        if api_error:
+            return api_error
+        
+        if not success:
             return error_msg
+        
+        elapsed_time = time.time() - start_time
+        success_msg = f"Routine {routine_id} deleted successfully!"
+        
+        logger.info(f"RoutineAgent: Routine deleted in {elapsed_time:.2f}s")
+        return success_msg
     
     def delete_routine(self, routine_id: str = "", _=None) -> str:
         """Deleta uma rotina existente."""
@@ -863,45 +1081,34 @@ class RoutineAgent(BaseAgent):
             if not routine_id:
                 logger.warning("RoutineAgent: Attempt to delete routine without ID")
                 return "Please provide the ID of the routine you want to delete."
-                
+            
             logger.info(f"RoutineAgent: Deleting routine {routine_id}")
             
             success, error_msg, result = self.api_client.delete_routine(routine_id)
+            self.invalidate_snapshot()
+            return self._render_deletion(routine_id, success, error_msg, result, start_time)
+        
+        except Exception as e:
+            return self._handle_error("deleting routine", start_time, e)
+    
+    async def adelete_routine(self, routine_id: str = "", _=None) -> str:
+        """Versão assíncrona de delete_routine."""
+        start_time = time.time()
+        try:
+            if not routine_id:
+                logger.warning("RoutineAgent: Attempt to delete routine without ID")
+                return "Please provide the ID of the routine you want to delete."
             
-            # Log detalhado da resposta da API
-            logger.info(f"RoutineAgent: API delete response - Success: {success}, Error: {error_msg}, Result: {json.dumps(result, indent=2)}")
-            
-            # Verificar se há mensagem de erro no resultado
-            if result and isinstance(result, dict):
-                # Verificar se há mensagem de erro no resultado
-                if "message" in result and "Error" in result["message"]:
-                    error_msg = result["message"]
-                    logger.error(f"RoutineAgent: API returned error: {error_msg}")
-                    return error_msg
-                
-                # Verificar se há erro no corpo da resposta
-                if "body" in result and isinstance(result["body"], str):
-                    try:
-                        body_data = json.loads(result["body"])
-                        if "message" in body_data and "Error" in body_data["message"]:
-                            error_msg = body_data["message"]
-                            logger.error(f"RoutineAgent: API returned error in body: {error_msg}")
-                            return error_msg
-                    except json.JSONDecodeError:
-                        pass
-            
-            if not success:
-                return error_msg
-            
-            elapsed_time = time.time() - start_time
-            success_msg = f"Routine {routine_id} deleted successfully!"
-            
-            logger.info(f"RoutineAgent: Routine deleted in {elapsed_time:.2f}s")
-            return success_msg
+            logger.info(f"RoutineAgent: Deleting routine {routine_id}")
             
+            success, error_msg, result = await self.api_client.adelete_routine(routine_id)
+            self.invalidate_snapshot()
+            return self._render_deletion(routine_id, success, error_msg, result, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Error deleting routine after {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"RoutineAgent: {error_msg}")
-            logger.error(f"RoutineAgent: Traceback: {traceback.format_exc()}")
-            return error_msg 
\ No newline at end of file
+            return self._handle_error("deleting routine", start_time, e)
+
+@lru_cache()
+def get_routine_agent() -> RoutineAgent:
+    """Retorna o agente de rotinas compartilhado pelo processo."""
+    return RoutineAgent()
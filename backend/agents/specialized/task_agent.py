@@ -1,53 +1,82 @@
 from ..base_agent import BaseAgent
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents import create_openai_tools_agent
+from ..parallel_executor import ParallelAgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.tools import Tool
+from config.settings import get_settings
+from utils.cache import MISSING, TTLCache
+from utils.http_client import aconditional_get, arequest, conditional_get, get_conditional_cache, get_session
+from utils.lambda_response import lambda_items, parse_lambda_response
+from ..tool_results import TASK_COLUMNS, compact_record, compact_table
 import requests
-import json
 import logging
 import traceback
 import time
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TASKS_API_URL = "https://api.itenorio.com/lambda/tasks"
+
+# Chave do snapshot das tarefas no cache do agente
+TASKS_SNAPSHOT_KEY = "tasks"
+
+# Resultado da listagem sem tarefas (não vai para o histórico)
+NO_TASKS_FOUND = "Nenhuma tarefa encontrada."
+
 class TaskAgent(BaseAgent):
     def __init__(self):
         system_prompt = """Você é um agente especializado em gerenciamento de tarefas.
         Sua função é ajudar a criar, listar, atualizar e remover tarefas.
         Você tem acesso a uma API de tarefas e deve usar as ferramentas disponíveis para realizar essas operações.
+        As ferramentas retornam as tarefas em JSON compacto; listas vêm como uma tabela com "cols" (nomes das colunas) e "rows" (uma lista de valores por tarefa). As chaves são id, desc (descrição), pri (prioridade), cat (categoria), status e created (data de criação). Apresente as tarefas ao usuário em texto legível, nunca em JSON.
+        Quando precisar de várias consultas independentes (por exemplo, os detalhes de várias tarefas), peça todas as ferramentas de uma vez.
         Sempre forneça respostas claras e organizadas."""
         
         super().__init__(system_prompt)
         
+        # Snapshot das tarefas injetado no histórico, reaproveitado entre turnos
+        # e sessões até expirar ou ser invalidado por uma alteração
+        self.snapshot_cache = TTLCache(get_settings().snapshot_cache_ttl_seconds)
+        
+        # Últimas respostas com ETag: GETs condicionais, em que uma lista que não
+        # mudou volta como 304, sem corpo
+        self.conditional_cache = get_conditional_cache()
+        
         # Definir as ferramentas específicas para tarefas
         self.tools = [
             Tool(
                 name="get_tasks",
                 func=self.get_tasks,
+                coroutine=self.aget_tasks,
                 description="Lista todas as tarefas disponíveis. Use esta ferramenta quando o usuário quiser ver todas as tarefas."
             ),
             Tool(
                 name="get_task",
                 func=self.get_task,
+                coroutine=self.aget_task,
                 description="Obtém detalhes de uma tarefa específica pelo ID. Use esta ferramenta quando o usuário quiser ver detalhes de uma tarefa específica."
             ),
             Tool(
                 name="create_task",
                 func=self.create_task,
+                coroutine=self.acreate_task,
                 description="Cria uma nova tarefa. Use esta ferramenta quando o usuário quiser criar uma nova tarefa."
             ),
             Tool(
                 name="update_task",
                 func=self.update_task,
+                coroutine=self.aupdate_task,
                 description="Atualiza uma tarefa existente. Use esta ferramenta quando o usuário quiser modificar uma tarefa existente."
             ),
             Tool(
                 name="delete_task",
                 func=self.delete_task,
+                coroutine=self.adelete_task,
                 description="Remove uma tarefa pelo ID. Use esta ferramenta quando o usuário quiser excluir uma tarefa."
             )
         ]
@@ -61,110 +90,133 @@ class TaskAgent(BaseAgent):
         ])
         
         # Criar o agente
-        self.agent = create_openai_functions_agent(
+        self.agent = create_openai_tools_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt
         )
         
         # Criar o executor do agente
-        self.agent_executor = AgentExecutor(
+        self.agent_executor = ParallelAgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True
         )
     
+    def _handle_error(self, action: str, start_time: float, error: Exception) -> str:
+        """Registra o erro de uma operação e retorna a mensagem para o usuário."""
+        elapsed_time = time.time() - start_time
+        error_msg = f"Erro ao {action} após {elapsed_time:.2f}s: {str(error)}"
+        logger.error(f"TaskAgent: {error_msg}")
+        logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
+        return error_msg
+    
+    def _format_tasks(self, data: Any, start_time: float) -> str:
+        """Converte a resposta da API com a lista de tarefas em uma tabela JSON compacta."""
+        tasks = lambda_items(data)
+        if tasks is None:
+            logger.warning(f"TaskAgent: Formato de resposta desconhecido: {data}")
+            tasks = []
+        
+        elapsed_time = time.time() - start_time
+        
+        if not tasks:
+            logger.info(f"TaskAgent: Nenhuma tarefa encontrada em {elapsed_time:.2f}s")
+            return NO_TASKS_FOUND
+        
+        result = compact_table(tasks, TASK_COLUMNS)
+        logger.info(f"TaskAgent: {len(tasks)} tarefas obtidas em {elapsed_time:.2f}s")
+        return result
+    
+    def _format_task(self, data: Any, task_id: str, start_time: float) -> str:
+        """Converte a resposta da API com os detalhes de uma tarefa em JSON compacto."""
+        task = parse_lambda_response(data)
+        
+        elapsed_time = time.time() - start_time
+        
+        if not task:
+            logger.info(f"TaskAgent: Tarefa {task_id} não encontrada em {elapsed_time:.2f}s")
+            return f"Tarefa com ID {task_id} não encontrada."
+        
+        if isinstance(task, dict):
+            result = compact_record(task, TASK_COLUMNS)
+        else:
+            # Fallback for unexpected format
+            logger.warning(f"TaskAgent: Formato de tarefa inesperado: {task}")
+            result = f"Detalhes da tarefa {task_id}: {task}"
+        
+        logger.info(f"TaskAgent: Detalhes da tarefa obtidos em {elapsed_time:.2f}s")
+        return result
+    
+    def _format_task_result(self, data: Any, success_msg: str) -> str:
+        """Acrescenta à mensagem de sucesso os campos da tarefa criada ou atualizada."""
+        result = parse_lambda_response(data)
+        if isinstance(result, dict):
+            return success_msg + compact_record(result, TASK_COLUMNS)
+        return success_msg + f"Resposta: {result}"
+    
+    def _parse_create_input(self, input_str: str) -> Optional[dict]:
+        """Converte 'description|priority|category|status' nos dados da requisição."""
+        parts = input_str.split('|')
+        if len(parts) != 4:
+            return None
+        
+        description, priority, category, status = parts
+        
+        return {
+            "descricao": description.strip(),
+            "prioridade": priority.strip(),
+            "categoria": category.strip(),
+            "status": status.strip()
+        }
+    
+    def _parse_update_input(self, input_str: str) -> Optional[tuple]:
+        """Converte 'task_id|campo1=valor1|...' em (task_id, campos a atualizar)."""
+        parts = input_str.split('|')
+        if len(parts) < 2:
+            return None
+        
+        task_id = parts[0]
+        updates = {}
+        
+        # Parse update fields
+        for part in parts[1:]:
+            if '=' not in part:
+                continue
+            field, value = part.split('=', 1)
+            updates[field.strip()] = value.strip()
+        
+        return task_id, updates
+    
     def get_tasks(self, query: str = "") -> str:
         """Obtém a lista de todas as tarefas."""
         try:
             start_time = time.time()
             logger.info(f"TaskAgent: Fazendo requisição GET para /lambda/tasks")
             
-            response = requests.get("https://api.itenorio.com/lambda/tasks")
+            response = conditional_get(TASKS_API_URL, self.conditional_cache)
             response.raise_for_status()
             
-            # Parse the response and handle different formats
-            data = response.json()
-            
-            # Check if the response has a specific structure
-            if isinstance(data, dict) and 'body' in data:
-                # Handle AWS Lambda response format
-                if isinstance(data['body'], str):
-                    # If body is a string, it might be JSON encoded
-                    try:
-                        body_data = json.loads(data['body'])
-                        if isinstance(body_data, dict) and 'Items' in body_data:
-                            tasks = body_data['Items']
-                        else:
-                            tasks = body_data
-                    except json.JSONDecodeError:
-                        tasks = []
-                elif isinstance(data['body'], dict) and 'Items' in data['body']:
-                    # Direct access to Items in body
-                    tasks = data['body']['Items']
-                else:
-                    tasks = data['body']
-            elif isinstance(data, list):
-                # Direct list of tasks
-                tasks = data
-            else:
-                # Unknown format, log and return empty
-                logger.warning(f"TaskAgent: Formato de resposta desconhecido: {data}")
-                tasks = []
-            
-            elapsed_time = time.time() - start_time
+            return self._format_tasks(response.json(), start_time)
+        
+        except requests.exceptions.RequestException as e:
+            return self._handle_error("obter tarefas", start_time, e)
+        except Exception as e:
+            return self._handle_error("obter tarefas", start_time, e)
+    
+    async def aget_tasks(self, query: str = "") -> str:
+        """Versão assíncrona de get_tasks."""
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Fazendo requisição GET para /lambda/tasks")
             
-            if not tasks:
-                logger.info(f"TaskAgent: Nenhuma tarefa encontrada em {elapsed_time:.2f}s")
-                return "Nenhuma tarefa encontrada."
-            
-            # Formatar a resposta
-            formatted_tasks = []
-            for task in tasks:
-                # Handle different task formats
-                if isinstance(task, dict):
-                    # Standard format
-                    task_id = task.get('id', task.get('ID', 'N/A'))
-                    description = task.get('description', task.get('Descrição', 'N/A'))
-                    priority = task.get('priority', task.get('Prioridade', 'N/A'))
-                    category = task.get('category', task.get('Categoria', 'N/A'))
-                    status = task.get('status', task.get('Status', 'N/A'))
-                    created_at = task.get('created_at', task.get('Data de Criação', 'N/A'))
-                else:
-                    # Fallback for unexpected format
-                    logger.warning(f"TaskAgent: Formato de tarefa inesperado: {task}")
-                    continue
-                
-                formatted_task = (
-                    f"ID: {task_id}\n"
-                    f"Descrição: {description}\n"
-                    f"Prioridade: {priority}\n"
-                    f"Categoria: {category}\n"
-                    f"Status: {status}\n"
-                    f"Data de Criação: {created_at}\n"
-                    "---"
-                )
-                formatted_tasks.append(formatted_task)
-            
-            if not formatted_tasks:
-                return "Nenhuma tarefa encontrada ou formato de tarefa não reconhecido."
-                
-            result = "\n".join(formatted_tasks)
-            logger.info(f"TaskAgent: Tarefas obtidas em {elapsed_time:.2f}s: {result}")
-            return result
+            response = await aconditional_get(TASKS_API_URL, self.conditional_cache)
+            response.raise_for_status()
             
-        except requests.exceptions.RequestException as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao obter tarefas após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._format_tasks(response.json(), start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao obter tarefas após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("obter tarefas", start_time, e)
     
     def get_task(self, task_id: str) -> str:
         """Obtém detalhes de uma tarefa específica pelo ID."""
@@ -172,71 +224,29 @@ class TaskAgent(BaseAgent):
             start_time = time.time()
             logger.info(f"TaskAgent: Obtendo detalhes da tarefa {task_id}")
             
-            response = requests.get(f"https://api.itenorio.com/lambda/tasks/{task_id}")
+            response = conditional_get(f"{TASKS_API_URL}/{task_id}", self.conditional_cache)
             response.raise_for_status()
             
-            # Parse the response and handle different formats
-            data = response.json()
-            
-            # Check if the response has a specific structure
-            if isinstance(data, dict) and 'body' in data:
-                # Handle AWS Lambda response format
-                if isinstance(data['body'], str):
-                    # If body is a string, it might be JSON encoded
-                    try:
-                        task = json.loads(data['body'])
-                    except json.JSONDecodeError:
-                        task = {}
-                else:
-                    task = data['body']
-            else:
-                task = data
-                
-            elapsed_time = time.time() - start_time
+            return self._format_task(response.json(), task_id, start_time)
+        
+        except requests.exceptions.RequestException as e:
+            return self._handle_error("obter detalhes da tarefa", start_time, e)
+        except Exception as e:
+            return self._handle_error("obter detalhes da tarefa", start_time, e)
+    
+    async def aget_task(self, task_id: str) -> str:
+        """Versão assíncrona de get_task."""
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Obtendo detalhes da tarefa {task_id}")
             
-            if not task:
-                logger.info(f"TaskAgent: Tarefa {task_id} não encontrada em {elapsed_time:.2f}s")
-                return f"Tarefa com ID {task_id} não encontrada."
-            
-            # Format the response
-            if isinstance(task, dict):
-                # Standard format
-                task_id = task.get('id', task.get('ID', 'N/A'))
-                description = task.get('description', task.get('Descrição', 'N/A'))
-                priority = task.get('priority', task.get('Prioridade', 'N/A'))
-                category = task.get('category', task.get('Categoria', 'N/A'))
-                status = task.get('status', task.get('Status', 'N/A'))
-                created_at = task.get('created_at', task.get('Data de Criação', 'N/A'))
-                
-                result = (
-                    f"**Detalhes da Tarefa**\n\n"
-                    f"**ID:** {task_id}\n"
-                    f"**Descrição:** {description}\n"
-                    f"**Prioridade:** {priority}\n"
-                    f"**Categoria:** {category}\n"
-                    f"**Status:** {status}\n"
-                    f"**Data de Criação:** {created_at}"
-                )
-            else:
-                # Fallback for unexpected format
-                logger.warning(f"TaskAgent: Formato de tarefa inesperado: {task}")
-                result = f"Detalhes da tarefa {task_id}: {task}"
-                
-            logger.info(f"TaskAgent: Detalhes da tarefa obtidos em {elapsed_time:.2f}s")
-            return result
+            response = await aconditional_get(f"{TASKS_API_URL}/{task_id}", self.conditional_cache)
+            response.raise_for_status()
             
-        except requests.exceptions.RequestException as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao obter detalhes da tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._format_task(response.json(), task_id, start_time)
+        
         except Exception as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao obter detalhes da tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("obter detalhes da tarefa", start_time, e)
     
     def create_task(self, input_str: str) -> str:
         """Cria uma nova tarefa."""
@@ -245,96 +255,52 @@ class TaskAgent(BaseAgent):
             logger.info(f"TaskAgent: Criando nova tarefa com input: {input_str}")
             
             # Parse input string
-            parts = input_str.split('|')
-            if len(parts) != 4:
+            data = self._parse_create_input(input_str)
+            if data is None:
                 return "Formato inválido. Use: 'description|priority|category|status'"
             
-            description, priority, category, status = parts
-            
-            # Prepare request data
-            data = {
-                "descricao": description.strip(),
-                "prioridade": priority.strip(),
-                "categoria": category.strip(),
-                "status": status.strip()
-            }
-            
             logger.info(f"TaskAgent: Dados da tarefa: {data}")
-
+            
             # Make request
-            response = requests.post(
-                "https://api.itenorio.com/lambda/tasks",
-                json=data
-            )
-
+            response = get_session().post(TASKS_API_URL, json=data)
+            self.invalidate_snapshot()
             response.raise_for_status()
             
-            # Parse the response and handle different formats
-            data = response.json()
-            
-            # Check if the response has a specific structure
-            if isinstance(data, dict) and 'body' in data:
-                # Handle AWS Lambda response format
-                if isinstance(data['body'], str):
-                    # If body is a string, it might be JSON encoded
-                    try:
-                        result = json.loads(data['body'])
-                    except json.JSONDecodeError:
-                        result = {}
-                else:
-                    result = data['body']
-            else:
-                result = data
-                
-            elapsed_time = time.time() - start_time
-            
-            # Create success message with available fields
-            success_msg = "Tarefa criada com sucesso!\n"
-            
-            # Add available fields to the message
-            if isinstance(result, dict):
-                if 'id' in result:
-                    success_msg += f"ID: {result['id']}\n"
-                elif 'ID' in result:
-                    success_msg += f"ID: {result['ID']}\n"
-                    
-                if 'description' in result:
-                    success_msg += f"Descrição: {result['description']}\n"
-                elif 'Descrição' in result:
-                    success_msg += f"Descrição: {result['Descrição']}\n"
-                    
-                if 'priority' in result:
-                    success_msg += f"Prioridade: {result['priority']}\n"
-                elif 'Prioridade' in result:
-                    success_msg += f"Prioridade: {result['Prioridade']}\n"
-                    
-                if 'category' in result:
-                    success_msg += f"Categoria: {result['category']}\n"
-                elif 'Categoria' in result:
-                    success_msg += f"Categoria: {result['Categoria']}\n"
-                    
-                if 'status' in result:
-                    success_msg += f"Status: {result['status']}\n"
-                elif 'Status' in result:
-                    success_msg += f"Status: {result['Status']}\n"
-            else:
-                success_msg += f"Resposta: {result}"
+            success_msg = self._format_task_result(response.json(), "Tarefa criada com sucesso!\n")
             
+            elapsed_time = time.time() - start_time
             logger.info(f"TaskAgent: Tarefa criada em {elapsed_time:.2f}s: {success_msg}")
             return success_msg
-            
+        
         except requests.exceptions.RequestException as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao criar tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("criar tarefa", start_time, e)
         except Exception as e:
+            return self._handle_error("criar tarefa", start_time, e)
+    
+    async def acreate_task(self, input_str: str) -> str:
+        """Versão assíncrona de create_task."""
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Criando nova tarefa com input: {input_str}")
+            
+            data = self._parse_create_input(input_str)
+            if data is None:
+                return "Formato inválido. Use: 'description|priority|category|status'"
+            
+            logger.info(f"TaskAgent: Dados da tarefa: {data}")
+            
+            response = await arequest("POST", TASKS_API_URL, json=data)
+            self.invalidate_snapshot()
+            response.raise_for_status()
+            
+            success_msg = self._format_task_result(response.json(), "Tarefa criada com sucesso!\n")
+            
             elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao criar tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            logger.info(f"TaskAgent: Tarefa criada em {elapsed_time:.2f}s: {success_msg}")
+            return success_msg
+        
+        except Exception as e:
+            return self._handle_error("criar tarefa", start_time, e)
     
     def update_task(self, input_str: str) -> str:
         """Atualiza uma tarefa existente."""
@@ -343,96 +309,56 @@ class TaskAgent(BaseAgent):
             logger.info(f"TaskAgent: Atualizando tarefa com input: {input_str}")
             
             # Parse input string
-            parts = input_str.split('|')
-            if len(parts) < 2:
+            parsed = self._parse_update_input(input_str)
+            if parsed is None:
                 return "Formato inválido. Use: 'task_id|campo1=valor1|campo2=valor2|...'"
             
-            task_id = parts[0]
-            updates = {}
-            
-            # Parse update fields
-            for part in parts[1:]:
-                if '=' not in part:
-                    continue
-                field, value = part.split('=', 1)
-                updates[field.strip()] = value.strip()
-            
+            task_id, updates = parsed
             if not updates:
                 return "Nenhum campo para atualizar foi fornecido."
             
             # Make request
-            response = requests.patch(
-                f"https://api.itenorio.com/lambda/tasks/{task_id}",
-                json=updates
-            )
+            response = get_session().patch(f"{TASKS_API_URL}/{task_id}", json=updates)
+            self.invalidate_snapshot()
             response.raise_for_status()
             
-            # Parse the response and handle different formats
-            data = response.json()
-            
-            # Check if the response has a specific structure
-            if isinstance(data, dict) and 'body' in data:
-                # Handle AWS Lambda response format
-                if isinstance(data['body'], str):
-                    # If body is a string, it might be JSON encoded
-                    try:
-                        result = json.loads(data['body'])
-                    except json.JSONDecodeError:
-                        result = {}
-                else:
-                    result = data['body']
-            else:
-                result = data
-                
-            elapsed_time = time.time() - start_time
-            
-            # Create success message with available fields
-            success_msg = f"Tarefa atualizada com sucesso!\n"
-            
-            # Add available fields to the message
-            if isinstance(result, dict):
-                if 'id' in result:
-                    success_msg += f"ID: {result['id']}\n"
-                elif 'ID' in result:
-                    success_msg += f"ID: {result['ID']}\n"
-                    
-                if 'description' in result:
-                    success_msg += f"Descrição: {result['description']}\n"
-                elif 'Descrição' in result:
-                    success_msg += f"Descrição: {result['Descrição']}\n"
-                    
-                if 'priority' in result:
-                    success_msg += f"Prioridade: {result['priority']}\n"
-                elif 'Prioridade' in result:
-                    success_msg += f"Prioridade: {result['Prioridade']}\n"
-                    
-                if 'category' in result:
-                    success_msg += f"Categoria: {result['category']}\n"
-                elif 'Categoria' in result:
-                    success_msg += f"Categoria: {result['Categoria']}\n"
-                    
-                if 'status' in result:
-                    success_msg += f"Status: {result['status']}\n"
-                elif 'Status' in result:
-                    success_msg += f"Status: {result['Status']}\n"
-            else:
-                success_msg += f"Resposta: {result}"
+            success_msg = self._format_task_result(response.json(), "Tarefa atualizada com sucesso!\n")
             
+            elapsed_time = time.time() - start_time
             logger.info(f"TaskAgent: Tarefa atualizada em {elapsed_time:.2f}s: {success_msg}")
             return success_msg
-            
+        
         except requests.exceptions.RequestException as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao atualizar tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("atualizar tarefa", start_time, e)
         except Exception as e:
+            return self._handle_error("atualizar tarefa", start_time, e)
+    
+    async def aupdate_task(self, input_str: str) -> str:
+        """Versão assíncrona de update_task."""
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Atualizando tarefa com input: {input_str}")
+            
+            parsed = self._parse_update_input(input_str)
+            if parsed is None:
+                return "Formato inválido. Use: 'task_id|campo1=valor1|campo2=valor2|...'"
+            
+            task_id, updates = parsed
+            if not updates:
+                return "Nenhum campo para atualizar foi fornecido."
+            
+            response = await arequest("PATCH", f"{TASKS_API_URL}/{task_id}", json=updates)
+            self.invalidate_snapshot()
+            response.raise_for_status()
+            
+            success_msg = self._format_task_result(response.json(), "Tarefa atualizada com sucesso!\n")
+            
             elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao atualizar tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            logger.info(f"TaskAgent: Tarefa atualizada em {elapsed_time:.2f}s: {success_msg}")
+            return success_msg
+        
+        except Exception as e:
+            return self._handle_error("atualizar tarefa", start_time, e)
     
     def delete_task(self, task_id: str) -> str:
         """Remove uma tarefa."""
@@ -441,7 +367,8 @@ class TaskAgent(BaseAgent):
             logger.info(f"TaskAgent: Removendo tarefa com ID: {task_id}")
             
             # Make request
-            response = requests.delete(f"https://api.itenorio.com/lambda/tasks/{task_id}")
+            response = get_session().delete(f"{TASKS_API_URL}/{task_id}")
+            self.invalidate_snapshot()
             response.raise_for_status()
             
             elapsed_time = time.time() - start_time
@@ -449,48 +376,107 @@ class TaskAgent(BaseAgent):
             
             logger.info(f"TaskAgent: Tarefa removida em {elapsed_time:.2f}s: {success_msg}")
             return success_msg
-            
+        
         except requests.exceptions.RequestException as e:
-            elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao remover tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            return self._handle_error("remover tarefa", start_time, e)
         except Exception as e:
+            return self._handle_error("remover tarefa", start_time, e)
+    
+    async def adelete_task(self, task_id: str) -> str:
+        """Versão assíncrona de delete_task."""
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Removendo tarefa com ID: {task_id}")
+            
+            response = await arequest("DELETE", f"{TASKS_API_URL}/{task_id}")
+            self.invalidate_snapshot()
+            response.raise_for_status()
+            
             elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao remover tarefa após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg
+            success_msg = f"Tarefa {task_id} removida com sucesso!"
+            
+            logger.info(f"TaskAgent: Tarefa removida em {elapsed_time:.2f}s: {success_msg}")
+            return success_msg
+        
+        except Exception as e:
+            return self._handle_error("remover tarefa", start_time, e)
+    
+    def invalidate_snapshot(self):
+        """Descarta o snapshot das tarefas; o próximo turno busca a lista novamente."""
+        self.snapshot_cache.invalidate(TASKS_SNAPSHOT_KEY)
+    
+    def _format_tasks_history(self, tasks: str) -> Optional[str]:
+        """Monta a mensagem do histórico com todas as tarefas."""
+        if tasks == NO_TASKS_FOUND:
+            logger.info("TaskAgent: Nenhuma tarefa encontrada para carregar no histórico")
+            return None
+        
+        # Formatar a mensagem
+        result = f"Aqui estão todas as suas tarefas:\n{tasks}"
+        
+        logger.info("TaskAgent: Tarefas carregadas no histórico com sucesso")
+        return result
     
-    def _load_tasks_into_history(self) -> str:
+    def _cached_snapshot(self):
+        """Retorna o snapshot em cache (pode ser None, sem tarefas) ou MISSING."""
+        snapshot = self.snapshot_cache.get(TASKS_SNAPSHOT_KEY)
+        if snapshot is not MISSING:
+            logger.info("TaskAgent: Usando snapshot das tarefas em cache")
+        return snapshot
+    
+    def _load_tasks_into_history(self) -> Optional[str]:
         """
         Carrega todas as tarefas no histórico de chat.
         
+        A lista é buscada na API apenas quando não há snapshot válido em cache.
+        Falhas não são armazenadas, para que o próximo turno tente novamente.
+        
         Returns:
             str: Mensagem formatada com todas as tarefas ou None se não houver tarefas
         """
+        snapshot = self._cached_snapshot()
+        if snapshot is not MISSING:
+            return snapshot
+        
         try:
+            start_time = time.time()
             logger.info("TaskAgent: Carregando todas as tarefas no histórico")
             
             # Buscar todas as tarefas
-            tasks = self.get_tasks("")
-            if tasks == "Nenhuma tarefa encontrada.":
-                logger.info("TaskAgent: Nenhuma tarefa encontrada para carregar no histórico")
-                return None
+            response = conditional_get(TASKS_API_URL, self.conditional_cache)
+            response.raise_for_status()
             
-            # Formatar a mensagem
-            result = "Aqui estão todas as suas tarefas:\n\n"
-            result += tasks
+            snapshot = self._format_tasks_history(self._format_tasks(response.json(), start_time))
+            self.snapshot_cache.set(TASKS_SNAPSHOT_KEY, snapshot)
+            return snapshot
+        
+        except Exception as e:
+            logger.error(f"TaskAgent: Erro ao carregar tarefas no histórico: {str(e)}")
+            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
+            return None
+    
+    async def _aload_tasks_into_history(self) -> Optional[str]:
+        """Versão assíncrona de _load_tasks_into_history."""
+        snapshot = self._cached_snapshot()
+        if snapshot is not MISSING:
+            return snapshot
+        
+        try:
+            start_time = time.time()
+            logger.info("TaskAgent: Carregando todas as tarefas no histórico")
             
-            logger.info("TaskAgent: Tarefas carregadas no histórico com sucesso")
-            return result
+            response = await aconditional_get(TASKS_API_URL, self.conditional_cache)
+            response.raise_for_status()
             
+            snapshot = self._format_tasks_history(self._format_tasks(response.json(), start_time))
+            self.snapshot_cache.set(TASKS_SNAPSHOT_KEY, snapshot)
+            return snapshot
+        
         except Exception as e:
             logger.error(f"TaskAgent: Erro ao carregar tarefas no histórico: {str(e)}")
             logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
             return None
-
+    
     def process_message(self, message: str, response_format: str = "markdown", websocket=None, chat_history=None) -> str:
         """Processa uma mensagem de forma síncrona."""
         try:
@@ -498,38 +484,12 @@ class TaskAgent(BaseAgent):
             logger.info(f"TaskAgent: Processando mensagem: {message}")
             
             # Converter o histórico de chat para o formato do LangChain
-            langchain_history = []
-            if chat_history:
-                for msg in chat_history:
-                    # Verificar o tipo de mensagem
-                    if isinstance(msg, HumanMessage):
-                        langchain_history.append(msg)
-                    elif isinstance(msg, AIMessage):
-                        langchain_history.append(msg)
-                    elif isinstance(msg, SystemMessage):
-                        # Ignorar mensagens do sistema, pois já estão no prompt
-                        continue
-                    elif isinstance(msg, dict):
-                        # Se for um dicionário, converter para o formato apropriado
-                        if msg.get("role") == "user":
-                            langchain_history.append(HumanMessage(content=msg.get("content", "")))
-                        elif msg.get("role") == "assistant":
-                            langchain_history.append(AIMessage(content=msg.get("content", "")))
-            
-            # Verificar se já carregamos as tarefas no histórico
-            tasks_loaded = False
-            for msg in langchain_history:
-                if isinstance(msg, AIMessage) and "Aqui estão todas as suas tarefas:" in msg.content:
-                    tasks_loaded = True
-                    break
-            
-            # Se não carregamos as tarefas ainda, carregar agora
-            if not tasks_loaded:
-                logger.info("TaskAgent: Carregando tarefas no histórico")
-                tasks_message = self._load_tasks_into_history()
-                if tasks_message:
-                    logger.info(f"TaskAgent: Tarefas carregadas no histórico: {tasks_message}")
-                    langchain_history.append(AIMessage(content=tasks_message))
+            langchain_history = self._convert_chat_history(chat_history)
+            
+            # Injetar o snapshot das tarefas (em cache entre turnos)
+            tasks_message = self._load_tasks_into_history()
+            if tasks_message:
+                langchain_history.append(AIMessage(content=tasks_message))
             
             # Processar a mensagem usando o executor do agente
             response = self.agent_executor.invoke({
@@ -542,10 +502,48 @@ class TaskAgent(BaseAgent):
             
             logger.info(f"TaskAgent: Resposta obtida em {elapsed_time:.2f}s: {result}")
             return result
-            
+        
         except Exception as e:
+            return self._handle_error("processar mensagem", start_time, e)
+    
+    async def aprocess_message(self, message: str, response_format: str = "markdown", websocket=None, chat_history=None, callbacks=None) -> str:
+        """
+        Processa uma mensagem sem bloquear o loop de eventos.
+        
+        `callbacks` são repassados ao executor (ex.: para transmitir a resposta
+        quando o orquestrador encaminha a mensagem direto a este agente).
+        """
+        start_time = time.time()
+        try:
+            logger.info(f"TaskAgent: Processando mensagem: {message}")
+            
+            # Converter o histórico de chat para o formato do LangChain
+            langchain_history = self._convert_chat_history(chat_history)
+            
+            # Injetar o snapshot das tarefas (em cache entre turnos)
+            tasks_message = await self._aload_tasks_into_history()
+            if tasks_message:
+                langchain_history.append(AIMessage(content=tasks_message))
+            
+            # Processar a mensagem usando o executor do agente
+            response = await self.agent_executor.ainvoke(
+                {
+                    "input": message,
+                    "chat_history": langchain_history
+                },
+                config={"callbacks": callbacks}
+            )
+            
             elapsed_time = time.time() - start_time
-            error_msg = f"Erro ao processar mensagem após {elapsed_time:.2f}s: {str(e)}"
-            logger.error(f"TaskAgent: {error_msg}")
-            logger.error(f"TaskAgent: Traceback: {traceback.format_exc()}")
-            return error_msg 
\ No newline at end of file
+            result = response.get("output", "Desculpe, não consegui processar sua solicitação.")
+            
+            logger.info(f"TaskAgent: Resposta obtida em {elapsed_time:.2f}s: {result}")
+            return result
+        
+        except Exception as e:
+            return self._handle_error("processar mensagem", start_time, e)
+
+@lru_cache()
+def get_task_agent() -> TaskAgent:
+    """Retorna o agente de tarefas compartilhado pelo processo."""
+    return TaskAgent()
@@ -0,0 +1,35 @@
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+class TokenStreamHandler(AsyncCallbackHandler):
+    """
+    Repassa os tokens gerados pelo LLM do orquestrador à medida que chegam.
+
+    O handler é informado apenas na chamada do orquestrador; os subagentes são
+    executados pelas ferramentas sem callbacks, então só a geração do próprio
+    orquestrador (a resposta final ao usuário) é transmitida.
+    """
+
+    def __init__(self, on_token: Callable[[str], Awaitable[None]]):
+        self.on_token = on_token
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.tokens = 0
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Segundos entre o início do turno e o primeiro token, ou None se nada foi transmitido."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        # Chamadas de função chegam com conteúdo vazio e não são transmitidas
+        if not token:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+        await self.on_token(token)
@@ -1,4 +1,5 @@
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents import create_openai_tools_agent
+from .parallel_executor import ParallelAgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 from .base_agent import BaseAgent
@@ -23,14 +24,14 @@ class ToolAgent(BaseAgent):
         ])
         
         # Criar o agente
-        self.agent = create_openai_functions_agent(
+        self.agent = create_openai_tools_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt
         )
         
         # Criar o executor do agente
-        self.agent_executor = AgentExecutor(
+        self.agent_executor = ParallelAgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True
@@ -0,0 +1,71 @@
+import json
+from typing import Any, Iterable, Sequence, Tuple
+
+# Colunas das tabelas enviadas ao LLM: (chave curta, chaves aceitas na API).
+# A API de tarefas responde ora em inglês, ora com os nomes legados em português.
+Columns = Sequence[Tuple[str, Tuple[str, ...]]]
+
+TASK_COLUMNS: Columns = (
+    ("id", ("id", "ID")),
+    ("desc", ("description", "Descrição", "descricao")),
+    ("pri", ("priority", "Prioridade", "prioridade")),
+    ("cat", ("category", "Categoria", "categoria")),
+    ("status", ("status", "Status")),
+    ("created", ("created_at", "Data de Criação")),
+)
+
+ROUTINE_COLUMNS: Columns = (
+    ("id", ("id",)),
+    ("name", ("name",)),
+    ("desc", ("description",)),
+    ("status", ("status",)),
+    ("sched", ("schedule",)),
+    ("freq", ("frequency",)),
+    ("pri", ("priority",)),
+    ("tags", ("tags",)),
+    ("min", ("estimated_duration",)),
+    ("start", ("start_date",)),
+    ("end", ("end_date",)),
+    ("ver", ("version",)),
+)
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def _row(item: dict, columns: Columns) -> list:
+    """Valores de `item` na ordem de `columns` (None quando nenhuma das chaves tem valor)."""
+    row = []
+    for _, keys in columns:
+        for key in keys:
+            value = item.get(key)
+            if value is not None and value != "":
+                break
+        else:
+            value = None
+        row.append(value)
+    return row
+
+def normalize_record(item: dict, columns: Columns) -> dict:
+    """Item da API com as chaves curtas de `columns`, sem os campos vazios."""
+    return {column: value for (column, _), value in zip(columns, _row(item, columns)) if value is not None}
+
+def compact_table(items: Iterable[Any], columns: Columns, **extra: Any) -> str:
+    """
+    Serializa uma lista de itens como uma tabela JSON compacta para o LLM.
+    
+    O formato é `{"cols": [...], "rows": [[...], ...]}`: os nomes dos campos
+    aparecem uma única vez, em vez de se repetirem em cada item, e as colunas
+    vazias em todas as linhas são omitidas. Itens que não são dicts são
+    ignorados; `extra` acrescenta campos ao objeto (ex.: `missing`).
+    """
+    rows = [_row(item, columns) for item in items if isinstance(item, dict)]
+    used = [index for index in range(len(columns)) if any(row[index] is not None for row in rows)]
+    return _dumps({
+        "cols": [columns[index][0] for index in used],
+        "rows": [[row[index] for index in used] for row in rows],
+        **extra
+    })
+
+def compact_record(item: dict, columns: Columns) -> str:
+    """Serializa um único item em JSON compacto com as chaves curtas de `columns`."""
+    return _dumps(normalize_record(item, columns))
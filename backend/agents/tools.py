@@ -1,6 +1,5 @@
 from langchain.tools import Tool
 import difflib
-import requests
 import json
 from typing import Optional, Dict, List, Any
 import time
@@ -10,6 +9,10 @@ import re
 from bs4 import BeautifulSoup
 import markdown
 
+from utils.http_client import get_session
+from utils.lambda_response import lambda_items
+from .tool_results import TASK_COLUMNS, compact_table
+
 # Configurar locale para português
 try:
     locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
@@ -55,7 +58,7 @@ def safe_web_search(query: str) -> str:
             "utf8": 1
         }
         
-        search_response = requests.get(search_url, params=search_params)
+        search_response = get_session().get(search_url, params=search_params)
         search_data = search_response.json()
         
         if "query" in search_data and "search" in search_data["query"] and len(search_data["query"]["search"]) > 0:
@@ -74,7 +77,7 @@ def safe_web_search(query: str) -> str:
                 "utf8": 1
             }
             
-            content_response = requests.get(search_url, params=content_params)
+            content_response = get_session().get(search_url, params=content_params)
             content_data = content_response.json()
             
             # Extrair o conteúdo da página
@@ -171,32 +174,23 @@ def get_tasks(query: str = "") -> str:
     Args:
         query (str): Parâmetro opcional para compatibilidade com a interface Tool.
         
-    Retorna uma lista formatada de todas as tarefas com os seguintes campos:
-    - ID: Identificador único da tarefa
-    - Descrição: Texto descritivo da tarefa
-    - Prioridade: Pode ser "Alta", "Média" ou "Baixa"
-    - Categoria: Categoria da tarefa (ex: "Compasso", "Geral", "Continuar", "Desenvolvimento", "Backup")
-    - Status: Pode ser "Pendente" ou "Concluído"
-    - Data de Criação: Data e hora de criação da tarefa
+    Retorna as tarefas em uma tabela JSON compacta ({"cols": [...], "rows": [[...]]})
+    com as colunas:
+    - id: Identificador único da tarefa
+    - desc: Texto descritivo da tarefa
+    - pri: Pode ser "Alta", "Média" ou "Baixa"
+    - cat: Categoria da tarefa (ex: "Compasso", "Geral", "Continuar", "Desenvolvimento", "Backup")
+    - status: Pode ser "Pendente" ou "Concluído"
+    - created: Data e hora de criação da tarefa
     """
     try:
-        response = requests.get('https://api.itenorio.com/lambda/tasks')
-        tasks = response.json().get('body', {}).get('Items', [])
+        response = get_session().get('https://api.itenorio.com/lambda/tasks')
+        tasks = lambda_items(response.json())
         
         if not tasks:
             return "Não há tarefas cadastradas."
         
-        result = "Lista de Tarefas:\n\n"
-        for task in tasks:
-            result += f"ID: {task.get('ID')}\n"
-            result += f"Descrição: {task.get('Descrição')}\n"
-            result += f"Prioridade: {task.get('Prioridade')}\n"
-            result += f"Categoria: {task.get('Categoria')}\n"
-            result += f"Status: {task.get('Status')}\n"
-            result += f"Data de Criação: {task.get('Data de Criação')}\n"
-            result += "---\n"
-        
-        return result
+        return compact_table(tasks, TASK_COLUMNS)
     except Exception as e:
         return f"Erro ao obter tarefas: {str(e)}"
 
@@ -245,7 +239,7 @@ def create_task(input_str: str) -> str:
         
         print(f"Enviando dados para API: {task_data}")
         
-        response = requests.post('https://api.itenorio.com/lambda/tasks', json=task_data)
+        response = get_session().post('https://api.itenorio.com/lambda/tasks', json=task_data)
         
         print(f"Resposta da API: {response.status_code} - {response.text}")
         
@@ -301,7 +295,7 @@ def update_task(input_str: str) -> str:
         if not formatted_task:
             return "Nenhum campo válido para atualização fornecido."
         
-        response = requests.patch(f'https://api.itenorio.com/lambda/tasks/{task_id}', json=formatted_task)
+        response = get_session().patch(f'https://api.itenorio.com/lambda/tasks/{task_id}', json=formatted_task)
         
         if response.status_code == 200:
             return "Tarefa atualizada com sucesso!"
@@ -315,7 +309,7 @@ def delete_task(task_id: str) -> str:
     Remove uma tarefa.
     """
     try:
-        response = requests.delete(f'https://api.itenorio.com/lambda/tasks/{task_id}')
+        response = get_session().delete(f'https://api.itenorio.com/lambda/tasks/{task_id}')
         
         if response.status_code == 200:
             return "Tarefa removida com sucesso!"
@@ -337,7 +331,7 @@ def get_available_tools():
         Tool(
             name="get_tasks",
             func=get_tasks,
-            description="Obtém a lista de todas as tarefas. Retorna ID, Descrição, Prioridade, Categoria, Status e Data de Criação de cada tarefa."
+            description="Obtém a lista de todas as tarefas. Retorna uma tabela JSON (cols/rows) com id, desc (descrição), pri (prioridade), cat (categoria), status e created (data de criação) de cada tarefa."
         ),
         Tool(
             name="create_task",
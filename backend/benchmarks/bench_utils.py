@@ -0,0 +1,33 @@
+"""Utilitários compartilhados pelos benchmarks do backend."""
+import os
+import sys
+
+# Permitir executar os scripts a partir de qualquer diretório
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Valores fictícios para que as configurações carreguem sem um .env real
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "benchmark")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "benchmark")
+
+def percentile(values, pct):
+    """Retorna o percentil `pct` (0-100) de uma lista de valores."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def rss_mb():
+    """Retorna o RSS atual do processo em MB (Linux), ou o pico de RSS nos demais sistemas."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
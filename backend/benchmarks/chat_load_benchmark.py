@@ -0,0 +1,131 @@
+"""
+Teste de carga do /ws: N sessões de chat simultâneas contra um modelo falso
+com latência fixa, medindo p50/p99 por turno e o atraso do loop de eventos.
+
+Uso:
+    python benchmarks/chat_load_benchmark.py              # caminho assíncrono (ainvoke + httpx)
+    python benchmarks/chat_load_benchmark.py --sync       # caminho anterior (invoke + requests)
+    python benchmarks/chat_load_benchmark.py --no-stream  # apenas o frame "message" final
+    python benchmarks/chat_load_benchmark.py --no-intent-router  # sempre roteia pelo LLM
+    python benchmarks/chat_load_benchmark.py --sessions 1 10 50 --llm-delay 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import time
+
+from bench_utils import percentile
+from stub_servers import StubServer
+
+class FakeWebSocket:
+    def __init__(self):
+        self.first_frame_at = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        # Primeiro conteúdo visível do turno: o primeiro "delta" ou o "message" final
+        if self.first_frame_at is None and json.loads(data).get("type") in ("delta", "message"):
+            self.first_frame_at = time.perf_counter()
+
+async def measure_loop_lag(stop, lags, interval=0.01):
+    """Registra quanto cada tick do loop atrasou em relação ao esperado."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def run(manager_cls, sessions, turns, stream):
+    manager = manager_cls()
+    websockets = [FakeWebSocket() for _ in range(sessions)]
+    latencies = []
+    ttfts = []
+    lags = []
+    stop = asyncio.Event()
+
+    async def chat(websocket, sent_at):
+        # A latência conta a partir do envio: no primeiro turno todas as sessões
+        # enviam ao mesmo tempo, então a espera por outras sessões entra na conta
+        client_id = id(websocket)
+        for turn in range(turns):
+            websocket.first_frame_at = None
+            await manager.process_message(client_id, f"Liste minhas tarefas ({turn})", stream=stream)
+            answered_at = time.perf_counter()
+            latencies.append(answered_at - sent_at)
+            ttfts.append((websocket.first_frame_at or answered_at) - sent_at)
+            sent_at = answered_at
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for websocket in websockets:
+            await manager.connect(websocket)
+        lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+        start = time.perf_counter()
+        await asyncio.gather(*(chat(ws, start) for ws in websockets))
+        total = time.perf_counter() - start
+        stop.set()
+        await lag_task
+
+    print(
+        f"{sessions:>4} sessões | total {total:7.2f} s | "
+        f"p50 {percentile(latencies, 50) * 1000:8.1f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:8.1f} ms | "
+        f"TTFT p50 {percentile(ttfts, 50) * 1000:8.1f} ms | "
+        f"atraso máx. do loop {max(lags, default=0.0) * 1000:8.1f} ms"
+    )
+
+async def run_all(manager_cls, session_counts, turns, stream):
+    for sessions in session_counts:
+        await run(manager_cls, sessions, turns, stream)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", action="store_true", help="usa o caminho síncrono (comportamento anterior)")
+    parser.add_argument("--no-stream", action="store_true", help="desativa os frames \"delta\" (modo compatível)")
+    parser.add_argument("--no-intent-router", action="store_true", help="desativa o router local de intenções")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--turns", type=int, default=3, help="mensagens enviadas por sessão")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="latência simulada de cada chamada ao LLM (s)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with StubServer(llm_delay=args.llm_delay) as stub:
+        # As configurações são lidas na importação dos agentes
+        os.environ["OPENAI_API_BASE"] = f"{stub.url}/v1"
+        if args.no_intent_router:
+            os.environ["INTENT_ROUTER_ENABLED"] = "false"
+
+        import agents.specialized.task_agent as task_agent_module
+        from agents.orchestrator_agent import get_orchestrator_agent
+        from controllers.app_controller import ConnectionManager
+
+        task_agent_module.TASKS_API_URL = f"{stub.url}/tasks"
+
+        class SyncConnectionManager(ConnectionManager):
+            """Reproduz o comportamento anterior: o agente roda dentro do loop de eventos."""
+
+            async def process_message(self, client_id, message, response_format="markdown", stream=None):
+                session = self.sessions[client_id]
+                response_text = self.agent.process_message(message, response_format, session=session)
+                await self.active_connections[client_id].send_text(
+                    json.dumps({"type": "message", "content": response_text, "format": response_format})
+                )
+
+        manager_cls = SyncConnectionManager if args.sync else ConnectionManager
+        with contextlib.redirect_stdout(io.StringIO()):
+            get_orchestrator_agent()
+
+        print(f"Modo: {'síncrono (invoke + requests)' if args.sync else 'assíncrono (ainvoke + httpx)'}, "
+              f"router de intenções {'desativado' if args.no_intent_router else 'ativado'}, "
+              f"{args.turns} turnos por sessão, LLM {args.llm_delay * 1000:.0f} ms por chamada")
+        # Um único loop: os clientes HTTP assíncronos são compartilhados entre as rodadas
+        asyncio.run(run_all(manager_cls, args.sessions, args.turns, not args.no_stream))
+
+if __name__ == "__main__":
+    main()
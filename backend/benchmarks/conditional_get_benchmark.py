@@ -0,0 +1,76 @@
+"""
+Compara GETs comuns com GETs condicionais (If-None-Match, utils/http_client.py)
+de uma lista de tarefas que não muda, contra um servidor local.
+
+Uso:
+    python benchmarks/conditional_get_benchmark.py
+    python benchmarks/conditional_get_benchmark.py --tasks 5000 --calls 500
+"""
+import argparse
+import asyncio
+import time
+
+from bench_utils import percentile
+from stub_servers import StubServer
+
+from utils.cache import ConditionalCache
+from utils.http_client import aconditional_get, arequest, conditional_get, get_session
+
+def report(label, latencies, sent_bytes):
+    print(
+        f"{label:<30} | p50 {percentile(latencies, 50) * 1000:7.3f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:7.3f} ms | "
+        f"corpo {sent_bytes / len(latencies) / 1024:8.1f} KB/chamada"
+    )
+
+def timed(stub, call, calls):
+    latencies = []
+    stub.httpd.bytes_sent = 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = call()
+        response.raise_for_status()
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies, stub.httpd.bytes_sent
+
+async def atimed(stub, call, calls):
+    latencies = []
+    stub.httpd.bytes_sent = 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = await call()
+        response.raise_for_status()
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies, stub.httpd.bytes_sent
+
+async def run_async(stub, url, calls):
+    cache = ConditionalCache()
+    report("async comum (arequest)", *await atimed(stub, lambda: arequest("GET", url), calls))
+    report("async condicional", *await atimed(stub, lambda: aconditional_get(url, cache), calls))
+    print(f"  {cache.revalidated} respostas 304, {cache.refreshed} completas")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000, help="tamanho da lista de tarefas")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    tasks = [
+        {"id": str(i), "description": f"Tarefa {i}", "status": "pending", "tags": ["trabalho", "casa"]}
+        for i in range(args.tasks)
+    ]
+    with StubServer(tasks=tasks) as stub:
+        url = f"{stub.url}/tasks"
+        session = get_session()
+        cache = ConditionalCache()
+
+        print(f"{args.calls} chamadas GET {url} ({args.tasks} tarefas, lista sem alterações)")
+        report("sync comum (get_session)", *timed(stub, lambda: session.get(url), args.calls))
+        report("sync condicional", *timed(stub, lambda: conditional_get(url, cache), args.calls))
+        print(f"  {cache.revalidated} respostas 304, {cache.refreshed} completas")
+        asyncio.run(run_async(stub, url, args.calls))
+
+if __name__ == "__main__":
+    main()
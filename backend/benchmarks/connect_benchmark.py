@@ -0,0 +1,87 @@
+"""
+Mede a latência de conexão e o RSS do ConnectionManager para 1, 100 e 1000
+WebSockets simultâneos.
+
+Uso:
+    python benchmarks/connect_benchmark.py            # grafo de agentes compartilhado
+    python benchmarks/connect_benchmark.py --legacy   # um OrchestratorAgent por conexão
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+
+from bench_utils import percentile, rss_mb
+
+from agents.base_agent import get_llm
+from agents.orchestrator_agent import OrchestratorAgent, get_orchestrator_agent
+from agents.specialized.routine_agent import get_routine_agent
+from agents.specialized.task_agent import get_task_agent
+from controllers.app_controller import ConnectionManager
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+class LegacyConnectionManager(ConnectionManager):
+    """Reproduz o comportamento anterior: um grafo de agentes completo por conexão."""
+
+    async def connect(self, websocket):
+        await websocket.accept()
+        client_id = id(websocket)
+        self.active_connections[client_id] = websocket
+        # Descartar os caches para que cada conexão construa LLMs, subagentes e executores
+        get_llm.cache_clear()
+        get_task_agent.cache_clear()
+        get_routine_agent.cache_clear()
+        self.sessions[client_id] = OrchestratorAgent()
+
+async def run(manager_cls, sockets):
+    manager = manager_cls()
+    websockets = [FakeWebSocket() for _ in range(sockets)]
+    latencies = []
+
+    async def timed_connect(websocket):
+        start = time.perf_counter()
+        await manager.connect(websocket)
+        latencies.append(time.perf_counter() - start)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    # Silenciar o print de cada conexão
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(timed_connect(ws) for ws in websockets))
+    total = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    print(
+        f"{sockets:>5} sockets | total {total * 1000:9.1f} ms | "
+        f"p50 {percentile(latencies, 50) * 1000:8.3f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:8.3f} ms | "
+        f"RSS {rss_after:7.1f} MB (+{rss_after - rss_before:.1f} MB)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--legacy", action="store_true", help="constrói um OrchestratorAgent por conexão")
+    parser.add_argument("--sockets", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    # Os agentes registram cada etapa da inicialização em INFO
+    logging.disable(logging.INFO)
+
+    manager_cls = LegacyConnectionManager if args.legacy else ConnectionManager
+    if not args.legacy:
+        # Equivalente ao aquecimento feito no startup da aplicação
+        get_orchestrator_agent()
+    print(f"Modo: {'legado (agente por conexão)' if args.legacy else 'grafo compartilhado'}")
+    for sockets in args.sockets:
+        asyncio.run(run(manager_cls, sockets))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Chamadas ao Spotify do "tocando agora" com N abas abertas do mesmo usuário,
+contra uma Web API falsa em que a faixa muda periodicamente.
+
+Compara as abas consultando GET /api/spotify/currently-playing a cada
+intervalo (como o frontend faz hoje) com as abas inscritas pelo WebSocket,
+recebendo frames "spotify_playback" (utils/spotify_poller.py). Os intervalos
+são reduzidos para que a medição dure poucos segundos.
+
+Uso:
+    python benchmarks/currently_playing_benchmark.py
+    python benchmarks/currently_playing_benchmark.py --tabs 1 10 100 --duration 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+import bench_utils  # noqa: F401 (caminho do backend e credenciais fictícias)
+from stub_servers import StubServer
+
+TOKEN = "token-benchmark"
+
+async def poll_http(app, interval, tabs, duration):
+    import httpx
+
+    async def tab(client):
+        # Abas abertas em momentos diferentes consultam fora de fase
+        await asyncio.sleep(random.uniform(0, interval))
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            response = await client.get("/api/spotify/currently-playing", headers={"Authorization": f"Bearer {TOKEN}"})
+            response.raise_for_status()
+            await asyncio.sleep(interval)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+        await asyncio.gather(*(tab(client) for _ in range(tabs)))
+
+async def subscribe_ws(registry, tabs, duration):
+    frames = []
+
+    async def send_frame(frame):
+        frames.append(frame)
+
+    for client_id in range(tabs):
+        await registry.subscribe(client_id, TOKEN, send_frame)
+    await asyncio.sleep(duration)
+    poller = registry.get(TOKEN)
+    for client_id in range(tabs):
+        poller.unsubscribe(client_id)
+    await asyncio.sleep(0)
+    return len(frames)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tabs", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=4.0, help="duração de cada medição, em segundos")
+    parser.add_argument("--interval", type=float, default=0.5, help="intervalo de consulta com música tocando, em segundos")
+    parser.add_argument("--spotify-delay", type=float, default=0.05, help="latência da API falsa, em segundos")
+    args = parser.parse_args()
+
+    with StubServer(spotify_delay=args.spotify_delay, spotify_track_seconds=args.interval * 3) as stub:
+        # Configurações lidas pelo controller e pelo poller
+        os.environ["SPOTIFY_API_URL"] = f"{stub.url}/spotify/v1"
+        os.environ["SPOTIFY_POLL_PLAYING_INTERVAL_SECONDS"] = str(args.interval)
+        logging.disable(logging.CRITICAL)
+
+        from fastapi import FastAPI
+        from controllers.spotify_controller import router
+        from utils.spotify_poller import SpotifyPollerRegistry, get_spotify_poller_registry
+
+        app = FastAPI()
+        app.include_router(router)
+        intervals = args.duration / args.interval
+
+        async def run_all():
+            for tabs in args.tabs:
+                # Um registro novo por medição, sem respostas da anterior
+                get_spotify_poller_registry.cache_clear()
+                stub.httpd.spotify_requests = 0
+                await poll_http(app, args.interval, tabs, args.duration)
+                http_calls = stub.httpd.spotify_requests
+
+                registry = SpotifyPollerRegistry()
+                stub.httpd.spotify_requests = 0
+                frames = await subscribe_ws(registry, tabs, args.duration)
+                ws_calls = stub.httpd.spotify_requests
+                await registry.aclose()
+
+                print(
+                    f"{tabs:>4} abas | sem coalescência {tabs:>4} chamadas/intervalo | "
+                    f"polling HTTP {http_calls / intervals:5.2f} chamadas/intervalo | "
+                    f"WebSocket {ws_calls / intervals:5.2f} chamadas/intervalo, {frames} frames"
+                )
+
+        asyncio.run(run_all())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compara a latência por chamada com e sem pool de conexões contra um servidor
+local (GET /tasks), nos clientes síncrono e assíncrono de utils/http_client.py.
+
+Uso:
+    python benchmarks/http_pool_benchmark.py              # HTTP
+    python benchmarks/http_pool_benchmark.py --tls        # HTTPS (certificado autoassinado, requer openssl)
+    python benchmarks/http_pool_benchmark.py --calls 500
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import httpx
+import requests
+
+from bench_utils import percentile
+from stub_servers import StubServer
+
+from utils.http_client import arequest, get_session
+
+def self_signed_cert(directory):
+    """Gera um certificado autoassinado para 127.0.0.1 com o openssl."""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+            "-addext", "subjectAltName=IP:127.0.0.1"
+        ],
+        check=True,
+        capture_output=True
+    )
+    return certfile, keyfile
+
+def report(label, latencies):
+    print(
+        f"{label:<41} | p50 {percentile(latencies, 50) * 1000:7.3f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:7.3f} ms | "
+        f"média {sum(latencies) / len(latencies) * 1000:7.3f} ms"
+    )
+
+def timed(call, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call().raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def atimed(call, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        (await call()).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def run_async(url, calls, verify):
+    async def unpooled():
+        # Um cliente por chamada: nova conexão (e handshake TLS) a cada requisição
+        async with httpx.AsyncClient(verify=verify) as client:
+            return await client.get(url)
+
+    report("async sem pool (AsyncClient por chamada)", await atimed(unpooled, calls))
+    report("async com pool (arequest)", await atimed(lambda: arequest("GET", url), calls))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--tls", action="store_true", help="usa HTTPS com certificado autoassinado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile = keyfile = None
+        if args.tls:
+            certfile, keyfile = self_signed_cert(directory)
+        # Contexto TLS criado uma vez, para medir só o custo da conexão
+        verify = ssl.create_default_context(cafile=certfile)
+
+        with StubServer(tasks=[{"id": "1", "description": "Tarefa"}], certfile=certfile, keyfile=keyfile) as stub:
+            url = f"{stub.url}/tasks"
+            session = get_session()
+            if args.tls:
+                # O cliente assíncrono compartilhado precisa confiar no certificado autoassinado
+                os.environ["SSL_CERT_FILE"] = certfile
+
+            print(f"{args.calls} chamadas GET {url}")
+            report("sync sem pool (requests.get)", timed(lambda: requests.get(url, verify=certfile or True), args.calls))
+            report("sync com pool (get_session)", timed(lambda: session.get(url, verify=certfile or True), args.calls))
+            asyncio.run(run_async(url, args.calls, verify))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Latência por turno do TaskAgent em mensagens que pedem várias ferramentas
+independentes no mesmo passo ("detalhes das tarefas #1, #2 e #3"), contra
+o modelo falso e a API de tarefas do servidor local.
+
+O modelo falso responde com uma chamada `get_task` por ID citado (tool
+calls paralelas da OpenAI). Compara o AgentExecutor do LangChain, que no
+caminho síncrono executa as chamadas uma depois da outra, com o
+ParallelAgentExecutor (agents/parallel_executor.py), nos caminhos síncrono
+(`process_message`) e assíncrono (`aprocess_message`).
+
+Uso:
+    python benchmarks/parallel_tools_benchmark.py
+    python benchmarks/parallel_tools_benchmark.py --tools 1 3 6 --tasks-delay 0.2 --turns 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import time
+
+from bench_utils import percentile
+from stub_servers import StubServer
+
+def measure(process, message, turns):
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        process(message)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def ameasure(process, message, turns):
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        await process(message)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(label, latencies):
+    print(f"  {label:<34} p50 {percentile(latencies, 50) * 1000:8.1f} ms | p95 {percentile(latencies, 95) * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, nargs="+", default=[1, 3, 5], help="ferramentas pedidas por turno")
+    parser.add_argument("--turns", type=int, default=5, help="turnos medidos em cada modo")
+    parser.add_argument("--llm-delay", type=float, default=0.1, help="latência simulada de cada chamada ao LLM (s)")
+    parser.add_argument("--tasks-delay", type=float, default=0.15, help="latência simulada da API de tarefas (s)")
+    args = parser.parse_args()
+
+    tasks = [{"id": str(i), "title": f"Tarefa {i}", "status": "pending"} for i in range(1, max(args.tools) + 1)]
+    logging.disable(logging.WARNING)
+
+    with StubServer(llm_delay=args.llm_delay, token_delay=0, tasks=tasks, etags=False, tasks_delay=args.tasks_delay) as stub:
+        # As configurações são lidas na importação dos agentes
+        os.environ["OPENAI_API_BASE"] = f"{stub.url}/v1"
+
+        import agents.specialized.task_agent as task_agent_module
+        from langchain.agents import AgentExecutor
+        from utils.http_client import aclose_clients
+
+        task_agent_module.TASKS_API_URL = f"{stub.url}/tasks"
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = task_agent_module.TaskAgent()
+        parallel_executor = agent.agent_executor
+        sequential_executor = AgentExecutor(agent=agent.agent, tools=agent.tools, verbose=True)
+
+        print(f"LLM {args.llm_delay * 1000:.0f} ms por chamada, API de tarefas {args.tasks_delay * 1000:.0f} ms por chamada, "
+              f"{args.turns} turnos por modo")
+
+        async def run_async(message):
+            return await ameasure(agent.aprocess_message, message, args.turns)
+
+        async def run_all_async(messages):
+            try:
+                return [await run_async(message) for message in messages]
+            finally:
+                await aclose_clients()
+
+        messages = [
+            "Mostre os detalhes das tarefas " + ", ".join(f"#{i}" for i in range(1, count + 1))
+            for count in args.tools
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.agent_executor = sequential_executor
+            sequential = [measure(agent.process_message, message, args.turns) for message in messages]
+            agent.agent_executor = parallel_executor
+            parallel = [measure(agent.process_message, message, args.turns) for message in messages]
+            # Um único loop: os clientes HTTP assíncronos são compartilhados entre as rodadas
+            asynchronous = asyncio.run(run_all_async(messages))
+
+        for count, seq, par, asy in zip(args.tools, sequential, parallel, asynchronous):
+            print(f"{count} ferramenta(s) por turno:")
+            report("AgentExecutor (síncrono)", seq)
+            report("ParallelAgentExecutor (síncrono)", par)
+            report("ParallelAgentExecutor (assíncrono)", asy)
+
+if __name__ == "__main__":
+    main()
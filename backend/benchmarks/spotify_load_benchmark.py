@@ -0,0 +1,90 @@
+"""
+Teste de carga do proxy do Spotify (controllers/spotify_controller.py): N
+usuários consultando periodicamente as rotas do player contra uma Web API
+falsa com latência fixa, medindo requisições por segundo de um worker e
+p50/p99 por requisição.
+
+Uso:
+    python benchmarks/spotify_load_benchmark.py
+    python benchmarks/spotify_load_benchmark.py --no-cache        # sem os caches por token
+    python benchmarks/spotify_load_benchmark.py --pollers 1 10 50 --rounds 5 --spotify-delay 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from bench_utils import percentile
+from stub_servers import StubServer
+
+# Rotas que o frontend consulta a cada ciclo de atualização
+ROUTES = [
+    "/api/spotify/current-user",
+    "/api/spotify/currently-playing",
+    "/api/spotify/recently-played?limit=10",
+    "/api/spotify/top-tracks?limit=10",
+    "/api/spotify/playlists?limit=20",
+]
+
+async def run(app, stub, pollers, rounds):
+    import httpx
+
+    latencies = []
+    errors = 0
+    stub.httpd.spotify_requests = 0
+
+    async def poll(client, token):
+        nonlocal errors
+        for _ in range(rounds):
+            for route in ROUTES:
+                start = time.perf_counter()
+                response = await client.get(route, headers={"Authorization": f"Bearer {token}"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+    # O app roda no mesmo loop que os clientes, como em um único worker do uvicorn
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(poll(client, f"token-{pollers}-{index}") for index in range(pollers)))
+        total = time.perf_counter() - start
+
+    print(
+        f"{pollers:>4} usuários | {len(latencies) / total:8.1f} req/s | "
+        f"p50 {percentile(latencies, 50) * 1000:8.1f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:8.1f} ms | "
+        f"chamadas ao Spotify {stub.httpd.spotify_requests:>5} | erros {errors}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pollers", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rounds", type=int, default=5, help="ciclos de atualização por usuário")
+    parser.add_argument("--spotify-delay", type=float, default=0.05, help="latência da API falsa, em segundos")
+    parser.add_argument("--no-cache", action="store_true", help="desativa os caches por token")
+    args = parser.parse_args()
+
+    with StubServer(spotify_delay=args.spotify_delay) as stub:
+        # Configurações lidas na importação do controller
+        os.environ["SPOTIFY_API_URL"] = f"{stub.url}/spotify/v1"
+        if args.no_cache:
+            for name in ("PROFILE", "PLAYLISTS", "TOP_TRACKS", "RECENTLY_PLAYED"):
+                os.environ[f"SPOTIFY_{name}_CACHE_TTL_SECONDS"] = "0"
+        logging.disable(logging.CRITICAL)
+
+        from fastapi import FastAPI
+        from controllers.spotify_controller import router
+
+        app = FastAPI()
+        app.include_router(router)
+
+        async def run_all():
+            for pollers in args.pollers:
+                await run(app, stub, pollers, args.rounds)
+
+        asyncio.run(run_all())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Servidores HTTP locais que imitam a OpenAI, a API de tarefas e a Web API do
+Spotify, para que os benchmarks exercitem o caminho completo dos agentes e do
+proxy do Spotify sem chamadas externas.
+"""
+import hashlib
+import json
+import re
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas; sem isso o delayed ACK
+    # adiciona ~40 ms a cada resposta em conexões keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, etag=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.bytes_sent += len(body)
+
+    def _send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/spotify/v1/me"):
+            self._send_spotify(self.path[len("/spotify/v1"):].split("?")[0])
+        elif self.path.startswith("/tasks/"):
+            # Latência fixa por chamada, como a da API real
+            time.sleep(self.server.tasks_delay)
+            task_id = self.path[len("/tasks/"):].split("?")[0]
+            task = next((task for task in self.server.tasks if str(task.get("id")) == task_id), None)
+            if task is None:
+                self._send_json({"message": "Task not found"}, status=404)
+            else:
+                self._send_json(task)
+        elif self.path.startswith("/tasks"):
+            time.sleep(self.server.tasks_delay)
+            # ETag da lista, como a API de rotinas: If-None-Match igual responde 304
+            etag = f'"{hashlib.sha1(json.dumps(self.server.tasks).encode("utf-8")).hexdigest()[:16]}"'
+            if self.server.etags and self.headers.get("If-None-Match") == etag:
+                self._send_not_modified(etag)
+            else:
+                self._send_json(self.server.tasks, etag=etag if self.server.etags else None)
+        else:
+            self._send_json({"message": "Not found"}, status=404)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json({"message": "Not found"}, status=404)
+            return
+        request = self._read_json()
+        # Simula o tempo até o primeiro token do modelo
+        time.sleep(self.server.llm_delay)
+        message, finish_reason = self._reply(request)
+        if request.get("stream"):
+            self._send_stream(request, message, finish_reason)
+        else:
+            self._send_json(self._completion(request, message, finish_reason))
+
+    def _send_spotify(self, path):
+        # Latência fixa por chamada, como a da API real
+        time.sleep(self.server.spotify_delay)
+        with self.server.lock:
+            self.server.spotify_requests += 1
+        track = {"name": "Faixa", "artists": [{"name": "Artista"}], "album": {"name": "Álbum", "images": []}, "duration_ms": 200000}
+        payloads = {
+            "/me": {"id": "benchmark", "display_name": "Benchmark", "images": []},
+            "/me/playlists": {"items": [{"id": f"playlist-{i}", "name": f"Playlist {i}"} for i in range(20)]},
+            "/me/top/tracks": {"items": [track] * 10},
+            "/me/player/recently-played": {"items": [{"track": track, "played_at": "2024-01-01T00:00:00Z"}] * 10},
+            "/me/player/currently-playing": {"is_playing": True, "progress_ms": 1000, "item": self._current_track(track)},
+        }
+        if path in payloads:
+            self._send_json(payloads[path])
+        else:
+            self._send_json({"error": {"status": 404, "message": "Not found"}}, status=404)
+
+    def _current_track(self, track):
+        # Com `spotify_track_seconds`, a faixa muda a cada tantos segundos
+        if not self.server.spotify_track_seconds:
+            return dict(track, id="faixa-0")
+        return dict(track, id=f"faixa-{int(time.monotonic() // self.server.spotify_track_seconds)}")
+
+    def _send_chunk(self, data):
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, request, message, finish_reason):
+        """Responde em Server-Sent Events, um chunk por palavra do conteúdo."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        if message.get("function_call"):
+            deltas = [{"role": "assistant", "content": None, "function_call": message["function_call"]}]
+        elif message.get("tool_calls"):
+            # Uma chamada por chunk, identificada pelo índice, como na API real
+            deltas = [{"role": "assistant", "content": None}]
+            deltas += [{"tool_calls": [dict(call, index=i)]} for i, call in enumerate(message["tool_calls"])]
+        else:
+            words = message["content"].split(" ")
+            deltas = [{"role": "assistant", "content": ""}]
+            deltas += [{"content": word if i == 0 else f" {word}"} for i, word in enumerate(words)]
+
+        for i, delta in enumerate(deltas):
+            if i > 1:
+                time.sleep(self.server.token_delay)
+            self._send_chunk(json.dumps(self._chunk(request, delta, None)))
+        self._send_chunk(json.dumps(self._chunk(request, {}, finish_reason)))
+        self._send_chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, request, delta, finish_reason):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    def _reply(self, request):
+        messages = request.get("messages", [])
+        functions = [function["name"] for function in request.get("functions", [])]
+        tools = [tool["function"]["name"] for tool in request.get("tools", [])]
+        last = messages[-1] if messages else {}
+
+        if last.get("role") == "tool":
+            # Todas as ferramentas pedidas já responderam: resposta final com os resultados
+            results = []
+            for previous in reversed(messages):
+                if previous.get("role") != "tool":
+                    break
+                results.insert(0, str(previous.get("content"))[:80])
+            message = {"role": "assistant", "content": f"Aqui está o resultado da sua solicitação: {' | '.join(results)}"}
+            finish_reason = "stop"
+        elif tools:
+            message = self._tool_calls(tools, self._last_user_content(messages))
+            finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        elif last.get("role") == "function":
+            # A ferramenta já respondeu: gerar a resposta final
+            message = {"role": "assistant", "content": f"Aqui está o resultado da sua solicitação: {str(last.get('content'))[:80]}"}
+            finish_reason = "stop"
+        elif "route_to_task_agent" in functions:
+            message = self._function_call("route_to_task_agent", last.get("content", ""))
+            finish_reason = "function_call"
+        elif "get_tasks" in functions:
+            message = self._function_call("get_tasks", "")
+            finish_reason = "function_call"
+        else:
+            message = {"role": "assistant", "content": "Resposta do modelo."}
+            finish_reason = "stop"
+
+        return message, finish_reason
+
+    def _completion(self, request, message, finish_reason):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _last_user_content(self, messages):
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                return str(message.get("content") or "")
+        return ""
+
+    def _tool_calls(self, tools, content):
+        """
+        Chamadas paralelas do agente de ferramentas: um `get_task` por ID
+        citado na mensagem (ex.: "#1, #2 e #3") ou um único `get_tasks`.
+        """
+        ids = re.findall(r"#(\w+)", content)
+        if ids and "get_task" in tools:
+            calls = [("get_task", task_id) for task_id in ids]
+        elif "get_tasks" in tools:
+            calls = [("get_tasks", "")]
+        else:
+            return {"role": "assistant", "content": "Resposta do modelo."}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps({"__arg1": argument})}}
+                for i, (name, argument) in enumerate(calls)
+            ],
+        }
+
+    def _function_call(self, name, argument):
+        return {
+            "role": "assistant",
+            "content": None,
+            "function_call": {"name": name, "arguments": json.dumps({"__arg1": argument})},
+        }
+
+class _ThreadingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Suportar muitas conexões simultâneas durante os testes de carga
+    request_queue_size = 512
+
+class StubServer:
+    """
+    Servidor em thread que responde como a OpenAI (/v1/chat/completions) e
+    como a API de tarefas (/tasks) e a Web API do Spotify (/spotify/v1/me...).
+
+    O modelo falso chama `route_to_task_agent` no orquestrador e `get_tasks`
+    no agente de tarefas, então cada turno percorre o mesmo caminho de um
+    turno real: duas chamadas de ferramenta e quatro chamadas ao LLM. Com
+    ferramentas no formato `tools`, cada ID citado como "#id" na mensagem
+    vira uma chamada `get_task` paralela no mesmo passo; /tasks/<id> responde
+    a tarefa após `tasks_delay`. Com
+    `"stream": true`, o texto é enviado palavra a palavra a cada `token_delay`.
+    `bytes_sent` soma os corpos JSON enviados e `spotify_requests` conta as
+    chamadas às rotas do Spotify, que respondem após `spotify_delay`. Com
+    `spotify_track_seconds`, a faixa tocando muda a cada tantos segundos.
+    """
+
+    def __init__(self, llm_delay=0.2, token_delay=0.02, tasks=None, certfile=None, keyfile=None, etags=True, spotify_delay=0.05, spotify_track_seconds=None, tasks_delay=0.0):
+        self.httpd = _ThreadingServer(("127.0.0.1", 0), _StubHandler)
+        self.scheme = "http"
+        if certfile:
+            # HTTPS para medir também o custo do handshake TLS
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = "https"
+        self.httpd.llm_delay = llm_delay
+        self.httpd.token_delay = token_delay
+        self.httpd.tasks = tasks if tasks is not None else []
+        self.httpd.tasks_delay = tasks_delay
+        # Com `etags`, GET /tasks envia ETag e atende GETs condicionais
+        self.httpd.etags = etags
+        self.httpd.bytes_sent = 0
+        self.httpd.spotify_delay = spotify_delay
+        self.httpd.spotify_requests = 0
+        self.httpd.spotify_track_seconds = spotify_track_seconds
+        self.httpd.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"{self.scheme}://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
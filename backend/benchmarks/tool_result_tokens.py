@@ -0,0 +1,117 @@
+"""
+Tokens e tempo de CPU dos resultados de ferramenta enviados ao LLM: o texto
+markdown montado campo a campo (formato anterior) contra as tabelas JSON
+compactas de agents/tool_results.py, para listas de tarefas e rotinas de
+tamanhos diferentes.
+
+Os tokens são contados com `count_tokens` de agents/memory.py (tiktoken
+`cl100k_base`, ou a estimativa de 4 caracteres por token sem o encoding).
+
+Uso:
+    python benchmarks/tool_result_tokens.py
+    python benchmarks/tool_result_tokens.py --items 10 100 1000
+"""
+import argparse
+import logging
+import timeit
+
+import bench_utils  # noqa: F401 (caminho do backend e credenciais fictícias)
+
+def make_tasks(count):
+    # Formato legado da API de tarefas, em português
+    return [
+        {
+            "ID": f"{i:08d}-4b1e-9c2a-{i:012d}",
+            "Descrição": f"Revisar o relatório semanal da equipe {i}",
+            "Prioridade": ("Alta", "Média", "Baixa")[i % 3],
+            "Categoria": ("Geral", "Desenvolvimento", "Backup")[i % 3],
+            "Status": ("Pendente", "Concluído")[i % 2],
+            "Data de Criação": f"2024-03-{i % 28 + 1:02d}T09:30:00",
+        }
+        for i in range(count)
+    ]
+
+def make_routines(count):
+    return [
+        {
+            "id": f"{i:08d}-7d3f-4a1b-{i:012d}",
+            "name": f"Rotina {i}",
+            "description": f"Exercícios de alongamento, bloco {i}",
+            "status": "pending",
+            "schedule": "07:30",
+            "frequency": "daily",
+            "priority": "medium",
+            "tags": ["saúde", "manhã"],
+            "estimated_duration": 30,
+            "version": 1,
+            "start_date": "2024-03-01",
+            "end_date": None,
+            "created_at": "2024-03-01T07:00:00",
+            "updated_at": "2024-03-01T07:00:00",
+        }
+        for i in range(count)
+    ]
+
+def legacy_tasks(tasks):
+    """Formato anterior de TaskAgent._format_tasks."""
+    formatted_tasks = []
+    for task in tasks:
+        formatted_tasks.append(
+            f"ID: {task.get('id', task.get('ID', 'N/A'))}\n"
+            f"Descrição: {task.get('description', task.get('Descrição', 'N/A'))}\n"
+            f"Prioridade: {task.get('priority', task.get('Prioridade', 'N/A'))}\n"
+            f"Categoria: {task.get('category', task.get('Categoria', 'N/A'))}\n"
+            f"Status: {task.get('status', task.get('Status', 'N/A'))}\n"
+            f"Data de Criação: {task.get('created_at', task.get('Data de Criação', 'N/A'))}\n"
+            "---"
+        )
+    return "\n".join(formatted_tasks)
+
+def legacy_routines(routines):
+    """Formato anterior de RoutineAgent._render_routines."""
+    response = "Here are all your routines:\n\n"
+    for routine in routines:
+        response += f"**{routine.get('name', 'No name')}**\n"
+        for key, value in routine.items():
+            if key != 'name':
+                if isinstance(value, list):
+                    value = ", ".join(value)
+                response += f"- **{key}:** {value}\n"
+        response += "\n"
+    return response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=20, help="formatações medidas por caso")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    from langchain_core.messages import AIMessage
+    from agents.memory import _get_encoding, count_tokens
+    from agents.tool_results import ROUTINE_COLUMNS, TASK_COLUMNS, compact_table
+
+    def tokens(text):
+        return count_tokens([AIMessage(content=text)])
+
+    print(f"Contagem: {'tiktoken cl100k_base' if _get_encoding() is not None else 'estimativa de 4 caracteres por token'}")
+    cases = [
+        ("tarefas", make_tasks, legacy_tasks, TASK_COLUMNS),
+        ("rotinas", make_routines, legacy_routines, ROUTINE_COLUMNS),
+    ]
+    for label, make, legacy, columns in cases:
+        for count in args.items:
+            items = make(count)
+            old = legacy(items)
+            new = compact_table(items, columns)
+            old_ms = timeit.timeit(lambda: legacy(items), number=args.repeat) / args.repeat * 1000
+            new_ms = timeit.timeit(lambda: compact_table(items, columns), number=args.repeat) / args.repeat * 1000
+            old_tokens, new_tokens = tokens(old), tokens(new)
+            print(
+                f"{count:>5} {label} | markdown {old_tokens:>7} tokens {old_ms:7.2f} ms | "
+                f"JSON compacto {new_tokens:>7} tokens {new_ms:7.2f} ms | "
+                f"{(1 - new_tokens / old_tokens) * 100:5.1f}% menos tokens"
+            )
+
+if __name__ == "__main__":
+    main()
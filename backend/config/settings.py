@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from dotenv import load_dotenv
@@ -13,10 +14,62 @@ class Settings(BaseSettings):
     spotify_auth_url: str = "https://accounts.spotify.com/authorize"
     spotify_token_url: str = "https://accounts.spotify.com/api/token"
     spotify_api_url: str = "https://api.spotify.com/v1"
+    # TTL (s) dos caches por token das rotas do Spotify consultadas periodicamente pelo frontend
+    spotify_profile_cache_ttl_seconds: float = 60.0
+    spotify_playlists_cache_ttl_seconds: float = 30.0
+    spotify_top_tracks_cache_ttl_seconds: float = 60.0
+    spotify_recently_played_cache_ttl_seconds: float = 10.0
+    # Entradas (token, rota e parâmetros) mantidas em cada cache do Spotify
+    spotify_cache_max_entries: int = 1000
+    # Polling compartilhado do "tocando agora" (utils/spotify_poller.py): intervalo
+    # com música tocando, com a reprodução pausada e limite do backoff em erros (s)
+    spotify_poll_playing_interval_seconds: float = 5.0
+    spotify_poll_paused_interval_seconds: float = 30.0
+    spotify_poll_max_interval_seconds: float = 60.0
+    # Tokens do Spotify por sessão no servidor (utils/spotify_tokens.py): "sqlite" ou "memory"
+    spotify_token_storage: str = "sqlite"
+    spotify_token_db_path: str = "spotify_tokens.db"
+    # Renovar o token quando faltarem menos segundos que isto para ele expirar
+    spotify_token_refresh_margin_seconds: float = 60.0
 
     # OpenAI settings
     openai_api_key: str
     openai_model: str = "gpt-3.5-turbo"
+    openai_api_base: Optional[str] = None
+
+    # Memória das conversas: "none", "sliding_window" ou "summary"
+    memory_strategy: str = "sliding_window"
+    # Limite de tokens do histórico enviado ao LLM a cada turno
+    memory_max_tokens: int = 4000
+    # Tokens recentes mantidos sem resumo na estratégia "summary"
+    memory_summary_keep_tokens: int = 1500
+
+    # Cliente HTTP compartilhado (utils/http_client.py)
+    http_timeout_seconds: float = 10.0
+    http_connect_timeout_seconds: float = 3.05
+    http_max_retries: int = 2
+    http_backoff_factor: float = 0.3
+    # Número de hosts com pool próprio e conexões keep-alive por host
+    http_pool_hosts: int = 10
+    http_pool_maxsize: int = 20
+
+    # Tempo (s) que o snapshot de tarefas/rotinas injetado no histórico fica em cache
+    snapshot_cache_ttl_seconds: float = 60.0
+    # URLs cujas últimas respostas (com ETag) são guardadas para GETs condicionais
+    conditional_cache_max_entries: int = 256
+
+    # Router local de intenções: encaminha mensagens claras ("tarefa", "rotina")
+    # direto ao subagente, sem a etapa de roteamento do LLM
+    intent_router_enabled: bool = True
+    intent_router_min_confidence: float = 0.8
+
+    # WebSocket: envia frames "delta" com os tokens da resposta final
+    # (o cliente pode desativar por mensagem com "stream": false)
+    ws_stream_responses: bool = True
+
+    # Ferramentas pedidas pelo LLM em um mesmo passo executadas ao mesmo tempo
+    # (agents/parallel_executor.py)
+    agent_tool_max_concurrency: int = 4
 
     # API URLs
     task_api_url: str = "https://api.example.com/tasks"
@@ -1,57 +1,124 @@
 import json
 import logging
+import time
 import traceback
-from typing import Dict, Set
+from typing import Dict, Optional, Set, Union
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from agents.orchestrator_agent import OrchestratorAgent
-from agents.specialized.task_agent import TaskAgent
-from agents.specialized.routine_agent import RoutineAgent
+from agents.orchestrator_agent import OrchestratorAgent, get_orchestrator_agent
+from agents.session import ConversationSession
+from agents.streaming import TokenStreamHandler
+from config.settings import get_settings
+from agents.specialized.task_agent import get_task_agent
+from agents.specialized.routine_agent import get_routine_agent
+from utils.spotify_poller import CurrentlyPlayingPoller, get_spotify_poller_registry
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 # Criar router para as rotas da aplicação
 router = APIRouter(tags=["app"])
 
 # Gerenciador de conexões WebSocket
+# O agente orquestrador (e seus subagentes) é compartilhado pelo processo;
+# cada conexão recebe apenas uma ConversationSession
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[int, WebSocket] = {}
-        self.agents: Dict[int, OrchestratorAgent] = {}
-        self.last_texts: Dict[int, str] = {}
+        self.sessions: Dict[int, ConversationSession] = {}
+        # Poller do "tocando agora" em que cada conexão está inscrita
+        self.spotify_subscriptions: Dict[int, CurrentlyPlayingPoller] = {}
+    
+    @property
+    def agent(self) -> OrchestratorAgent:
+        return get_orchestrator_agent()
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         client_id = id(websocket)
         self.active_connections[client_id] = websocket
-        self.agents[client_id] = OrchestratorAgent()
-        self.last_texts[client_id] = ""
+        self.sessions[client_id] = self.agent.new_session()
         print(f"Cliente conectado: {client_id}")
     
     def disconnect(self, client_id: int):
+        self.unsubscribe_spotify(client_id)
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-        if client_id in self.agents:
-            del self.agents[client_id]
-        if client_id in self.last_texts:
-            del self.last_texts[client_id]
+        if client_id in self.sessions:
+            del self.sessions[client_id]
         print(f"Cliente desconectado: {client_id}")
     
-    async def process_message(self, client_id: int, message: str, response_format: str = "markdown"):
+    async def subscribe_spotify(self, client_id: int, credentials: Union[str, dict]):
+        """
+        Envia à conexão frames "spotify_playback" quando a música atual muda.
+        
+        `credentials` é a sessão no servidor ({"session_id": ...}), cujo token é
+        renovado no mesmo poller, ou um access token (string ou {"access_token": ...}).
+        """
+        if client_id not in self.active_connections:
+            return
+        if isinstance(credentials, dict):
+            session_id = credentials.get("session_id")
+            access_token = credentials.get("access_token")
+        else:
+            session_id, access_token = None, credentials
+        if not session_id and not access_token:
+            logger.warning(f"Inscrição no Spotify sem sessão ou token: {client_id}")
+            return
+        self.unsubscribe_spotify(client_id)
+        websocket = self.active_connections[client_id]
+        
+        async def send_frame(frame: dict):
+            await websocket.send_text(json.dumps(frame))
+        
+        self.spotify_subscriptions[client_id] = await get_spotify_poller_registry().subscribe(client_id, access_token, send_frame, session_id)
+    
+    def unsubscribe_spotify(self, client_id: int):
+        poller = self.spotify_subscriptions.pop(client_id, None)
+        if poller is not None:
+            poller.unsubscribe(client_id)
+    
+    async def process_message(self, client_id: int, message: str, response_format: str = "markdown", stream: Optional[bool] = None):
         if client_id not in self.active_connections:
             return
         
         current_text = message
-        last_text = self.last_texts[client_id]
+        session = self.sessions[client_id]
+        last_text = session.last_text
+        websocket = self.active_connections[client_id]
+        if stream is None:
+            stream = settings.ws_stream_responses
+        
+        async def send_delta(token: str):
+            await websocket.send_text(json.dumps({
+                "type": "delta",
+                "content": token,
+                "format": response_format
+            }))
+        
+        # Sem streaming, o cliente recebe apenas o frame "message" final (modo compatível)
+        stream_handler = TokenStreamHandler(send_delta) if stream else None
         
         try:
+            start_time = time.perf_counter()
             # Obter resposta do agente orquestrador com o formato especificado
-            response_text = self.agents[client_id].process_message(
+            response_text = await self.agent.aprocess_message(
                 current_text, 
                 response_format,
-                self.active_connections[client_id]
+                websocket,
+                session=session,
+                callbacks=[stream_handler] if stream_handler else None
             )
             
+            elapsed_time = time.perf_counter() - start_time
+            ttft = stream_handler.time_to_first_token if stream_handler else None
+            if ttft is not None:
+                logger.info(f"Turno concluído em {elapsed_time:.2f}s (TTFT {ttft:.2f}s, {stream_handler.tokens} tokens, memória economizou {session.tokens_saved_last_turn} tokens)")
+            else:
+                # Sem tokens transmitidos, o primeiro conteúdo é a própria resposta final
+                logger.info(f"Turno concluído em {elapsed_time:.2f}s (TTFT {elapsed_time:.2f}s, sem streaming, memória economizou {session.tokens_saved_last_turn} tokens)")
+            
             print(f"Resposta: {response_text}")
             
             # Enviar a resposta de volta para o frontend
@@ -66,7 +133,7 @@ class ConnectionManager:
             )
             
             # Atualizar o último texto
-            self.last_texts[client_id] = current_text
+            session.last_text = current_text
         except Exception as e:
             print(f"Erro ao processar com o agente: {e}")
             await self.active_connections[client_id].send_text(
@@ -96,12 +163,17 @@ async def websocket_endpoint(websocket: WebSocket):
                     # Extrair o formato da resposta, padrão é markdown
                     response_format = data_json.get("format", "markdown")
                     print(f"Processando mensagem: {data_json['text']} com formato: {response_format}")
-                    await manager.process_message(client_id, data_json["text"], response_format)
+                    await manager.process_message(client_id, data_json["text"], response_format, data_json.get("stream"))
                 elif "content" in data_json:
                     # Compatibilidade com o formato anterior
                     response_format = data_json.get("format", "markdown")
                     print(f"Processando mensagem (formato antigo): {data_json['content']} com formato: {response_format}")
-                    await manager.process_message(client_id, data_json["content"], response_format)
+                    await manager.process_message(client_id, data_json["content"], response_format, data_json.get("stream"))
+                elif "spotify_subscribe" in data_json:
+                    # {"spotify_subscribe": {"session_id": "..."}} ou {"spotify_subscribe": "<access token>"}: música atual enviada por push
+                    await manager.subscribe_spotify(client_id, data_json["spotify_subscribe"])
+                elif "spotify_unsubscribe" in data_json:
+                    manager.unsubscribe_spotify(client_id)
                 elif "idle" in data_json:
                     print(f"Recebido: {data_json} (Sinal de idle)")
                 else:
@@ -124,9 +196,9 @@ def initialize_agents():
     """Inicializa os agentes necessários."""
     try:
         logger.info("Inicializando agentes...")
-        orchestrator = OrchestratorAgent()
-        task_agent = TaskAgent()
-        routine_agent = RoutineAgent()
+        orchestrator = get_orchestrator_agent()
+        task_agent = get_task_agent()
+        routine_agent = get_routine_agent()
         logger.info("Agentes inicializados com sucesso!")
         return orchestrator, task_agent, routine_agent
     except Exception as e:
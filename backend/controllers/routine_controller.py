@@ -1,6 +1,6 @@
 import logging
 from fastapi import APIRouter, HTTPException
-from agents.specialized.routine_agent import RoutineAgent
+from agents.specialized.routine_agent import get_routine_agent
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -8,14 +8,14 @@ logger = logging.getLogger(__name__)
 # Criar o router
 router = APIRouter(prefix="/api/routines", tags=["routines"])
 
-# Inicializar o agente de rotinas
-routine_agent = RoutineAgent()
+# Agente de rotinas compartilhado pelo processo
+routine_agent = get_routine_agent()
 
 @router.get("/")
 async def get_routines():
     """Obtém todas as rotinas."""
     try:
-        routines = routine_agent.get_routines()
+        routines = await routine_agent.aget_routines()
         return {"routines": routines}
     except Exception as e:
         logger.error(f"Erro ao obter rotinas: {str(e)}")
@@ -25,7 +25,7 @@ async def get_routines():
 async def create_routine(routine: dict):
     """Cria uma nova rotina."""
     try:
-        new_routine = routine_agent.create_routine(routine)
+        new_routine = await routine_agent.acreate_routine(routine)
         return {"routine": new_routine}
     except Exception as e:
         logger.error(f"Erro ao criar rotina: {str(e)}")
@@ -35,7 +35,7 @@ async def create_routine(routine: dict):
 async def update_routine(routine_id: str, routine: dict):
     """Atualiza uma rotina existente."""
     try:
-        updated_routine = routine_agent.update_routine(routine_id, routine)
+        updated_routine = await routine_agent.aupdate_routine(routine_id, routine)
         return {"routine": updated_routine}
     except Exception as e:
         logger.error(f"Erro ao atualizar rotina: {str(e)}")
@@ -45,7 +45,7 @@ async def update_routine(routine_id: str, routine: dict):
 async def delete_routine(routine_id: str):
     """Remove uma rotina."""
     try:
-        routine_agent.delete_routine(routine_id)
+        await routine_agent.adelete_routine(routine_id)
         return {"success": True}
     except Exception as e:
         logger.error(f"Erro ao remover rotina: {str(e)}")
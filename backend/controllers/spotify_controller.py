@@ -1,11 +1,15 @@
-import base64
-import requests
+import hashlib
 import logging
 import time
 import traceback
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse, JSONResponse
 from config.settings import get_settings
+from utils.cache import MISSING, TTLCache
+from utils.http_client import arequest
+from utils.spotify_poller import get_spotify_poller_registry
+from utils.spotify_tokens import SpotifyTokenError, client_auth_header, get_spotify_token_store
 
 # Obter configurações
 settings = get_settings()
@@ -17,6 +21,67 @@ logger = logging.getLogger(__name__)
 # Criar router para as rotas do Spotify
 router = APIRouter(prefix="/api/spotify", tags=["spotify"])
 
+# Caches por token das rotas que o frontend consulta periodicamente
+profile_cache = TTLCache(settings.spotify_profile_cache_ttl_seconds, max_entries=settings.spotify_cache_max_entries)
+playlists_cache = TTLCache(settings.spotify_playlists_cache_ttl_seconds, max_entries=settings.spotify_cache_max_entries)
+top_tracks_cache = TTLCache(settings.spotify_top_tracks_cache_ttl_seconds, max_entries=settings.spotify_cache_max_entries)
+recently_played_cache = TTLCache(settings.spotify_recently_played_cache_ttl_seconds, max_entries=settings.spotify_cache_max_entries)
+
+# Cabeçalho com a sessão cujos tokens ficam no servidor
+SESSION_HEADER = "X-Spotify-Session"
+
+async def _get_access_token(request: Request) -> str:
+    """
+    Token de acesso da requisição: o da sessão no servidor (cabeçalho
+    X-Spotify-Session), renovado antes de expirar, ou o enviado como Bearer.
+    """
+    session_id = request.headers.get(SESSION_HEADER)
+    if session_id:
+        try:
+            return await get_spotify_token_store().get_access_token(session_id)
+        except SpotifyTokenError as e:
+            logger.error(f"SpotifyController: {e}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        error_msg = "Token de acesso não fornecido"
+        logger.error(f"SpotifyController: {error_msg}")
+        raise HTTPException(status_code=401, detail=error_msg)
+    return auth_header.split(" ")[1]
+
+def _cache_key(access_token: str, path: str, params: Optional[dict]) -> tuple:
+    # Apenas o hash do token fica guardado como chave
+    token_hash = hashlib.sha256(access_token.encode()).hexdigest()
+    return token_hash, path, tuple(sorted((params or {}).items()))
+
+async def _get_spotify_json(path: str, access_token: str, cache: TTLCache, params: Optional[dict] = None) -> tuple[int, Optional[dict], str]:
+    """
+    GET na API do Spotify pelo cliente assíncrono compartilhado, sem bloquear o
+    loop de eventos, com cache por token (apenas respostas 200 são guardadas).
+    
+    Returns:
+        tuple: (status code, dados ou None, texto da resposta em caso de erro)
+    """
+    key = _cache_key(access_token, path, params)
+    data = cache.get(key)
+    if data is not MISSING:
+        logger.info(f"SpotifyController: Usando resposta em cache para {path}")
+        return 200, data, ""
+    
+    response = await arequest(
+        "GET",
+        f"{settings.spotify_api_url}{path}",
+        params=params,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if response.status_code != 200:
+        return response.status_code, None, response.text
+    
+    data = response.json()
+    cache.set(key, data)
+    return 200, data, ""
+
 @router.get("/login")
 async def spotify_login():
     """Redireciona o usuário para a página de login do Spotify"""
@@ -47,12 +112,10 @@ async def spotify_callback(code: str):
         logger.info("SpotifyController: Iniciando callback de autenticação")
         logger.info(f"SpotifyController: Código de autorização recebido: {code[:10]}...")
         
-        # Codificar credenciais para autenticação básica
-        auth_header = base64.b64encode(f"{settings.spotify_client_id}:{settings.spotify_client_secret}".encode()).decode()
-        
         # Solicitar token de acesso
         logger.info("SpotifyController: Solicitando token de acesso")
-        response = requests.post(
+        response = await arequest(
+            "POST",
             settings.spotify_token_url,
             data={
                 "grant_type": "authorization_code",
@@ -60,7 +123,7 @@ async def spotify_callback(code: str):
                 "redirect_uri": settings.spotify_redirect_uri
             },
             headers={
-                "Authorization": f"Basic {auth_header}",
+                "Authorization": client_auth_header(),
                 "Content-Type": "application/x-www-form-urlencoded"
             }
         )
@@ -78,16 +141,18 @@ async def spotify_callback(code: str):
         token_data = response.json()
         logger.info("SpotifyController: Token de acesso obtido com sucesso")
         
+        # O refresh token fica no servidor; o navegador recebe a sessão
+        session_id = await get_spotify_token_store().create_session(token_data)
+        
         elapsed_time = time.time() - start_time
         logger.info(f"SpotifyController: Callback concluído em {elapsed_time:.2f}s")
         
-        # Retornar o token diretamente
         return JSONResponse(
             status_code=200,
             content={
                 "success": True,
+                "session_id": session_id,
                 "access_token": token_data["access_token"],
-                "refresh_token": token_data.get("refresh_token"),
                 "expires_in": token_data["expires_in"]
             }
         )
@@ -109,7 +174,20 @@ async def refresh_spotify_token(request: Request):
     try:
         logger.info("SpotifyController: Iniciando atualização de token")
         
-        # Verificar se o token foi enviado no cabeçalho
+        # Com sessão no servidor, o token é renovado pelo armazenamento (apenas se
+        # estiver perto de expirar, e uma única vez para requisições simultâneas)
+        session_id = request.headers.get(SESSION_HEADER)
+        if session_id:
+            store = get_spotify_token_store()
+            try:
+                access_token = await store.get_access_token(session_id)
+                expires_in = await store.expires_in(session_id)
+            except SpotifyTokenError as e:
+                logger.error(f"SpotifyController: {e}")
+                raise HTTPException(status_code=e.status_code, detail=str(e))
+            return {"success": True, "access_token": access_token, "expires_in": expires_in}
+        
+        # Sem sessão, o cliente envia o refresh token no cabeçalho (modo anterior)
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
             error_msg = "Token de acesso não fornecido"
@@ -119,19 +197,17 @@ async def refresh_spotify_token(request: Request):
         access_token = auth_header.split(" ")[1]
         logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
         
-        # Codificar credenciais para autenticação básica
-        auth_header = base64.b64encode(f"{settings.spotify_client_id}:{settings.spotify_client_secret}".encode()).decode()
-        
         # Solicitar novo token de acesso
         logger.info("SpotifyController: Solicitando novo token de acesso")
-        response = requests.post(
+        response = await arequest(
+            "POST",
             settings.spotify_token_url,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": access_token
             },
             headers={
-                "Authorization": f"Basic {auth_header}",
+                "Authorization": client_auth_header(),
                 "Content-Type": "application/x-www-form-urlencoded"
             }
         )
@@ -149,6 +225,9 @@ async def refresh_spotify_token(request: Request):
         
         return {"success": True, "access_token": token_data.get("access_token")}
     
+    except HTTPException:
+        # Erros já tratados (ex.: 401) chegam ao cliente com o status original
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao atualizar token após {elapsed_time:.2f}s: {str(e)}"
@@ -163,28 +242,18 @@ async def get_current_user(request: Request):
     try:
         logger.info("SpotifyController: Obtendo informações do usuário atual")
         
-        # Verificar se o token foi enviado no cabeçalho
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            error_msg = "Token de acesso não fornecido"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=401, detail=error_msg)
-        
-        access_token = auth_header.split(" ")[1]
-        logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
+        # Token da sessão no servidor ou enviado no cabeçalho
+        access_token = await _get_access_token(request)
+        logger.info("SpotifyController: Token de acesso obtido")
         
         logger.info("SpotifyController: Fazendo requisição para a API do Spotify")
-        response = requests.get(
-            f"{settings.spotify_api_url}/me",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
+        status_code, user_data, error_text = await _get_spotify_json("/me", access_token, profile_cache)
         
-        if response.status_code != 200:
-            error_msg = f"Erro ao obter usuário: {response.text}"
+        if status_code != 200:
+            error_msg = f"Erro ao obter usuário: {error_text}"
             logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to get user info")
+            raise HTTPException(status_code=status_code, detail="Failed to get user info")
         
-        user_data = response.json()
         logger.info(f"SpotifyController: Informações do usuário obtidas com sucesso: {user_data.get('display_name', 'Usuário desconhecido')}")
         
         elapsed_time = time.time() - start_time
@@ -192,6 +261,8 @@ async def get_current_user(request: Request):
         
         return user_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao obter usuário após {elapsed_time:.2f}s: {str(e)}"
@@ -206,32 +277,23 @@ async def get_currently_playing(request: Request):
     try:
         logger.info("SpotifyController: Obtendo música atual")
         
-        # Verificar se o token foi enviado no cabeçalho
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            error_msg = "Token de acesso não fornecido"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=401, detail=error_msg)
+        # Token da sessão no servidor ou enviado no cabeçalho
+        access_token = await _get_access_token(request)
+        logger.info("SpotifyController: Token de acesso obtido")
         
-        access_token = auth_header.split(" ")[1]
-        logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
+        # Abas abertas do mesmo usuário compartilham uma consulta ao Spotify por intervalo
+        poller = get_spotify_poller_registry().get(access_token, request.headers.get(SESSION_HEADER))
+        status_code, track_data, error_text = await poller.current(settings.spotify_poll_playing_interval_seconds)
         
-        logger.info("SpotifyController: Fazendo requisição para a API do Spotify")
-        response = requests.get(
-            f"{settings.spotify_api_url}/me/player/currently-playing",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
+        if status_code != 200:
+            error_msg = f"Erro ao obter música atual: {error_text}"
+            logger.error(f"SpotifyController: {error_msg}")
+            raise HTTPException(status_code=status_code, detail="Failed to get currently playing")
         
-        if response.status_code == 204:
+        if not track_data.get("item"):
             logger.info("SpotifyController: Nenhuma música tocando no momento")
-            return {"is_playing": False, "message": "No track currently playing"}
+            return track_data
         
-        if response.status_code != 200:
-            error_msg = f"Erro ao obter música atual: {response.text}"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to get currently playing")
-        
-        track_data = response.json()
         track_name = track_data.get('item', {}).get('name', 'Música desconhecida')
         logger.info(f"SpotifyController: Música atual obtida com sucesso: {track_name}")
         
@@ -240,6 +302,8 @@ async def get_currently_playing(request: Request):
         
         return track_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao obter música atual após {elapsed_time:.2f}s: {str(e)}"
@@ -255,9 +319,7 @@ async def control_playback(action: str, request: Request):
         logger.info(f"SpotifyController: Iniciando controle de reprodução: {action}")
         
         # Obter token de acesso do usuário
-        token = request.headers.get("Authorization", "").replace("Bearer ", "")
-        if not token:
-            raise HTTPException(status_code=401, detail="Token de acesso não fornecido")
+        token = await _get_access_token(request)
         
         # Definir endpoint e método baseado na ação
         endpoint = f"{settings.spotify_api_url}/me/player/{action}"
@@ -279,9 +341,9 @@ async def control_playback(action: str, request: Request):
                 params["state"] = state
         
         # Fazer requisição para o Spotify
-        response = requests.request(
-            method=method,
-            url=endpoint,
+        response = await arequest(
+            method,
+            endpoint,
             params=params,
             headers={
                 "Authorization": f"Bearer {token}",
@@ -296,11 +358,16 @@ async def control_playback(action: str, request: Request):
             logger.error(f"SpotifyController: Headers: {response.headers}")
             raise HTTPException(status_code=response.status_code, detail=error_msg)
         
+        # Atualizar logo as abas inscritas no "tocando agora"
+        get_spotify_poller_registry().poke(token, request.headers.get(SESSION_HEADER))
+        
         elapsed_time = time.time() - start_time
         logger.info(f"SpotifyController: Controle de reprodução concluído em {elapsed_time:.2f}s")
         
         return {"success": True}
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro no controle de reprodução após {elapsed_time:.2f}s: {str(e)}"
@@ -316,16 +383,15 @@ async def control_playback_post(action: str, request: Request):
         logger.info(f"SpotifyController: Iniciando controle de reprodução: {action}")
         
         # Obter token de acesso do usuário
-        token = request.headers.get("Authorization", "").replace("Bearer ", "")
-        if not token:
-            raise HTTPException(status_code=401, detail="Token de acesso não fornecido")
+        token = await _get_access_token(request)
         
         # Definir endpoint
         endpoint = f"{settings.spotify_api_url}/me/player/{action}"
         
         # Fazer requisição para o Spotify
-        response = requests.post(
-            url=endpoint,
+        response = await arequest(
+            "POST",
+            endpoint,
             headers={
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json"
@@ -339,11 +405,16 @@ async def control_playback_post(action: str, request: Request):
             logger.error(f"SpotifyController: Headers: {response.headers}")
             raise HTTPException(status_code=response.status_code, detail=error_msg)
         
+        # Atualizar logo as abas inscritas no "tocando agora"
+        get_spotify_poller_registry().poke(token, request.headers.get(SESSION_HEADER))
+        
         elapsed_time = time.time() - start_time
         logger.info(f"SpotifyController: Controle de reprodução concluído em {elapsed_time:.2f}s")
         
         return {"success": True}
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro no controle de reprodução após {elapsed_time:.2f}s: {str(e)}"
@@ -358,28 +429,20 @@ async def get_recently_played(request: Request, limit: int = 10):
     try:
         logger.info(f"SpotifyController: Obtendo músicas recentes (limite: {limit})")
         
-        # Verificar se o token foi enviado no cabeçalho
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            error_msg = "Token de acesso não fornecido"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=401, detail=error_msg)
-        
-        access_token = auth_header.split(" ")[1]
-        logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
+        # Token da sessão no servidor ou enviado no cabeçalho
+        access_token = await _get_access_token(request)
+        logger.info("SpotifyController: Token de acesso obtido")
         
         logger.info("SpotifyController: Fazendo requisição para a API do Spotify")
-        response = requests.get(
-            f"{settings.spotify_api_url}/me/player/recently-played?limit={limit}",
-            headers={"Authorization": f"Bearer {access_token}"}
+        status_code, tracks_data, error_text = await _get_spotify_json(
+            "/me/player/recently-played", access_token, recently_played_cache, params={"limit": limit}
         )
         
-        if response.status_code != 200:
-            error_msg = f"Erro ao obter músicas recentes: {response.text}"
+        if status_code != 200:
+            error_msg = f"Erro ao obter músicas recentes: {error_text}"
             logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to get recently played")
+            raise HTTPException(status_code=status_code, detail="Failed to get recently played")
         
-        tracks_data = response.json()
         items_count = len(tracks_data.get('items', []))
         logger.info(f"SpotifyController: {items_count} músicas recentes obtidas com sucesso")
         
@@ -388,6 +451,8 @@ async def get_recently_played(request: Request, limit: int = 10):
         
         return tracks_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao obter músicas recentes após {elapsed_time:.2f}s: {str(e)}"
@@ -402,32 +467,24 @@ async def get_top_tracks(request: Request, time_range: str = "medium_term", limi
     try:
         logger.info(f"SpotifyController: Obtendo músicas mais ouvidas (período: {time_range}, limite: {limit})")
         
-        # Verificar se o token foi enviado no cabeçalho
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            error_msg = "Token de acesso não fornecido"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=401, detail=error_msg)
-        
-        access_token = auth_header.split(" ")[1]
-        logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
+        # Token da sessão no servidor ou enviado no cabeçalho
+        access_token = await _get_access_token(request)
+        logger.info("SpotifyController: Token de acesso obtido")
         
         if time_range not in ["short_term", "medium_term", "long_term"]:
             logger.warning(f"SpotifyController: Período inválido '{time_range}', usando 'medium_term'")
             time_range = "medium_term"
         
         logger.info("SpotifyController: Fazendo requisição para a API do Spotify")
-        response = requests.get(
-            f"{settings.spotify_api_url}/me/top/tracks?time_range={time_range}&limit={limit}",
-            headers={"Authorization": f"Bearer {access_token}"}
+        status_code, tracks_data, error_text = await _get_spotify_json(
+            "/me/top/tracks", access_token, top_tracks_cache, params={"time_range": time_range, "limit": limit}
         )
         
-        if response.status_code != 200:
-            error_msg = f"Erro ao obter músicas mais ouvidas: {response.text}"
+        if status_code != 200:
+            error_msg = f"Erro ao obter músicas mais ouvidas: {error_text}"
             logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to get top tracks")
+            raise HTTPException(status_code=status_code, detail="Failed to get top tracks")
         
-        tracks_data = response.json()
         items_count = len(tracks_data.get('items', []))
         logger.info(f"SpotifyController: {items_count} músicas mais ouvidas obtidas com sucesso")
         
@@ -436,6 +493,8 @@ async def get_top_tracks(request: Request, time_range: str = "medium_term", limi
         
         return tracks_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao obter músicas mais ouvidas após {elapsed_time:.2f}s: {str(e)}"
@@ -450,28 +509,20 @@ async def get_playlists(request: Request, limit: int = 20):
     try:
         logger.info(f"SpotifyController: Obtendo playlists (limite: {limit})")
         
-        # Verificar se o token foi enviado no cabeçalho
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            error_msg = "Token de acesso não fornecido"
-            logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=401, detail=error_msg)
-        
-        access_token = auth_header.split(" ")[1]
-        logger.info("SpotifyController: Token de acesso extraído do cabeçalho")
+        # Token da sessão no servidor ou enviado no cabeçalho
+        access_token = await _get_access_token(request)
+        logger.info("SpotifyController: Token de acesso obtido")
         
         logger.info("SpotifyController: Fazendo requisição para a API do Spotify")
-        response = requests.get(
-            f"{settings.spotify_api_url}/me/playlists?limit={limit}",
-            headers={"Authorization": f"Bearer {access_token}"}
+        status_code, playlists_data, error_text = await _get_spotify_json(
+            "/me/playlists", access_token, playlists_cache, params={"limit": limit}
         )
         
-        if response.status_code != 200:
-            error_msg = f"Erro ao obter playlists: {response.text}"
+        if status_code != 200:
+            error_msg = f"Erro ao obter playlists: {error_text}"
             logger.error(f"SpotifyController: {error_msg}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to get playlists")
+            raise HTTPException(status_code=status_code, detail="Failed to get playlists")
         
-        playlists_data = response.json()
         items_count = len(playlists_data.get('items', []))
         logger.info(f"SpotifyController: {items_count} playlists obtidas com sucesso")
         
@@ -480,6 +531,8 @@ async def get_playlists(request: Request, limit: int = 20):
         
         return playlists_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         error_msg = f"Erro ao obter playlists após {elapsed_time:.2f}s: {str(e)}"
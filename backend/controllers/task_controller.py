@@ -1,6 +1,6 @@
 import logging
 from fastapi import APIRouter, HTTPException
-from agents.specialized.task_agent import TaskAgent
+from agents.specialized.task_agent import get_task_agent
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -8,14 +8,14 @@ logger = logging.getLogger(__name__)
 # Criar o router
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
-# Inicializar o agente de tarefas
-task_agent = TaskAgent()
+# Agente de tarefas compartilhado pelo processo
+task_agent = get_task_agent()
 
 @router.get("/")
 async def get_tasks():
     """Obtém todas as tarefas."""
     try:
-        tasks = task_agent.get_tasks()
+        tasks = await task_agent.aget_tasks()
         return {"tasks": tasks}
     except Exception as e:
         logger.error(f"Erro ao obter tarefas: {str(e)}")
@@ -25,7 +25,7 @@ async def get_tasks():
 async def create_task(task: dict):
     """Cria uma nova tarefa."""
     try:
-        new_task = task_agent.create_task(task)
+        new_task = await task_agent.acreate_task(task)
         return {"task": new_task}
     except Exception as e:
         logger.error(f"Erro ao criar tarefa: {str(e)}")
@@ -35,7 +35,7 @@ async def create_task(task: dict):
 async def update_task(task_id: str, task: dict):
     """Atualiza uma tarefa existente."""
     try:
-        updated_task = task_agent.update_task(task_id, task)
+        updated_task = await task_agent.aupdate_task(task_id, task)
         return {"task": updated_task}
     except Exception as e:
         logger.error(f"Erro ao atualizar tarefa: {str(e)}")
@@ -45,7 +45,7 @@ async def update_task(task_id: str, task: dict):
 async def delete_task(task_id: str):
     """Remove uma tarefa."""
     try:
-        task_agent.delete_task(task_id)
+        await task_agent.adelete_task(task_id)
         return {"success": True}
     except Exception as e:
         logger.error(f"Erro ao remover tarefa: {str(e)}")
@@ -6,6 +6,9 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from controllers import api_router
+from agents.orchestrator_agent import get_orchestrator_agent
+from utils.http_client import aclose_clients
+from utils.spotify_poller import get_spotify_poller_registry
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -26,6 +29,17 @@ app.add_middleware(
 # Incluir os routers dos controllers
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def warmup_agents():
+    """Constrói o grafo de agentes compartilhado antes da primeira conexão."""
+    get_orchestrator_agent()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Encerra os pollers do Spotify e fecha os pools de conexões HTTP compartilhados."""
+    await get_spotify_poller_registry().aclose()
+    await aclose_clients()
+
 # Variável para controlar o estado do servidor
 server_running = True
 
@@ -0,0 +1,14 @@
+"""Configuração compartilhada pelos testes do backend."""
+import os
+import sys
+
+# Permitir executar os testes a partir de qualquer diretório (inclusive com `pytest` puro)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Valores fictícios para que as configurações carreguem antes de qualquer
+# módulo de teste, seja qual for o arquivo executado
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'client-id')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'client-secret')
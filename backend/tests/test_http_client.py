@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from config.settings import get_settings
+from utils import http_client
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Transporte que registra cada tentativa e responde com o próximo resultado da lista."""
+    
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.attempts = 0
+    
+    async def handle_async_request(self, request):
+        self.attempts += 1
+        outcome = self.outcomes[min(self.attempts, len(self.outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, request=request)
+
+@pytest.fixture
+def transport(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'http_max_retries', 2)
+    monkeypatch.setattr(get_settings(), 'http_backoff_factor', 0)
+    
+    def use(*outcomes):
+        counting = CountingTransport(outcomes)
+        client = httpx.AsyncClient(transport=counting)
+        monkeypatch.setattr(http_client, 'get_async_client', lambda: client)
+        return counting
+    return use
+
+def test_shared_client_transport_does_not_retry():
+    client = http_client.get_async_client()
+    try:
+        assert client._transport._pool._retries == 0
+    finally:
+        asyncio.run(http_client.aclose_clients())
+
+def test_connection_errors_are_retried_for_any_method(transport):
+    counting = transport(httpx.ConnectError('recusada'))
+    
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(http_client.arequest('POST', 'http://api.test/routines'))
+    assert counting.attempts == 3
+
+def test_transient_status_is_retried_only_for_idempotent_methods(transport):
+    counting = transport(503, 200)
+    assert asyncio.run(http_client.arequest('GET', 'http://api.test/routines')).status_code == 200
+    assert counting.attempts == 2
+    
+    counting = transport(503, 200)
+    assert asyncio.run(http_client.arequest('POST', 'http://api.test/routines')).status_code == 503
+    assert counting.attempts == 1
+
+def test_read_errors_are_not_retried_for_post(transport):
+    counting = transport(httpx.ReadError('conexão encerrada'))
+    
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(http_client.arequest('POST', 'http://api.test/routines'))
+    assert counting.attempts == 1
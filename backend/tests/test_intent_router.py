@@ -0,0 +1,30 @@
+import pytest
+
+from agents.intent_router import ROUTINE_ROUTE, TASK_ROUTE, IntentRouter
+
+@pytest.mark.parametrize('message', [
+    'Quero ouvir todos os sucessos do Queen',
+    'Toca todo o álbum do Djavan',
+    'Todos os dias eu acordo cedo',
+    'Qual é a previsão do tempo?',
+])
+def test_portuguese_messages_without_keywords_go_to_the_llm(message):
+    decision = IntentRouter().classify(message)
+    
+    assert decision.route != TASK_ROUTE
+    assert IntentRouter().decide(message) is None
+
+@pytest.mark.parametrize('message', [
+    'Adicione uma tarefa para comprar pão',
+    'Mostre minhas tasks pendentes',
+    'Add milk to my to-do list',
+    'Show my todo list',
+])
+def test_task_messages_skip_the_llm(message):
+    assert IntentRouter().decide(message).route == TASK_ROUTE
+
+def test_routine_messages_skip_the_llm():
+    assert IntentRouter().decide('Crie uma rotina de exercícios').route == ROUTINE_ROUTE
+
+def test_mixed_messages_go_to_the_llm():
+    assert IntentRouter().decide('Transforme a tarefa de correr em uma rotina') is None
@@ -0,0 +1,64 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.memory import SUMMARY_PREFIX, SummarizingMemory, is_summary
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.specialized.task_agent import get_task_agent
+
+class FakeLLM:
+    def __init__(self):
+        self.requests = []
+    
+    def invoke(self, messages):
+        self.requests.append(messages)
+        return AIMessage(content='o usuário pediu a tarefa #42 para sexta')
+
+class RecordingAgent:
+    def __init__(self):
+        self.chat_history = None
+    
+    def process_message(self, message, chat_history=None):
+        self.chat_history = chat_history
+        return 'ok'
+
+def long_session(agent, turns=6):
+    session = agent.new_session()
+    for turn in range(turns):
+        session.conversation_history.append(HumanMessage(content=f'Pergunta {turn} ' + 'palavra ' * 40))
+        session.conversation_history.append(AIMessage(content=f'Resposta {turn} ' + 'palavra ' * 40))
+    session.conversation_history.append(HumanMessage(content='E a tarefa que eu pedi?'))
+    return session
+
+def test_summary_reaches_the_subagent():
+    agent = OrchestratorAgent()
+    agent.session = long_session(agent)
+    llm = FakeLLM()
+    
+    SummarizingMemory(max_tokens=200, keep_tokens=80, llm=llm).compact(agent.session)
+    
+    summary = agent.session.conversation_history[1]
+    assert is_summary(summary)
+    assert summary.content == f'{SUMMARY_PREFIX} o usuário pediu a tarefa #42 para sexta'
+    
+    # O histórico repassado ao subagente mantém o resumo, que também passa pela conversão dele
+    recorder = RecordingAgent()
+    agent.task_agent = recorder
+    agent.route_to_task_agent('E a tarefa que eu pedi?')
+    assert recorder.chat_history[0] is summary
+    assert summary in get_task_agent()._convert_chat_history(recorder.chat_history)
+
+def test_previous_summary_is_folded_into_the_next_one():
+    agent = OrchestratorAgent()
+    session = long_session(agent)
+    llm = FakeLLM()
+    memory = SummarizingMemory(max_tokens=200, keep_tokens=80, llm=llm)
+    memory.compact(session)
+    
+    for turn in range(6):
+        session.conversation_history.append(AIMessage(content=f'Resposta nova {turn} ' + 'palavra ' * 40))
+        session.conversation_history.append(HumanMessage(content=f'Pergunta nova {turn} ' + 'palavra ' * 40))
+    memory.compact(session)
+    
+    assert [is_summary(message) for message in session.conversation_history].count(True) == 1
+    request = llm.requests[-1][0].content
+    assert f'{SUMMARY_PREFIX} o usuário pediu a tarefa #42 para sexta' in request
+    assert f'Assistente: {SUMMARY_PREFIX}' not in request
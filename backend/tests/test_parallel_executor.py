@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+from langchain.agents.agent import BaseMultiActionAgent
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.tools import Tool
+
+from agents.parallel_executor import ParallelAgentExecutor
+from config.settings import get_settings
+
+class MultiLookupAgent(BaseMultiActionAgent):
+    """Pede todas as consultas no primeiro passo e devolve as observações na ordem recebida."""
+    
+    ids: list
+    
+    @property
+    def input_keys(self):
+        return ['input']
+    
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        if intermediate_steps:
+            return AgentFinish({'output': [observation for _, observation in intermediate_steps]}, '')
+        return [AgentAction('lookup', item_id, '') for item_id in self.ids]
+    
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs):
+        return self.plan(intermediate_steps, callbacks, **kwargs)
+
+class LookupTool:
+    """Ferramenta lenta que registra o pico de chamadas simultâneas."""
+    
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+    
+    def _enter(self):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+    
+    def _exit(self):
+        with self.lock:
+            self.running -= 1
+    
+    def run(self, item_id):
+        self._enter()
+        time.sleep(self.delays[item_id])
+        self._exit()
+        return f'item {item_id}'
+    
+    async def arun(self, item_id):
+        self._enter()
+        await asyncio.sleep(self.delays[item_id])
+        self._exit()
+        return f'item {item_id}'
+
+def make_executor(lookup, ids):
+    tool = Tool(name='lookup', func=lookup.run, coroutine=lookup.arun, description='Consulta um item.')
+    return ParallelAgentExecutor(agent=MultiLookupAgent(ids=ids), tools=[tool])
+
+def test_sync_tools_run_concurrently_in_request_order():
+    # A primeira ação termina por último: o resultado ainda segue a ordem pedida
+    lookup = LookupTool({'a': 0.3, 'b': 0.1, 'c': 0.2})
+    executor = make_executor(lookup, ['a', 'b', 'c'])
+    
+    start = time.perf_counter()
+    result = executor.invoke({'input': 'a, b e c'})
+    elapsed = time.perf_counter() - start
+    
+    assert result['output'] == ['item a', 'item b', 'item c']
+    assert lookup.peak == 3
+    assert elapsed < 0.5
+
+def test_async_tools_run_concurrently_in_request_order():
+    lookup = LookupTool({'a': 0.3, 'b': 0.1, 'c': 0.2})
+    executor = make_executor(lookup, ['a', 'b', 'c'])
+    
+    start = time.perf_counter()
+    result = asyncio.run(executor.ainvoke({'input': 'a, b e c'}))
+    elapsed = time.perf_counter() - start
+    
+    assert result['output'] == ['item a', 'item b', 'item c']
+    assert lookup.peak == 3
+    assert elapsed < 0.5
+
+def test_concurrency_is_bounded():
+    limit = get_settings().agent_tool_max_concurrency
+    ids = [str(i) for i in range(limit * 2)]
+    lookup = LookupTool({item_id: 0.05 for item_id in ids})
+    executor = make_executor(lookup, ids)
+    
+    assert executor.invoke({'input': ''})['output'] == [f'item {item_id}' for item_id in ids]
+    assert lookup.peak == limit
+    
+    lookup.peak = 0
+    assert asyncio.run(executor.ainvoke({'input': ''}))['output'] == [f'item {item_id}' for item_id in ids]
+    assert lookup.peak == limit
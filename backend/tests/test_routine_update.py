@@ -0,0 +1,73 @@
+import asyncio
+
+from agents.specialized.routine_agent import RoutineAPIClient, get_routine_agent
+
+class FakeRoutineAPI(RoutineAPIClient):
+    """API de rotinas em memória, com a escrita condicional da Lambda (409 com `current_version`)."""
+    
+    def __init__(self, routine):
+        super().__init__()
+        self.routine = routine
+        self.puts = []
+        self.gets = 0
+    
+    def _make_request(self, operation, method, url, **kwargs):
+        if method == 'GET':
+            self.gets += 1
+            return True, '', {'data': dict(self.routine)}
+        
+        self.puts.append(kwargs['json'])
+        payload = dict(kwargs['json'])
+        expected_version = payload.pop('version', None)
+        if expected_version is not None and expected_version != self.routine['version']:
+            return False, f'Erro na API durante {operation}. Status code: 409', {}
+        self.routine.update(payload, version=self.routine['version'] + 1)
+        return True, '', {'id': self.routine['id'], 'version': self.routine['version']}
+    
+    async def _amake_request(self, operation, method, url, **kwargs):
+        return self._make_request(operation, method, url, **kwargs)
+
+def make_agent(routine):
+    agent = get_routine_agent()
+    agent.api_client = FakeRoutineAPI(routine)
+    return agent
+
+def test_update_sends_the_version_read_by_the_llm():
+    agent = make_agent({'id': 'r1', 'name': 'Correr', 'schedule': '07:00', 'version': 3})
+    
+    response = agent.update_routine('r1|schedule=08:00|version=3')
+    
+    assert response == 'Routine updated successfully!\nID: r1'
+    assert agent.api_client.puts == [{'schedule': '08:00', 'version': 3}]
+    assert agent.api_client.routine['version'] == 4
+    assert agent.api_client.gets == 0
+
+def test_conflict_is_returned_to_the_llm_without_overwriting():
+    # Outro cliente alterou a rotina depois que o LLM leu a versão 3
+    agent = make_agent({'id': 'r1', 'name': 'Correr', 'schedule': '06:30', 'version': 4})
+    
+    response = agent.update_routine('r1|schedule=08:00|version=3')
+    
+    assert agent.api_client.puts == [{'schedule': '08:00', 'version': 3}]
+    assert agent.api_client.routine['schedule'] == '06:30'
+    assert 'was not updated' in response
+    assert '"sched":"06:30"' in response
+    assert 'version=4' in response
+    # A rotina só é relida no conflito, para mostrar a versão atual ao LLM
+    assert agent.api_client.gets == 1
+
+def test_update_without_version_is_a_single_unconditional_write():
+    agent = make_agent({'id': 'r1', 'name': 'Correr', 'version': 0})
+    
+    response = asyncio.run(agent.aupdate_routine('r1|priority=high'))
+    
+    assert response == 'Routine updated successfully!\nID: r1'
+    assert agent.api_client.puts == [{'priority': 'high'}]
+    assert agent.api_client.gets == 0
+
+def test_version_alone_is_not_an_update():
+    agent = make_agent({'id': 'r1', 'name': 'Correr', 'version': 1})
+    
+    assert agent.update_routine('r1|version=1') == 'No fields to update were provided.'
+    assert agent.update_routine('r1|name=Nadar|version=x') == 'Invalid value for version: x. Must be an integer.'
+    assert agent.api_client.puts == []
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+
+from utils import spotify_poller
+from utils.spotify_poller import SpotifyPollerRegistry
+from utils.spotify_tokens import SpotifyTokenError
+
+class FakeTokenStore:
+    """Store de sessões cujo access token muda a cada renovação."""
+    
+    def __init__(self):
+        self.tokens = {'sessao-1': 'access-1'}
+    
+    async def get_access_token(self, session_id):
+        if session_id not in self.tokens:
+            raise SpotifyTokenError('Sessão do Spotify não encontrada')
+        return self.tokens[session_id]
+
+def use_fakes(monkeypatch):
+    store = FakeTokenStore()
+    authorizations = []
+    
+    async def fake_arequest(method, url, **kwargs):
+        authorizations.append(kwargs['headers']['Authorization'])
+        return httpx.Response(200, json={'is_playing': True, 'item': {'id': 't1'}})
+    
+    monkeypatch.setattr(spotify_poller, 'get_spotify_token_store', lambda: store)
+    monkeypatch.setattr(spotify_poller, 'arequest', fake_arequest)
+    return store, authorizations
+
+def test_session_poller_survives_token_refresh(monkeypatch):
+    store, authorizations = use_fakes(monkeypatch)
+    registry = SpotifyPollerRegistry()
+    
+    poller = registry.get('access-1', session_id='sessao-1')
+    asyncio.run(poller.fetch())
+    store.tokens['sessao-1'] = 'access-2'
+    
+    # O token renovado continua no mesmo poller, com o token atual da sessão
+    assert registry.get('access-2', session_id='sessao-1') is poller
+    asyncio.run(poller.fetch())
+    assert authorizations == ['Bearer access-1', 'Bearer access-2']
+
+def test_ended_session_sends_unauthorized_frame(monkeypatch):
+    use_fakes(monkeypatch)
+    registry = SpotifyPollerRegistry()
+    frames = []
+    
+    async def send(frame):
+        frames.append(frame)
+    
+    async def subscribe():
+        poller = await registry.subscribe(1, None, send, session_id='encerrada')
+        await poller._task
+        return poller
+    
+    poller = asyncio.run(subscribe())
+    
+    assert frames == [{'type': 'spotify_playback', 'error': 'unauthorized', 'status': 401}]
+    assert poller.upstream_calls == 0
+    assert not poller.subscribers
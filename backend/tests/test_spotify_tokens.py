@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from config.settings import get_settings
+from utils.http_client import aclose_clients
+from utils.spotify_tokens import (
+    MemoryTokenStorage,
+    SQLiteTokenStorage,
+    SpotifyTokenError,
+    SpotifyTokenStore,
+    TokenStorage
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+    
+    def __call__(self):
+        return self.now
+
+class TokenEndpointHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        server = self.server
+        with server.lock:
+            server.requests.append({'form': form, 'authorization': self.headers.get('Authorization')})
+            count = len(server.requests)
+        time.sleep(server.delay)
+        
+        if server.status != 200:
+            body = json.dumps({'error': 'invalid_grant'}).encode()
+        else:
+            token = {'access_token': f'access-{count}', 'token_type': 'Bearer', 'expires_in': 3600}
+            if server.rotate:
+                token['refresh_token'] = f'refresh-{count}'
+            body = json.dumps(token).encode()
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def token_endpoint(monkeypatch):
+    """Endpoint de token do Spotify falso, que registra as trocas recebidas."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TokenEndpointHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.lock = threading.Lock()
+    server.delay = 0.0
+    server.status = 200
+    server.rotate = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    monkeypatch.setattr(get_settings(), 'spotify_token_url', f'http://{host}:{port}/api/token')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            # O cliente compartilhado fica preso ao loop de cada teste
+            await aclose_clients()
+    return asyncio.run(main())
+
+def make_store(storage=None, clock=None):
+    return SpotifyTokenStore(storage or MemoryTokenStorage(), refresh_margin_seconds=60, clock=clock or FakeClock())
+
+INITIAL_TOKEN = {'access_token': 'access-0', 'refresh_token': 'refresh-0', 'expires_in': 3600}
+
+def test_access_token_is_reused_until_close_to_expiry(token_endpoint):
+    clock = FakeClock()
+    store = make_store(clock=clock)
+    
+    async def scenario():
+        session_id = await store.create_session(INITIAL_TOKEN)
+        first = await store.get_access_token(session_id)
+        clock.now += 3600 - 61
+        second = await store.get_access_token(session_id)
+        clock.now += 2
+        third = await store.get_access_token(session_id)
+        return first, second, third, await store.expires_in(session_id)
+    
+    first, second, third, expires_in = run(scenario())
+    
+    assert (first, second) == ('access-0', 'access-0')
+    # Renovado antes de expirar, sem esperar um 401 do Spotify
+    assert third == 'access-1'
+    assert expires_in == 3600
+    assert len(token_endpoint.requests) == 1
+    request = token_endpoint.requests[0]
+    assert request['form'] == {'grant_type': 'refresh_token', 'refresh_token': 'refresh-0'}
+    credentials = f'{get_settings().spotify_client_id}:{get_settings().spotify_client_secret}'
+    assert request['authorization'] == 'Basic ' + base64.b64encode(credentials.encode()).decode()
+
+def test_concurrent_requests_share_a_single_refresh(token_endpoint):
+    token_endpoint.delay = 0.1
+    clock = FakeClock()
+    store = make_store(clock=clock)
+    
+    async def scenario():
+        session_id = await store.create_session(INITIAL_TOKEN)
+        clock.now += 3600
+        return await asyncio.gather(*(store.get_access_token(session_id) for _ in range(20)))
+    
+    tokens = run(scenario())
+    
+    assert set(tokens) == {'access-1'}
+    assert len(token_endpoint.requests) == 1
+    assert store.refresh_count == 1
+
+def test_sqlite_storage_keeps_sessions_and_rotated_refresh_token(token_endpoint, tmp_path):
+    token_endpoint.rotate = True
+    path = str(tmp_path / 'tokens.db')
+    clock = FakeClock()
+    store = make_store(SQLiteTokenStorage(path), clock)
+    
+    async def first_process():
+        session_id = await store.create_session(INITIAL_TOKEN)
+        clock.now += 3600
+        await store.get_access_token(session_id)
+        return session_id
+    
+    session_id = run(first_process())
+    
+    # Outro processo lê a sessão do mesmo arquivo
+    record = SQLiteTokenStorage(path).load(session_id)
+    assert record['access_token'] == 'access-1'
+    assert record['refresh_token'] == 'refresh-1'
+    
+    restarted = make_store(SQLiteTokenStorage(path), clock)
+    assert run(restarted.get_access_token(session_id)) == 'access-1'
+    assert len(token_endpoint.requests) == 1
+
+def test_refresh_token_is_kept_when_not_rotated(token_endpoint):
+    clock = FakeClock()
+    storage = MemoryTokenStorage()
+    store = make_store(storage, clock)
+    
+    async def scenario():
+        session_id = await store.create_session(INITIAL_TOKEN)
+        for _ in range(2):
+            clock.now += 3600
+            await store.get_access_token(session_id)
+        return session_id
+    
+    session_id = run(scenario())
+    
+    assert storage.load(session_id)['refresh_token'] == 'refresh-0'
+    assert [request['form']['refresh_token'] for request in token_endpoint.requests] == ['refresh-0', 'refresh-0']
+
+def test_rejected_refresh_token_ends_the_session(token_endpoint):
+    token_endpoint.status = 400
+    clock = FakeClock()
+    storage = MemoryTokenStorage()
+    store = make_store(storage, clock)
+    
+    async def scenario():
+        session_id = await store.create_session(INITIAL_TOKEN)
+        clock.now += 3600
+        with pytest.raises(SpotifyTokenError) as error:
+            await store.get_access_token(session_id)
+        return session_id, error.value
+    
+    session_id, error = run(scenario())
+    
+    assert error.status_code == 401
+    assert storage.load(session_id) is None
+    with pytest.raises(SpotifyTokenError):
+        run(store.get_access_token(session_id))
+
+def test_unknown_session_is_rejected_without_calling_spotify(token_endpoint):
+    store = make_store()
+    
+    with pytest.raises(SpotifyTokenError) as error:
+        run(store.get_access_token('sessao-inexistente'))
+    
+    assert error.value.status_code == 401
+    assert token_endpoint.requests == []
+
+def test_incomplete_storage_fails_at_instantiation():
+    class LoadOnlyStorage(TokenStorage):
+        def load(self, session_id):
+            return None
+    
+    with pytest.raises(TypeError):
+        LoadOnlyStorage()
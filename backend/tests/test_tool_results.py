@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from agents.tool_results import ROUTINE_COLUMNS, TASK_COLUMNS, compact_record, compact_table
+from utils.lambda_response import lambda_items, lambda_message, parse_lambda_response
+
+TASKS = [{'id': '1', 'description': 'Comprar pão', 'priority': 'Alta', 'status': 'Pendente'}]
+
+@pytest.mark.parametrize('data', [
+    {'statusCode': 200, 'body': json.dumps({'Items': TASKS})},
+    {'statusCode': 200, 'body': {'Items': TASKS}},
+    {'Items': TASKS},
+    TASKS,
+])
+def test_lambda_items_accepts_every_envelope(data):
+    assert lambda_items(data) == TASKS
+
+def test_lambda_items_reads_routines_data_key():
+    assert lambda_items({'body': json.dumps({'data': [{'id': 'r1'}]})}) == [{'id': 'r1'}]
+    assert lambda_items({'message': 'ok'}) is None
+
+def test_parse_lambda_response_rejects_invalid_json_body():
+    assert parse_lambda_response({'body': ''}) is None
+    with pytest.raises(ValueError):
+        parse_lambda_response({'body': 'not json'})
+
+def test_lambda_message_reads_message_inside_body():
+    assert lambda_message({'body': json.dumps({'message': 'Error: not found'})}) == 'Error: not found'
+    assert lambda_message({'message': 'Error: conflict'}) == 'Error: conflict'
+    assert lambda_message({'body': 'not json'}) is None
+
+def test_compact_table_normalizes_legacy_keys_and_drops_empty_columns():
+    tasks = [
+        {'ID': '1', 'Descrição': 'Comprar pão', 'Prioridade': 'Alta', 'Status': 'Pendente'},
+        {'id': '2', 'description': 'Lavar o carro', 'priority': 'Baixa', 'status': 'Concluído', 'category': ''},
+    ]
+    table = json.loads(compact_table(tasks, TASK_COLUMNS))
+    
+    assert table == {
+        'cols': ['id', 'desc', 'pri', 'status'],
+        'rows': [['1', 'Comprar pão', 'Alta', 'Pendente'], ['2', 'Lavar o carro', 'Baixa', 'Concluído']]
+    }
+
+def test_compact_table_extra_fields_and_record():
+    routine = {'id': 'r1', 'name': 'Correr', 'tags': ['saúde'], 'estimated_duration': 30, 'end_date': None}
+    
+    assert json.loads(compact_table([routine], ROUTINE_COLUMNS, missing=['r2'])) == {
+        'cols': ['id', 'name', 'tags', 'min'],
+        'rows': [['r1', 'Correr', ['saúde'], 30]],
+        'missing': ['r2']
+    }
+    assert json.loads(compact_record(routine, ROUTINE_COLUMNS)) == {'id': 'r1', 'name': 'Correr', 'tags': ['saúde'], 'min': 30}
+    # Sem espaços nem escapes de acentos: cada caractere conta nos tokens
+    assert compact_record(routine, ROUTINE_COLUMNS) == '{"id":"r1","name":"Correr","tags":["saúde"],"min":30}'
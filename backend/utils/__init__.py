@@ -1,3 +1,5 @@
 from .logger import get_logger
+from .http_client import get_session, get_async_client, arequest
+from .cache import TTLCache
 
-__all__ = ['get_logger'] 
\ No newline at end of file
+__all__ = ['get_logger', 'get_session', 'get_async_client', 'arequest', 'TTLCache']
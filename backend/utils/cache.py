@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Marca a ausência de valor, já que None pode ser um valor válido no cache
+MISSING = object()
+
+class TTLCache:
+    """
+    Cache em memória com expiração por tempo (TTL), seguro entre threads.
+    
+    Os agentes são compartilhados pelo processo, então uma instância deste cache
+    também é: o caminho síncrono roda em threads do executor e o assíncrono no
+    loop de eventos, por isso o acesso é protegido por um lock.
+    
+    Com `max_entries`, um `set` em cache cheio descarta as entradas expiradas
+    e, se ainda faltar espaço, a mais antiga.
+    """
+    
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Any, default: Any = MISSING) -> Any:
+        """
+        Retorna o valor armazenado em `key`, ou `default` se ausente ou expirado.
+        
+        Args:
+            key: Chave do valor
+            default: Valor retornado quando não há entrada válida (padrão: MISSING)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+    
+    def set(self, key: Any, value: Any, ttl_seconds: Optional[float] = None):
+        """Armazena `value` em `key` pelo TTL padrão (ou `ttl_seconds`)."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            if self.max_entries and key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (self._clock() + ttl, value)
+    
+    def _evict(self):
+        now = self._clock()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+    
+    def invalidate(self, key: Any = MISSING):
+        """Remove a entrada `key`, ou todas as entradas se nenhuma chave for informada."""
+        with self._lock:
+            if key is MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+class ConditionalCache:
+    """
+    Guarda a última resposta com ETag de cada requisição, para GETs condicionais.
+    
+    A entrada não expira: ela é revalidada a cada uso com If-None-Match, e um
+    304 devolve a resposta guardada sem trafegar o corpo. Quando passa de
+    `max_entries`, a entrada usada há mais tempo é descartada.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.revalidated = 0
+        self.refreshed = 0
+    
+    def get(self, key: Any) -> Optional[Tuple[str, Any]]:
+        """Retorna (etag, resposta) guardados em `key`, ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key: Any, etag: str, value: Any):
+        """Guarda a resposta `value` e seu ETag em `key`."""
+        with self._lock:
+            self._entries[key] = (etag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key: Any = MISSING):
+        """Remove a entrada `key`, ou todas as entradas se nenhuma chave for informada."""
+        with self._lock:
+            if key is MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.settings import get_settings
+from utils.cache import ConditionalCache
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Métodos que podem ser repetidos sem risco de duplicar efeitos
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Respostas transitórias que justificam uma nova tentativa
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter que aplica um timeout padrão quando a chamada não informa um."""
+    
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+@lru_cache()
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão HTTP síncrona compartilhada pelo processo.
+    
+    A sessão mantém um pool de conexões keep-alive por host (api.itenorio.com,
+    api.spotify.com, ...), aplica os timeouts das configurações e repete com
+    backoff exponencial, até `http_max_retries` vezes, as falhas ao abrir a
+    conexão e, nos métodos idempotentes, os demais erros de rede e as
+    respostas transitórias (429, 502, 503, 504).
+    
+    Returns:
+        requests.Session: Sessão com pool de conexões reutilizável
+    """
+    settings = get_settings()
+    retry = Retry(
+        total=settings.http_max_retries,
+        backoff_factor=settings.http_backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        # Devolver a última resposta em vez de levantar exceção, como sem retry
+        raise_on_status=False
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=(settings.http_connect_timeout_seconds, settings.http_timeout_seconds),
+        max_retries=retry,
+        pool_connections=settings.http_pool_hosts,
+        pool_maxsize=settings.http_pool_maxsize
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@lru_cache()
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP assíncrono compartilhado pelo processo.
+    
+    O transporte não repete requisições: as novas tentativas ficam só em
+    `arequest`, para que cada chamada faça no máximo `http_max_retries + 1`
+    tentativas.
+    
+    Returns:
+        httpx.AsyncClient: Cliente com pool de conexões reutilizável
+    """
+    settings = get_settings()
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds),
+        limits=httpx.Limits(
+            max_connections=settings.http_pool_hosts * settings.http_pool_maxsize,
+            max_keepalive_connections=settings.http_pool_maxsize
+        )
+    )
+
+async def arequest(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Faz uma requisição pelo cliente assíncrono compartilhado.
+    
+    Repete com backoff exponencial, até `http_max_retries` vezes, as falhas ao
+    abrir a conexão e, nos métodos idempotentes, os demais erros de rede e as
+    respostas transitórias (429, 502, 503, 504), como na sessão síncrona.
+    
+    Args:
+        method (str): Método HTTP
+        url (str): URL da requisição
+        **kwargs: Argumentos repassados a httpx.AsyncClient.request
+    
+    Returns:
+        httpx.Response: A última resposta recebida
+    """
+    settings = get_settings()
+    client = get_async_client()
+    retries = settings.http_max_retries
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    
+    for attempt in range(retries + 1):
+        delay = settings.http_backoff_factor * (2 ** attempt)
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            # Sem conexão aberta a requisição não chegou à API: repetir é seguro para qualquer método
+            connect_error = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+            if attempt == retries or not (idempotent or connect_error):
+                raise
+            logger.warning(f"HTTP: {method} {url} falhou ({str(e)}), tentando novamente em {delay:.2f}s")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries or not idempotent:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+            logger.warning(f"HTTP: {method} {url} retornou {response.status_code}, tentando novamente em {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+def _conditional_key(url: str, params: Optional[dict]) -> tuple:
+    return url, tuple(sorted((params or {}).items()))
+
+def _conditional_headers(cached: Optional[tuple], headers: Optional[dict]) -> dict:
+    headers = dict(headers or {})
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    return headers
+
+def _resolve_conditional(cache: ConditionalCache, key: tuple, cached: Optional[tuple], response):
+    """Devolve a resposta guardada num 304, ou guarda a nova resposta se ela trouxer ETag."""
+    if response.status_code == 304 and cached:
+        cache.revalidated += 1
+        return cached[1]
+    etag = response.headers.get("ETag")
+    if response.status_code == 200 and etag:
+        cache.refreshed += 1
+        cache.set(key, etag, response)
+    elif cached:
+        cache.invalidate(key)
+    return response
+
+def conditional_get(url: str, cache: ConditionalCache, params: Optional[dict] = None, headers: Optional[dict] = None, **kwargs) -> requests.Response:
+    """
+    GET com If-None-Match pela sessão compartilhada.
+    
+    Se a API responder 304, a última resposta guardada em `cache` é devolvida,
+    então quem chama sempre recebe uma resposta completa (com .json()), mas uma
+    lista que não mudou custa uma ida e volta pequena, sem corpo.
+    
+    Args:
+        url (str): URL da requisição
+        cache (ConditionalCache): Cache das respostas com ETag
+        params (dict, opcional): Parâmetros da query string (fazem parte da chave)
+        headers (dict, opcional): Cabeçalhos adicionais
+        **kwargs: Argumentos repassados a requests.Session.get
+    
+    Returns:
+        requests.Response: A resposta nova ou a guardada
+    """
+    key = _conditional_key(url, params)
+    cached = cache.get(key)
+    response = get_session().get(url, params=params, headers=_conditional_headers(cached, headers), **kwargs)
+    return _resolve_conditional(cache, key, cached, response)
+
+async def aconditional_get(url: str, cache: ConditionalCache, params: Optional[dict] = None, headers: Optional[dict] = None, **kwargs) -> httpx.Response:
+    """Versão assíncrona de conditional_get, sobre o cliente httpx compartilhado."""
+    key = _conditional_key(url, params)
+    cached = cache.get(key)
+    response = await arequest("GET", url, params=params, headers=_conditional_headers(cached, headers), **kwargs)
+    return _resolve_conditional(cache, key, cached, response)
+
+@lru_cache()
+def get_conditional_cache() -> ConditionalCache:
+    """Retorna o cache de GETs condicionais compartilhado pelo processo."""
+    return ConditionalCache(get_settings().conditional_cache_max_entries)
+
+async def aclose_clients():
+    """Fecha os pools de conexões compartilhados (usado no shutdown da aplicação)."""
+    if get_async_client.cache_info().currsize:
+        await get_async_client().aclose()
+        get_async_client.cache_clear()
+    if get_session.cache_info().currsize:
+        get_session().close()
+        get_session.cache_clear()
@@ -0,0 +1,55 @@
+import json
+from typing import Any, Optional
+
+def parse_lambda_response(data: Any) -> Any:
+    """
+    Retorna o conteúdo de uma resposta das APIs Lambda.
+    
+    As APIs respondem ora com o conteúdo direto, ora dentro do envelope do
+    API Gateway (`{"statusCode": ..., "body": ...}`), em que o `body` pode vir
+    como string JSON ou já decodificado. Um `body` vazio vira None.
+    
+    Args:
+        data: JSON da resposta HTTP
+    
+    Raises:
+        ValueError: Se o `body` for uma string que não é JSON
+    """
+    if not isinstance(data, dict) or 'body' not in data:
+        return data
+    
+    body = data['body']
+    if isinstance(body, (str, bytes)):
+        if not body:
+            return None
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Corpo da resposta da API não é JSON: {str(e)}") from e
+    return body
+
+def lambda_items(data: Any) -> Optional[list]:
+    """
+    Retorna a lista de itens de uma resposta de listagem (envelope já aberto ou não).
+    
+    Aceita a lista direta, `{"Items": [...]}` (API de tarefas) e
+    `{"data": [...]}` (API de rotinas). Retorna None para outros formatos.
+    """
+    content = parse_lambda_response(data)
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict):
+        for key in ('Items', 'data'):
+            if isinstance(content.get(key), list):
+                return content[key]
+    return None
+
+def lambda_message(data: Any) -> Optional[str]:
+    """Retorna o campo `message` da resposta (útil em respostas de erro), se houver."""
+    try:
+        content = parse_lambda_response(data)
+    except ValueError:
+        return None
+    if isinstance(content, dict) and content.get('message'):
+        return str(content['message'])
+    return None
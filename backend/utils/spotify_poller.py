@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config.settings import get_settings
+from utils.http_client import arequest
+from utils.spotify_tokens import SpotifyTokenError, get_spotify_token_store
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Resposta quando nada está tocando (o Spotify responde 204 sem corpo)
+NOT_PLAYING = {"is_playing": False, "message": "No track currently playing"}
+
+# Tipo do frame enviado às conexões WebSocket inscritas
+PLAYBACK_FRAME = "spotify_playback"
+
+# (status code, dados ou None, texto da resposta em caso de erro)
+PlaybackResult = Tuple[int, Optional[dict], str]
+SendFrame = Callable[[dict], Awaitable[None]]
+
+def token_key(access_token: str) -> str:
+    """Chave de um token de acesso; o token em si não é guardado como chave."""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+def poller_key(access_token: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    """
+    Chave do poller: a sessão no servidor, quando houver, para que a renovação
+    do access token continue usando o mesmo poller; senão, o próprio token.
+    """
+    if session_id:
+        return token_key(f"session:{session_id}")
+    return token_key(access_token)
+
+def playback_signature(data: Optional[dict]) -> tuple:
+    """Identifica a faixa e o estado da reprodução; o progresso não conta como mudança."""
+    data = data or {}
+    item = data.get("item") or {}
+    return item.get("id") or item.get("uri") or item.get("name"), bool(data.get("is_playing"))
+
+class CurrentlyPlayingPoller:
+    """
+    Consulta o "tocando agora" do Spotify para um token de acesso ou para
+    uma sessão no servidor (o token da sessão é obtido a cada consulta).
+    
+    Chamadas simultâneas a `fetch()` compartilham uma única requisição ao
+    Spotify (single-flight), e `current()` reaproveita a última resposta
+    enquanto ela for mais nova que `max_age`. Enquanto houver conexões
+    inscritas, uma tarefa em segundo plano consulta o Spotify no intervalo
+    de `next_interval()` e envia um frame "spotify_playback" sempre que a
+    faixa ou o estado (tocando/pausado) muda.
+    """
+    
+    def __init__(self, access_token: Optional[str] = None, clock: Callable[[], float] = time.monotonic, session_id: Optional[str] = None):
+        self.access_token = access_token
+        self.session_id = session_id
+        self.subscribers: Dict[int, SendFrame] = {}
+        self.state: Optional[PlaybackResult] = None
+        self.fetched_at: Optional[float] = None
+        self.upstream_calls = 0
+        self.errors = 0
+        self._clock = clock
+        self._signature: Optional[tuple] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+    
+    @property
+    def active(self) -> bool:
+        """Indica se o poller tem inscritos ou uma requisição em andamento."""
+        return bool(self.subscribers) or self._task is not None or self._inflight is not None
+    
+    async def fetch(self) -> PlaybackResult:
+        """Consulta o Spotify, juntando-se à requisição em andamento se houver uma."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+            self._inflight.add_done_callback(self._fetch_done)
+        # O cancelamento de quem espera não cancela a requisição compartilhada
+        return await asyncio.shield(self._inflight)
+    
+    def _fetch_done(self, future: asyncio.Future):
+        self._inflight = None
+        if not future.cancelled():
+            # Marca a exceção como consumida mesmo que ninguém esteja esperando
+            future.exception()
+    
+    async def _fetch(self) -> PlaybackResult:
+        settings = get_settings()
+        access_token = self.access_token
+        if self.session_id:
+            # Token atual da sessão, renovado pelo store antes de expirar
+            try:
+                access_token = await get_spotify_token_store().get_access_token(self.session_id)
+            except SpotifyTokenError as e:
+                return e.status_code, None, str(e)
+        
+        self.upstream_calls += 1
+        response = await arequest(
+            "GET",
+            f"{settings.spotify_api_url}/me/player/currently-playing",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        if response.status_code == 204:
+            result = (200, dict(NOT_PLAYING), "")
+        elif response.status_code == 200:
+            result = (200, response.json(), "")
+        else:
+            result = (response.status_code, None, response.text)
+        self.state = result
+        self.fetched_at = self._clock()
+        return result
+    
+    async def current(self, max_age: float) -> PlaybackResult:
+        """
+        Retorna o estado atual, reaproveitando a última resposta bem-sucedida
+        se ela tiver menos de `max_age` segundos.
+        """
+        if self.state is not None and self.state[0] == 200 and self._clock() - self.fetched_at < max_age:
+            return self.state
+        return await self.fetch()
+    
+    def next_interval(self) -> float:
+        """
+        Intervalo até a próxima consulta em segundo plano: curto com música
+        tocando (e logo após o fim da faixa atual), longo com a reprodução
+        pausada e com backoff exponencial após erros.
+        """
+        settings = get_settings()
+        if self.errors:
+            return min(settings.spotify_poll_max_interval_seconds, settings.spotify_poll_playing_interval_seconds * 2 ** self.errors)
+        data = self.state[1] if self.state else None
+        if not data or not data.get("is_playing"):
+            return settings.spotify_poll_paused_interval_seconds
+        interval = settings.spotify_poll_playing_interval_seconds
+        duration = (data.get("item") or {}).get("duration_ms")
+        progress = data.get("progress_ms")
+        if duration and progress is not None:
+            # Consultar logo depois que a faixa terminar, sem esperar o intervalo inteiro
+            interval = min(interval, max(0, duration - progress) / 1000 + 0.5)
+        return interval
+    
+    async def subscribe(self, client_id: int, send: SendFrame):
+        """Inscreve uma conexão; ela recebe o estado atual, se conhecido, e as mudanças seguintes."""
+        self.subscribers[client_id] = send
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        if self._task is None:
+            # O primeiro ciclo consulta o Spotify e envia o estado a todos os inscritos
+            self._signature = None
+            self._task = asyncio.create_task(self._run())
+        elif self.state is not None and self.state[0] == 200:
+            await self._send(client_id, send, self._frame(self.state[1]))
+    
+    def unsubscribe(self, client_id: int):
+        """Remove uma conexão; sem inscritos, a tarefa em segundo plano termina."""
+        self.subscribers.pop(client_id, None)
+        if not self.subscribers and self._wake is not None:
+            self._wake.set()
+    
+    def poke(self):
+        """Antecipa a próxima consulta (por exemplo, depois de um comando ao player)."""
+        self.fetched_at = float("-inf")
+        if self._wake is not None:
+            self._wake.set()
+    
+    async def _run(self):
+        try:
+            while self.subscribers:
+                try:
+                    status_code, data, _ = await self.fetch()
+                except Exception as e:
+                    logger.warning(f"SpotifyPoller: Erro ao consultar música atual: {e}")
+                    status_code, data = None, None
+                
+                if status_code == 200:
+                    self.errors = 0
+                    if playback_signature(data) != self._signature:
+                        self._signature = playback_signature(data)
+                        await self._broadcast(self._frame(data))
+                elif status_code == 401:
+                    # Token expirado ou sessão encerrada: os inscritos renovam o token e se inscrevem de novo
+                    await self._broadcast({"type": PLAYBACK_FRAME, "error": "unauthorized", "status": 401})
+                    self.subscribers.clear()
+                    break
+                else:
+                    self.errors += 1
+                
+                self._wake.clear()
+                if not self.subscribers:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.next_interval())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._task = None
+    
+    def _frame(self, data: dict) -> dict:
+        return {"type": PLAYBACK_FRAME, "data": data}
+    
+    async def _broadcast(self, frame: dict):
+        await asyncio.gather(*(self._send(client_id, send, frame) for client_id, send in list(self.subscribers.items())))
+    
+    async def _send(self, client_id: int, send: SendFrame, frame: dict):
+        try:
+            await send(frame)
+        except Exception as e:
+            # Conexão fechada sem unsubscribe: deixa de receber os frames
+            logger.warning(f"SpotifyPoller: Removendo inscrito {client_id}: {e}")
+            self.subscribers.pop(client_id, None)
+    
+    async def aclose(self):
+        """Encerra a tarefa em segundo plano."""
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+class SpotifyPollerRegistry:
+    """
+    Um `CurrentlyPlayingPoller` por sessão no servidor (ou por token de
+    acesso, sem sessão), compartilhado pelas requisições HTTP e pelas
+    conexões WebSocket do processo.
+    
+    Guarda até `SPOTIFY_CACHE_MAX_ENTRIES` pollers; quando passa do limite,
+    descarta os inativos mais antigos.
+    """
+    
+    def __init__(self):
+        self._pollers: "OrderedDict[str, CurrentlyPlayingPoller]" = OrderedDict()
+    
+    def get(self, access_token: Optional[str] = None, session_id: Optional[str] = None) -> CurrentlyPlayingPoller:
+        """Retorna o poller da sessão (ou do token), criando-o se necessário."""
+        key = poller_key(access_token, session_id)
+        poller = self._pollers.get(key)
+        if poller is None:
+            if session_id:
+                poller = CurrentlyPlayingPoller(session_id=session_id)
+            else:
+                poller = CurrentlyPlayingPoller(access_token)
+            self._pollers[key] = poller
+            self._evict()
+        else:
+            self._pollers.move_to_end(key)
+        return poller
+    
+    def _evict(self):
+        max_entries = get_settings().spotify_cache_max_entries
+        for key in [key for key, poller in self._pollers.items() if not poller.active]:
+            if len(self._pollers) <= max_entries:
+                break
+            del self._pollers[key]
+    
+    async def subscribe(self, client_id: int, access_token: Optional[str], send: SendFrame, session_id: Optional[str] = None) -> CurrentlyPlayingPoller:
+        """Inscreve uma conexão no poller da sessão (ou do token) e o retorna (para o unsubscribe)."""
+        poller = self.get(access_token, session_id)
+        await poller.subscribe(client_id, send)
+        return poller
+    
+    def poke(self, access_token: Optional[str] = None, session_id: Optional[str] = None):
+        """Antecipa a próxima consulta da sessão (ou do token), se houver um poller para ela."""
+        poller = self._pollers.get(poller_key(access_token, session_id))
+        if poller is not None:
+            poller.poke()
+    
+    async def aclose(self):
+        """Encerra todos os pollers (usado no shutdown da aplicação)."""
+        await asyncio.gather(*(poller.aclose() for poller in self._pollers.values()))
+        self._pollers.clear()
+
+@lru_cache()
+def get_spotify_poller_registry() -> SpotifyPollerRegistry:
+    """
+    Retorna o registro de pollers compartilhado pelo processo.
+    
+    Returns:
+        SpotifyPollerRegistry: Pollers do "tocando agora" por sessão ou token de acesso
+    """
+    return SpotifyPollerRegistry()
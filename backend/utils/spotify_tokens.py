@@ -0,0 +1,245 @@
+import asyncio
+import base64
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from config.settings import get_settings
+from utils.http_client import arequest
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+class SpotifyTokenError(Exception):
+    """Sessão desconhecida ou token que não pôde ser renovado."""
+    
+    def __init__(self, message: str, status_code: int = 401):
+        super().__init__(message)
+        self.status_code = status_code
+
+def client_auth_header() -> str:
+    """Cabeçalho Basic com as credenciais do app, exigido pelo endpoint de token do Spotify."""
+    settings = get_settings()
+    credentials = f"{settings.spotify_client_id}:{settings.spotify_client_secret}"
+    return f"Basic {base64.b64encode(credentials.encode()).decode()}"
+
+class TokenStorage(ABC):
+    """
+    Persistência dos tokens por sessão. Cada registro é um dict com
+    `access_token`, `refresh_token` e `expires_at` (epoch, em segundos).
+    
+    As operações são síncronas; o `SpotifyTokenStore` as executa fora do
+    loop de eventos.
+    """
+    
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[dict]:
+        """Retorna o registro da sessão, ou None se ela não existir."""
+    
+    @abstractmethod
+    def save(self, session_id: str, record: dict):
+        """Grava (ou substitui) o registro da sessão."""
+    
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a sessão; não falha se ela não existir."""
+
+class MemoryTokenStorage(TokenStorage):
+    """Tokens apenas em memória; as sessões se perdem quando o processo reinicia."""
+    
+    def __init__(self):
+        self._records: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+    
+    def load(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(session_id)
+            return dict(record) if record else None
+    
+    def save(self, session_id: str, record: dict):
+        with self._lock:
+            self._records[session_id] = dict(record)
+    
+    def delete(self, session_id: str):
+        with self._lock:
+            self._records.pop(session_id, None)
+
+class SQLiteTokenStorage(TokenStorage):
+    """Tokens em um arquivo SQLite local, preservados entre reinícios do processo."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS spotify_tokens ("
+                "session_id TEXT PRIMARY KEY, access_token TEXT NOT NULL, "
+                "refresh_token TEXT, expires_at REAL NOT NULL)"
+            )
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: as chamadas vêm de threads diferentes do executor
+        return sqlite3.connect(self.path, timeout=5.0)
+    
+    def load(self, session_id: str) -> Optional[dict]:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT access_token, refresh_token, expires_at FROM spotify_tokens WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"access_token": row[0], "refresh_token": row[1], "expires_at": row[2]}
+    
+    def save(self, session_id: str, record: dict):
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO spotify_tokens (session_id, access_token, refresh_token, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, record["access_token"], record.get("refresh_token"), record["expires_at"])
+            )
+    
+    def delete(self, session_id: str):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM spotify_tokens WHERE session_id = ?", (session_id,))
+
+class SpotifyTokenStore:
+    """
+    Tokens do Spotify por sessão, mantidos no servidor.
+    
+    O navegador recebe apenas um `session_id`; o refresh token nunca sai do
+    servidor. `get_access_token` renova o token quando faltam menos de
+    `refresh_margin_seconds` para ele expirar, antes que uma chamada ao
+    Spotify falhe com 401. Renovações simultâneas da mesma sessão
+    compartilham uma única troca de token (single-flight).
+    """
+    
+    def __init__(self, storage: TokenStorage, refresh_margin_seconds: float = 60.0, clock: Callable[[], float] = time.time):
+        self.storage = storage
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.refresh_count = 0
+        self._clock = clock
+        self._records: Dict[str, dict] = {}
+        self._refreshing: Dict[str, asyncio.Future] = {}
+    
+    def _record(self, token_data: dict, refresh_token: Optional[str] = None) -> dict:
+        return {
+            "access_token": token_data["access_token"],
+            # O Spotify só envia um refresh token novo quando o rotaciona
+            "refresh_token": token_data.get("refresh_token") or refresh_token,
+            "expires_at": self._clock() + float(token_data.get("expires_in", 3600))
+        }
+    
+    async def create_session(self, token_data: dict) -> str:
+        """
+        Guarda os tokens recebidos na troca do código de autorização.
+        
+        Args:
+            token_data (dict): Resposta do endpoint de token do Spotify
+        
+        Returns:
+            str: Identificador da nova sessão
+        """
+        session_id = secrets.token_urlsafe(32)
+        await self._save(session_id, self._record(token_data))
+        return session_id
+    
+    async def get_access_token(self, session_id: str) -> str:
+        """Retorna um access token válido da sessão, renovando-o se estiver perto de expirar."""
+        record = await self._load(session_id)
+        if record["expires_at"] - self.refresh_margin_seconds <= self._clock():
+            record = await self.refresh(session_id)
+        return record["access_token"]
+    
+    async def expires_in(self, session_id: str) -> int:
+        """Segundos até o access token atual da sessão expirar."""
+        record = await self._load(session_id)
+        return max(0, int(record["expires_at"] - self._clock()))
+    
+    async def refresh(self, session_id: str) -> dict:
+        """Renova o token da sessão, juntando-se à renovação em andamento se houver uma."""
+        future = self._refreshing.get(session_id)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(session_id))
+            self._refreshing[session_id] = future
+            future.add_done_callback(lambda _: self._refreshing.pop(session_id, None))
+        # O cancelamento de quem espera não cancela a troca compartilhada
+        return await asyncio.shield(future)
+    
+    async def _refresh(self, session_id: str) -> dict:
+        record = await self._load(session_id)
+        if not record.get("refresh_token"):
+            raise SpotifyTokenError("Sessão sem refresh token")
+        
+        settings = get_settings()
+        self.refresh_count += 1
+        logger.info("SpotifyTokenStore: Renovando token de acesso")
+        response = await arequest(
+            "POST",
+            settings.spotify_token_url,
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": record["refresh_token"]
+            },
+            headers={
+                "Authorization": client_auth_header(),
+                "Content-Type": "application/x-www-form-urlencoded"
+            }
+        )
+        
+        if response.status_code == 400:
+            # invalid_grant: refresh token revogado ou expirado, é preciso um novo login
+            logger.warning(f"SpotifyTokenStore: Refresh token rejeitado: {response.text}")
+            await self.delete_session(session_id)
+            raise SpotifyTokenError("Sessão do Spotify expirada")
+        if response.status_code != 200:
+            raise SpotifyTokenError(f"Erro ao atualizar token: {response.text}", status_code=response.status_code)
+        
+        record = self._record(response.json(), record["refresh_token"])
+        await self._save(session_id, record)
+        return record
+    
+    async def delete_session(self, session_id: str):
+        """Remove a sessão e seus tokens (logout ou refresh token revogado)."""
+        self._records.pop(session_id, None)
+        await asyncio.to_thread(self.storage.delete, session_id)
+    
+    async def _load(self, session_id: str) -> dict:
+        record = self._records.get(session_id)
+        if record is None:
+            record = await asyncio.to_thread(self.storage.load, session_id)
+            if record is None:
+                raise SpotifyTokenError("Sessão do Spotify desconhecida")
+            self._records[session_id] = record
+        return record
+    
+    async def _save(self, session_id: str, record: dict):
+        self._records[session_id] = record
+        await asyncio.to_thread(self.storage.save, session_id, record)
+
+def create_token_storage(storage: str, path: Optional[str] = None) -> TokenStorage:
+    """
+    Cria a persistência dos tokens pelo nome.
+    
+    Args:
+        storage (str): "sqlite" ou "memory"
+        path (str): Arquivo do banco (apenas "sqlite")
+    """
+    if storage == "memory":
+        return MemoryTokenStorage()
+    if storage == "sqlite":
+        return SQLiteTokenStorage(path or "spotify_tokens.db")
+    raise ValueError(f"Armazenamento de tokens desconhecido: {storage}")
+
+@lru_cache()
+def get_spotify_token_store() -> SpotifyTokenStore:
+    """Retorna o armazenamento de tokens configurado, compartilhado pelo processo."""
+    settings = get_settings()
+    return SpotifyTokenStore(
+        create_token_storage(settings.spotify_token_storage, settings.spotify_token_db_path),
+        settings.spotify_token_refresh_margin_seconds
+    )
@@ -2,6 +2,7 @@
 
 import { useState, useEffect, useRef } from 'react';
 import MainLayout from '@/components/MainLayout';
+import spotifyService from '@/services/spotifyService';
 import { Message } from '@/types';
 
 
@@ -23,6 +24,8 @@ export default function Home() {
   // Ref declarations with explicit types
   const socketRef = useRef<WebSocket | null>(null);
   const reconnectTimerRef = useRef<NodeJS.Timeout | null>(null);
+  // Indica se a última mensagem do chat está sendo preenchida por frames "delta"
+  const streamingRef = useRef<boolean>(false);
 
   // Adicionar logs para depuração
   console.log("Home renderizando com estado:", {
@@ -81,7 +84,31 @@ export default function Home() {
     }
   };
 
+  const appendAIDelta = (text: string): void => {
+    if (!streamingRef.current) {
+      streamingRef.current = true;
+      setMessages(prev => [...prev, { text, isUser: false }]);
+      setIsTyping(false);
+      return;
+    }
+    
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      return [...prev.slice(0, -1), { ...last, text: last.text + text }];
+    });
+  };
+
   const addAIMessage = (text: string): void => {
+    if (streamingRef.current) {
+      // A resposta final substitui o texto acumulado pelos deltas
+      streamingRef.current = false;
+      setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], text }]);
+      setIsProcessing(false);
+      setIsTyping(false);
+      setStatus('Resposta recebida.');
+      return;
+    }
+    
     setMessages(prevMessages => [
       ...prevMessages,
       {
@@ -98,11 +125,43 @@ export default function Home() {
   };
 
   const addErrorMessage = (text: string): void => {
+    streamingRef.current = false;
     setMessages(prev => [...prev, { text: `Erro: ${text}`, isUser: false }]);
     setIsProcessing(false);
     setIsTyping(false);
   };
 
+  // Inscreve a conexão no "tocando agora": o servidor envia frames "spotify_playback"
+  // e os componentes deixam de consultar /currently-playing por conta própria
+  const subscribeSpotifyPlayback = (socket: WebSocket): void => {
+    const subscription = spotifyService.getPlaybackSubscription();
+    if (!subscription || socket.readyState !== WebSocket.OPEN) {
+      spotifyService.setPlaybackPushed(false);
+      return;
+    }
+    socket.send(JSON.stringify({ spotify_subscribe: subscription }));
+    spotifyService.setPlaybackPushed(true);
+  };
+
+  const handleSpotifyPlayback = async (socket: WebSocket, data: any): Promise<void> => {
+    if (data.error !== 'unauthorized') {
+      spotifyService.publishPlayback(data.data);
+      return;
+    }
+    
+    // O servidor encerrou a inscrição: com sessão, ela terminou; sem sessão, renova o token e inscreve de novo
+    spotifyService.setPlaybackPushed(false);
+    const subscription = spotifyService.getPlaybackSubscription();
+    if (subscription && 'access_token' in subscription) {
+      try {
+        await spotifyService.refreshAccessToken();
+        subscribeSpotifyPlayback(socket);
+      } catch (e) {
+        console.error('Erro ao renovar token do Spotify:', e);
+      }
+    }
+  };
+
   const connectWebSocket = (): void => {
     if (reconnectTimerRef.current) {
       clearTimeout(reconnectTimerRef.current);
@@ -124,11 +183,15 @@ export default function Home() {
         setIsConnected(true);
         setStatus('Conectado. Digite sua mensagem para começar.');
         setError(null);
+        subscribeSpotifyPlayback(socket);
       };
       
       socket.onclose = () => {
         console.log('WebSocket desconectado');
         setIsConnected(false);
+        if (socketRef.current === socket) {
+          spotifyService.setPlaybackPushed(false);
+        }
         setStatus('Desconectado do servidor. Tentando reconectar...');
         
         reconnectTimerRef.current = setTimeout(() => {
@@ -146,12 +209,16 @@ export default function Home() {
           const data = JSON.parse(event.data);
           console.log("Recebido do WebSocket:", data);
           
-          if (data.type === 'message') {
+          if (data.type === 'delta') {
+            appendAIDelta(data.content);
+          } else if (data.type === 'message') {
             console.log("Adicionando mensagem ao chat:", data.content);
             addAIMessage(data.content);
           } else if (data.type === 'error') {
             console.error("Erro recebido do servidor:", data.content);
             addErrorMessage(data.content);
+          } else if (data.type === 'spotify_playback') {
+            handleSpotifyPlayback(socket, data);
           }
         } catch (e) {
           console.error('Erro ao processar mensagem do WebSocket:', e);
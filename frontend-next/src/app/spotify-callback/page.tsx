@@ -39,6 +39,11 @@ export default function SpotifyCallback() {
             if (response.data.success && response.data.access_token) {
               console.log('Token obtido com sucesso');
               localStorage.setItem('spotify_access_token', response.data.access_token);
+              if (response.data.session_id) {
+                // O refresh token fica no servidor, associado à sessão
+                localStorage.setItem('spotify_session_id', response.data.session_id);
+                localStorage.removeItem('spotify_refresh_token');
+              }
               if (response.data.refresh_token) {
                 localStorage.setItem('spotify_refresh_token', response.data.refresh_token);
               }
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Box, 
   Typography, 
@@ -131,7 +131,8 @@ const SpotifyConnect: React.FC<SpotifyConnectProps> = ({ onConnect }) => {
   const [topTracks, setTopTracks] = useState<TopTracks | null>(null);
   const [playlists, setPlaylists] = useState<Playlists | null>(null);
   const [tabValue, setTabValue] = useState(2);
-  const [refreshInterval, setRefreshInterval] = useState<NodeJS.Timeout | null>(null);
+  // Encerra o acompanhamento da música atual (push do WebSocket ou consulta periódica)
+  const stopWatchingRef = useRef<(() => void) | null>(null);
 
   // Verificar se o usuário está autenticado ao carregar o componente
   useEffect(() => {
@@ -145,12 +146,8 @@ const SpotifyConnect: React.FC<SpotifyConnectProps> = ({ onConnect }) => {
           await loadUserData();
           await loadMusicData();
           
-          // Configurar intervalo para atualizar a música atual a cada 5 segundos
-          const interval = setInterval(async () => {
-            await loadCurrentlyPlaying();
-          }, 5000);
-          
-          setRefreshInterval(interval);
+          // Música atual pelo WebSocket; sem inscrição, consulta a cada 5 segundos
+          stopWatchingRef.current = spotifyService.watchCurrentlyPlaying(setCurrentlyPlaying);
         } else {
           setIsAuthenticated(false);
         }
@@ -162,11 +159,9 @@ const SpotifyConnect: React.FC<SpotifyConnectProps> = ({ onConnect }) => {
     
     checkAuth();
     
-    // Limpar o intervalo quando o componente for desmontado
+    // Parar de acompanhar a música atual quando o componente for desmontado
     return () => {
-      if (refreshInterval) {
-        clearInterval(refreshInterval);
-      }
+      stopWatchingRef.current?.();
     };
   }, []);
 
@@ -184,8 +179,8 @@ const SpotifyConnect: React.FC<SpotifyConnectProps> = ({ onConnect }) => {
   // Carregar dados de música
   const loadMusicData = async () => {
     try {
+      // A música atual vem de watchCurrentlyPlaying
       await Promise.all([
-        loadCurrentlyPlaying(),
         loadRecentlyPlayed(),
         loadTopTracks(),
         loadPlaylists()
@@ -79,21 +79,11 @@ const SpotifyMiniPlayer: React.FC = () => {
   const [anchorEl, setAnchorEl] = useState<null | HTMLElement>(null);
 
   useEffect(() => {
-    const fetchCurrentTrack = async () => {
-      try {
-        const track = await spotifyService.getCurrentlyPlaying();
-        if (track) {
-          setCurrentTrack(track);
-          setIsPlaying(track.is_playing);
-        }
-      } catch (error) {
-        console.error('Erro ao obter música atual:', error);
-      }
-    };
-
-    fetchCurrentTrack();
-    const interval = setInterval(fetchCurrentTrack, 5000);
-    return () => clearInterval(interval);
+    // Frames "spotify_playback" do WebSocket; sem inscrição, consulta a cada 5 segundos
+    return spotifyService.watchCurrentlyPlaying(track => {
+      setCurrentTrack(track);
+      setIsPlaying(track.is_playing);
+    });
   }, []);
 
   const handlePlayPause = async () => {
@@ -81,7 +81,15 @@ const getAccessToken = (): string | null => {
   return null;
 };
 
-// Função para obter o refresh token
+// Função para obter a sessão do Spotify (os tokens ficam no servidor)
+const getSessionId = (): string | null => {
+  if (typeof window !== 'undefined') {
+    return localStorage.getItem('spotify_session_id');
+  }
+  return null;
+};
+
+// Função para obter o refresh token (logins anteriores à sessão no servidor)
 const getRefreshToken = (): string | null => {
   if (typeof window !== 'undefined') {
     return localStorage.getItem('spotify_refresh_token');
@@ -92,15 +100,17 @@ const getRefreshToken = (): string | null => {
 // Função para renovar o token de acesso
 const refreshAccessToken = async (): Promise<string> => {
   try {
+    const sessionId = getSessionId();
     const refresh_token = getRefreshToken();
-    if (!refresh_token) {
+    if (!sessionId && !refresh_token) {
       throw new Error('Refresh token não encontrado');
     }
 
+    // Com sessão, o servidor renova o token (apenas se estiver perto de expirar)
     const response = await axios.get(`${API_BASE_URL}/api/spotify/refresh-token`, {
-      headers: {
-        Authorization: `Bearer ${refresh_token}`
-      }
+      headers: sessionId
+        ? { 'X-Spotify-Session': sessionId }
+        : { Authorization: `Bearer ${refresh_token}` }
     });
 
     if (response.data.success && response.data.access_token) {
@@ -115,7 +125,12 @@ const refreshAccessToken = async (): Promise<string> => {
 };
 
 // Função para criar o cabeçalho de autorização com renovação automática
-const getAuthHeader = async (): Promise<{ Authorization: string } | {}> => {
+const getAuthHeader = async (): Promise<Record<string, string>> => {
+  // Com sessão, o servidor usa o próprio token e o renova antes de expirar
+  const sessionId = getSessionId();
+  if (sessionId) {
+    return { 'X-Spotify-Session': sessionId };
+  }
   const token = getAccessToken();
   if (!token) {
     return {};
@@ -144,6 +159,15 @@ const makeAuthenticatedRequest = async <T>(
   }
 };
 
+// Credenciais da inscrição WebSocket no "tocando agora"
+export type PlaybackSubscription = { session_id: string } | { access_token: string };
+
+// Estado do "tocando agora" recebido por push (frames "spotify_playback" do WebSocket)
+let playbackPushed = false;
+let lastPushedPlayback: CurrentlyPlaying | null = null;
+const playbackListeners = new Set<(track: CurrentlyPlaying) => void>();
+const pushListeners = new Set<(pushed: boolean) => void>();
+
 // Serviço para interagir com a API do Spotify
 const spotifyService = {
   // Iniciar o processo de login
@@ -194,6 +218,85 @@ const spotifyService = {
     });
   },
 
+  // Credenciais para {"spotify_subscribe": ...}: a sessão, cujo token o servidor renova no mesmo poller
+  getPlaybackSubscription: (): PlaybackSubscription | null => {
+    const sessionId = getSessionId();
+    if (sessionId) {
+      return { session_id: sessionId };
+    }
+    const token = getAccessToken();
+    return token ? { access_token: token } : null;
+  },
+
+  // Renovar o token de acesso (inscrições sem sessão, após o frame "unauthorized")
+  refreshAccessToken,
+
+  // Indicar se o WebSocket está inscrito no "tocando agora"
+  setPlaybackPushed: (pushed: boolean): void => {
+    if (pushed === playbackPushed) {
+      return;
+    }
+    playbackPushed = pushed;
+    if (!pushed) {
+      lastPushedPlayback = null;
+    }
+    pushListeners.forEach(listener => listener(pushed));
+  },
+
+  // Repassar a música atual recebida pelo WebSocket
+  publishPlayback: (track: CurrentlyPlaying): void => {
+    lastPushedPlayback = track;
+    playbackListeners.forEach(listener => listener(track));
+  },
+
+  // Acompanhar a música atual: por push enquanto o WebSocket estiver inscrito,
+  // senão consultando /currently-playing a cada `intervalMs`
+  watchCurrentlyPlaying: (onTrack: (track: CurrentlyPlaying) => void, intervalMs: number = 5000): (() => void) => {
+    let timer: ReturnType<typeof setInterval> | null = null;
+
+    const poll = async () => {
+      try {
+        const track = await spotifyService.getCurrentlyPlaying();
+        if (track) {
+          onTrack(track);
+        }
+      } catch (error) {
+        console.error('Erro ao obter música atual:', error);
+      }
+    };
+
+    const onPushChange = (pushed: boolean) => {
+      if (pushed && timer) {
+        clearInterval(timer);
+        timer = null;
+      } else if (!pushed && !timer) {
+        poll();
+        timer = setInterval(poll, intervalMs);
+      }
+    };
+
+    playbackListeners.add(onTrack);
+    pushListeners.add(onPushChange);
+    if (playbackPushed) {
+      // Já inscrito: usa o último frame ou consulta uma vez até o próximo chegar
+      if (lastPushedPlayback) {
+        onTrack(lastPushedPlayback);
+      } else {
+        poll();
+      }
+    } else {
+      onPushChange(false);
+    }
+
+    return () => {
+      playbackListeners.delete(onTrack);
+      pushListeners.delete(onPushChange);
+      if (timer) {
+        clearInterval(timer);
+      }
+    };
+  },
+
   // Controlar a reprodução
   controlPlayback: async (action: 'play' | 'pause' | 'next' | 'previous' | 'seek' | 'repeat' | 'shuffle', value?: number | string | boolean): Promise<void> => {
     try {